@@ -1,42 +1,50 @@
 ﻿from __future__ import annotations
 # hairfusion-service/app/main.py
 
-from typing import Optional, Dict, Any
+import hashlib
+import html
+import string
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
 from urllib.parse import quote
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import (
     HTMLResponse,
     JSONResponse,
     PlainTextResponse,
+    Response,
 )
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from starlette.types import Message
 
 from app.settings import settings
+from app.services.static_files import CachedStaticFiles
 
 # ---- AILabTools (2D 헤어 합성) ----
 from app.services.ailabtools import (
-    hairstyle_edit_pro,
     AILabError,
     AILabAuthError,
     AILabBadReq,
 )
+from app.services.fuse_cache import cached_hairstyle_edit
+from app.services.derivatives import derivative_urls
 
 # ---- Meshy (2D → 3D 변환) ----
 # ⚠ meshy.py 에 정의된 실제 함수 이름에 맞춰 임포트
 from app.services.meshy import (
-    create_image_to_3d,
-    wait_and_download,
-    get_job,
     MeshyError,
     MeshyAuthError,
     MeshyBadReq,
     MeshyTimeout,
+    OUT_DIR as MESHY_OUT_DIR,
 )
-
-import httpx  # AsyncClient 사용
+from app.services.meshy_dedup import meshify_image
+from app.services.resilience import DEADLINE_HEADER, DeadlineExceeded, breaker_states, set_deadline
+from app.services.retention import shard_of
+from app.services.scheduler import QueueFull, request_lane, set_lane
 
 # -------------------------------------
 # FastAPI 초기화
@@ -47,12 +55,62 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=getattr(settings, "allowed_origins", ["*"])),
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.settings import settings
 from app.routes import uploads
-
-app = FastAPI(title="Hair3D API")
+from app.routes import admin, fuse as fuse_routes, jobs, meshy_tasks, webhooks
+from app.services.http import close_clients, start_clients
+from app.services.imaging import shutdown_executor
+from app.services.storage import shutdown_uploads
+from app.services import metrics
+from app.services.jobs import close_job_manager, get_job_manager
+from app.services.meshy import get_poller
+from app.services.meshy_journal import close_journal, recover_unfinished, stop_recovery
+from app.services.retention import start_sweeper, stop_sweeper
+
+
+def ensure_dirs() -> None:
+    """결과물 디렉터리 생성 (예전에는 서비스 모듈 import 시점에 만들었음)"""
+    from app.services.ailabtools import OUT_DIR as AILAB_OUT_DIR
+    from app.services.meshy import OUT_DIR as MESHY_OUT_DIR
+
+    for d in (AILAB_OUT_DIR, MESHY_OUT_DIR):
+        d.mkdir(parents=True, exist_ok=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 기동: 결과물 디렉터리 → 공유 HTTP 클라이언트 → 잡 워커 풀 (미완료 잡 재개 포함)
+    ensure_dirs()
+    await start_clients()
+    await get_job_manager().start()
+    if settings.meshy_recover_on_startup:
+        # 저널에 남은 미완료 Meshy 작업(요청 처리 중 재시작 등)은 백그라운드에서 이어받기
+        await recover_unfinished()
+    # outputs/ 보존 정책 (OUTPUT_QUOTA_BYTES / OUTPUT_TTL_SECONDS 가 있을 때만)
+    start_sweeper()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag())
+    try:
+        yield
+    finally:
+        lag_monitor.cancel()
+        # 종료: 워커 / 복구 태스크 / 공유 폴러 / HTTP 커넥션 풀 / 이미지·업로드 실행기 / 저널 / 보존 인덱스 정리
+        await close_job_manager()
+        await stop_recovery()
+        await stop_sweeper()
+        await get_poller().aclose()
+        await close_clients()
+        shutdown_executor()
+        await asyncio.to_thread(shutdown_uploads)   # 진행 중인 업로드가 끝날 때까지 루프를 막지 않게
+        close_journal()
+
+
+app = FastAPI(title="Hair3D API", lifespan=lifespan)
 
 origins = settings.allowed_origins.split(",") if settings.allowed_origins else ["*"]
 app.add_middleware(
@@ -66,50 +124,184 @@ app.add_middleware(
 
 
 # 정적 파일 서빙 (outputs/*)
-app.mount("/static", StaticFiles(directory="outputs"), name="static")
+# 내용 주소 이름은 immutable 캐시 + 강한 ETag, .br/.gz 사전 압축본 우선, Range 지원
+# (디렉터리는 lifespan 의 ensure_dirs 에서 만들므로 import 시점에는 검사하지 않음)
+app.mount("/static", CachedStaticFiles(directory="outputs", check_dir=False), name="static")
+
+# 비동기 잡 API (/jobs/*)
+app.include_router(jobs.router)
+app.include_router(admin.router)
+# POST /fuse/batch (한 얼굴 + 여러 스타일)
+app.include_router(fuse_routes.router)
+# POST /webhooks/meshy (MESHY_COMPLETION=webhook)
+app.include_router(webhooks.router)
+# GET /meshy/tasks (Meshy 작업 저널 조회)
+app.include_router(meshy_tasks.router)
+
+
+def _queue_full(e: QueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"busy: {str(e)[:400]}",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
 
 # -------------------------------------
 # Pydantic Schemas
 # -------------------------------------
-class FuseReq(BaseModel):
-    face_url: str
+class FuseOptions(BaseModel):
     hair_style: Optional[str] = None
     color: Optional[str] = None
     image_size: Optional[int] = None
     task_type: Optional[str] = "sync"
 
 
+class FuseReq(FuseOptions):
+    face_url: str
+
+
+# /fuse 는 JSON(face_url) 과 multipart(face 파일 + 옵션 필드) 둘 다 받으므로 요청 스키마를 직접 기술
+_FUSE_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": FuseReq.model_json_schema()},
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["face"],
+                    "properties": {
+                        "face": {"type": "string", "format": "binary"},
+                        **FuseOptions.model_json_schema()["properties"],
+                    },
+                }
+            },
+        },
+    }
+}
+
+
 class MeshifyReq(BaseModel):
     image_url: str
 
 
+# -------------------------------------
+# Prometheus 지표
+# -------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # -------------------------------------
 # Health Check
 # -------------------------------------
 @app.get("/health", response_class=PlainTextResponse)
 def health() -> str:
-    return "ok\n--\nTrue\n"
+    # 기존 3줄 형식은 유지하고, 업스트림별 서킷 브레이커 상태를 뒤에 덧붙임
+    lines = [f"breaker {name} {b['state']} failures={b['failures']}" for name, b in breaker_states().items()]
+    return "ok\n--\nTrue\n" + "".join(line + "\n" for line in lines)
 
 
 # -------------------------------------
 # AILabTools: 2D 헤어 합성
 # -------------------------------------
-@app.post("/fuse")
-async def fuse(req: FuseReq) -> Dict[str, Any]:
+def _body_error(loc: str, type_: str, msg: str) -> RequestValidationError:
+    return RequestValidationError([{"type": type_, "loc": ("body", loc), "msg": msg, "input": None}])
+
+
+def _validation_error(e: ValidationError) -> RequestValidationError:
+    # FastAPI 가 본문 검증할 때와 같은 형식 (loc 앞에 "body")
+    return RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
+
+async def _read_fuse_json(request: Request) -> FuseReq:
+    try:
+        return FuseReq.model_validate(await request.json())
+    except ValidationError as e:
+        raise _validation_error(e)
+    except ValueError:
+        raise _body_error("json", "json_invalid", "JSON decode error")
+
+
+async def _read_fuse_upload(request: Request) -> Tuple[FuseOptions, bytes, Optional[str]]:
+    """
+    multipart /fuse 본문 읽기: face(파일) + FuseOptions 필드.
+    본문은 Starlette 가 청크 단위로 파싱(큰 파일은 임시 파일로)하고, 크기는 FUSE_UPLOAD_MAX_BYTES 로 제한.
+    """
+    limit = settings.fuse_upload_max_bytes
+    body_limit = limit + 64 * 1024   # 폼 필드/경계 문자열 여유분
+    too_large = HTTPException(status_code=413, detail=f"face image too large (max {limit} bytes)")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > body_limit:
+        # 본문을 읽기 전에 거절
+        raise too_large
+    received = 0
+
+    async def receive() -> Message:
+        # Content-Length 가 없는(chunked) 업로드도 받은 만큼 세서 한도를 넘는 순간 중단
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > body_limit:
+                raise too_large
+        return message
+
+    form = await Request(request.scope, receive).form(max_files=1, max_fields=16)
+    try:
+        upload = form.get("face")
+        if upload is None or isinstance(upload, str):
+            raise _body_error("face", "missing", "Field required")
+        if upload.size is not None and upload.size > limit:
+            raise HTTPException(status_code=413, detail=f"face image too large (max {limit} bytes)")
+        data = await upload.read()
+        if not data:
+            raise _body_error("face", "value_error", "empty file")
+        try:
+            opts = FuseOptions.model_validate({k: v for k, v in form.items() if isinstance(v, str)})
+        except ValidationError as e:
+            raise _validation_error(e)
+        return opts, data, upload.content_type
+    finally:
+        await form.close()
+
+
+@app.post("/fuse", openapi_extra=_FUSE_OPENAPI)
+async def fuse(request: Request) -> Dict[str, Any]:
     """
     AILabTools를 이용해 2D 헤어스타일 합성 수행.
     합성 결과 이미지를 outputs/ 폴더에 저장하고 파일 경로 반환.
+    같은 얼굴 이미지 + 파라미터 요청은 캐시(outputs/cache/fuse)에서 바로 반환.
+    - application/json : FuseReq (face_url 을 AILab 이 직접 받아 감)
+    - multipart/form-data : face 파일 + 옵션 필드. S3 업로드 없이 바로 AILab 에 파일로 첨부
+      (FUSE_UPLOAD_MAX_SIDE 보다 크면 먼저 축소/재인코딩)
     """
+    set_lane(request_lane(request))
+    set_deadline(request.headers.get(DEADLINE_HEADER))
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        opts, face, face_type = await _read_fuse_upload(request)
+        face_url = None
+    else:
+        opts = await _read_fuse_json(request)
+        face, face_type, face_url = None, None, opts.face_url
     try:
-        saved = await hairstyle_edit_pro(
-            face_url=req.face_url,
-            hair_style=req.hair_style,
-            color=req.color,
-            image_size=req.image_size,
-            task_type=req.task_type,
+        saved, cache = await cached_hairstyle_edit(
+            face_url=face_url,
+            hair_style=opts.hair_style,
+            color=opts.color,
+            image_size=opts.image_size,
+            task_type=opts.task_type,
+            face=face,
+            face_type=face_type,
         )
-        return {"saved_path": saved, "ok": True}
+        # derivatives: OUTPUT_DERIVATIVES 에 지정한 WebP/JPEG/썸네일 URL (백그라운드에서 미리 만드는 중)
+        return {"saved_path": saved, "ok": True, "cache": cache, "derivatives": derivative_urls(saved)}
+    except QueueFull as e:
+        raise _queue_full(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"deadline: {str(e)[:400]}")
     except AILabAuthError as e:
         raise HTTPException(status_code=401, detail=f"auth error: {str(e)[:400]}")
     except AILabBadReq as e:
@@ -124,23 +316,24 @@ async def fuse(req: FuseReq) -> Dict[str, Any]:
 # Meshy: 2D → 3D 변환
 # -------------------------------------
 @app.post("/meshify")
-async def meshify(req: MeshifyReq) -> Dict[str, Any]:
+async def meshify(req: MeshifyReq, request: Request) -> Dict[str, Any]:
     """
     Meshy(OpenAPI v1)를 이용해 이미지→3D 변환을 수행하고,
     결과 GLB를 저장한 뒤 경로와 작업 상세를 반환한다.
+    MESHY_STORAGE=s3 이면 saved_path 없이 public_url(S3) 만 채워지고, viewer_url 은 그 URL 을 가리킨다.
     """
+    set_lane(request_lane(request))
+    set_deadline(request.headers.get(DEADLINE_HEADER))
     try:
-        # 1) 작업 생성 (task_id 반환)
-        task_id = await create_image_to_3d(req.image_url)
-
-        # 2) 완료까지 대기하며 모델(GLB) 다운로드 -> 로컬 경로 반환
-        saved_path = await wait_and_download(task_id)
-
-        # 3) 최종 작업 상세 조회
-        task_json = await get_job(task_id)
-
-        return {"job_id": task_id, "saved_path": str(saved_path), "result": task_json}
-
+        # 작업 생성 → 완료 대기 + GLB 다운로드 → 최종 작업 상세 조회
+        # (같은 이미지가 최근에 변환됐거나 변환 중이면 그 결과/작업을 재사용)
+        result, dedup = await meshify_image(req.image_url)
+        return {**result, "dedup": dedup}
+
+    except QueueFull as e:
+        raise _queue_full(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"deadline: {str(e)[:400]}")
     except MeshyAuthError as e:
         raise HTTPException(status_code=401, detail=f"meshy auth: {str(e)[:400]}")
     except MeshyBadReq as e:
@@ -156,38 +349,34 @@ async def meshify(req: MeshifyReq) -> Dict[str, Any]:
 # -------------------------------------
 # 간단한 3D 뷰어 (model-viewer)
 # -------------------------------------
-@app.get("/viewer", response_class=HTMLResponse)
-def viewer(file: str) -> str:
-    """
-    outputs/meshy/<file> 을 model-viewer로 브라우저에서 미리보기.
-    예시: http://127.0.0.1:8100/viewer?file=meshy_xxx.glb
-    """
-    safe = quote(file)
-    return f"""
+# 페이지 틀은 모듈 로드 시 한 번만 만들고, src 별 렌더 결과는 LRU 로 재사용
+_VIEWER_TEMPLATE = string.Template("""
 <!doctype html>
 <html>
   <head>
     <meta charset="utf-8"/>
     <title>HairFusion 3D Viewer</title>
-    <script type="module" src="https://unpkg.com/@google/model-viewer/dist/model-viewer.min.js"></script>
+    <link rel="preconnect" href="$script_origin" crossorigin>
+    <link rel="preload" href="$src" as="fetch" crossorigin>
+    <script type="module" src="$script"></script>
     <style>
-      html, body {{ height:100%; margin:0; background:#111; color:#eee; font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; }}
-      header {{ padding:10px 16px; background:#181818; border-bottom:1px solid #222; }}
-      main {{ height: calc(100% - 52px); }}
-      model-viewer {{ width:100%; height:100%; }}
-      a {{ color:#9ad; text-decoration:none; }}
-      a:hover {{ text-decoration:underline; }}
+      html, body { height:100%; margin:0; background:#111; color:#eee; font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; }
+      header { padding:10px 16px; background:#181818; border-bottom:1px solid #222; }
+      main { height: calc(100% - 52px); }
+      model-viewer { width:100%; height:100%; }
+      a { color:#9ad; text-decoration:none; }
+      a:hover { text-decoration:underline; }
     </style>
   </head>
   <body>
     <header>
       <strong>HairFusion 3D Viewer</strong>
       &nbsp;·&nbsp;
-      <a href="/static/meshy/{safe}" target="_blank">Download GLB</a>
+      <a href="$src" target="_blank">Download GLB</a>
     </header>
     <main>
       <model-viewer
-        src="/static/meshy/{safe}"
+        src="$src"
         ar
         camera-controls
         autoplay
@@ -198,14 +387,78 @@ def viewer(file: str) -> str:
     </main>
   </body>
 </html>
+""")
+
+
+@lru_cache(maxsize=1024)
+def _render_viewer(safe_src: str) -> Tuple[str, str]:
+    script = settings.viewer_script_url
+    origin = "/".join(script.split("/", 3)[:3]) if "://" in script else ""
+    page = _VIEWER_TEMPLATE.substitute(
+        src=safe_src,
+        script=html.escape(script, quote=True),
+        script_origin=html.escape(origin, quote=True),
+    )
+    etag = '"' + hashlib.sha256(page.encode("utf-8")).hexdigest()[:32] + '"'
+    return page, etag
+
+
+@app.get("/viewer", response_class=HTMLResponse)
+def viewer(
+    request: Request,
+    file: Optional[str] = None,
+    src: Optional[str] = None,
+    variant: Optional[str] = None,
+) -> Response:
     """
+    outputs/meshy/<file> 또는 임의 GLB URL(src, S3 public URL 등)을 model-viewer로 브라우저에서 미리보기.
+    예시: http://127.0.0.1:8100/viewer?file=meshy_xxx.glb
+          http://127.0.0.1:8100/viewer?file=meshy_xxx.glb&variant=preview   (경량 미리보기 GLB)
+          http://127.0.0.1:8100/viewer?src=https%3A%2F%2Fbucket.s3.amazonaws.com%2Fmeshy%2Fmeshy_xxx.glb
+    (S3 에서 불러오려면 버킷 CORS 에 이 서비스 origin 이 허용돼 있어야 함)
+    같은 src 의 페이지는 캐시된 HTML + ETag 로 응답 (재방문 시 304).
+    """
+    if variant not in (None, "full", "preview"):
+        raise HTTPException(status_code=400, detail="variant must be 'full' or 'preview'")
+    if src:
+        if not src.startswith(("/static/", "https://", "http://")):
+            raise HTTPException(status_code=400, detail="src must be an http(s) URL or a /static path")
+    elif file:
+        # OUTPUT_SHARDING 으로 저장된 파일은 meshy/<샤드>/<file> 에 있음
+        if "/" not in file and not (MESHY_OUT_DIR / file).exists():
+            file = f"{shard_of(file)}/{file}"
+        src = "/static/meshy/" + quote(file)
+    else:
+        raise HTTPException(status_code=400, detail="file or src is required")
+    if variant == "preview" and src.startswith("/static/") and "?" not in src:
+        # 미리보기 변형은 /static 에서만 제공 (CachedStaticFiles 가 <name>.preview.glb 로 연결)
+        src += "?variant=preview"
+    safe = html.escape(src, quote=True)
+
+    page, etag = _render_viewer(safe)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(page, headers=headers)
 
 
 # -------------------------------------
 # 전역 예외 핸들러 (안심용)
 # -------------------------------------
+logger = logging.getLogger("hairfusion")
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
+    # 응답은 그대로 두고, 원인 추적을 위해 요청 정보 + 스택을 남김
+    metrics.UNHANDLED_EXCEPTIONS.labels(type(exc).__name__).inc()
+    logger.error(
+        "unhandled %s on %s %s",
+        type(exc).__name__,
+        request.method,
+        request.url.path,
+        exc_info=exc,
+    )
     return JSONResponse(
         {"detail": f"UNHANDLED: {repr(exc)}"},
         status_code=500,
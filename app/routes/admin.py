@@ -0,0 +1,62 @@
+from fastapi import APIRouter
+
+from app.services.ailab_discovery import route_cache, upload_route_cache
+from app.services.fuse_cache import fuse_cache
+from app.services.http import connection_stats
+from app.services.meshy_dedup import dedup_stats
+from app.services import retention
+from app.services.scheduler import scheduler_stats
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/http")
+def http_stats():
+    """업스트림별 요청 수 / 새 커넥션 수 / 재사용 수 (keep-alive 효과 확인용)"""
+    return connection_stats()
+
+
+@router.get("/ailab/route")
+def ailab_route():
+    """캐시된 AILab 엔드포인트 조합과 적중률 (upload: 얼굴 이미지를 파일로 첨부하는 요청용)"""
+    return {**route_cache.stats(), "upload": upload_route_cache.stats()}
+
+
+@router.delete("/ailab/route")
+def ailab_route_reset():
+    """캐시된 조합을 지워 다음 /fuse 호출에서 재탐색"""
+    route_cache.invalidate()
+    upload_route_cache.invalidate()
+    return {**route_cache.stats(), "upload": upload_route_cache.stats()}
+
+
+@router.get("/fuse/cache")
+def fuse_cache_stats():
+    """/fuse 결과 캐시 상태 (적중/합류/축출 수, 사용 용량)"""
+    return fuse_cache.stats()
+
+
+@router.get("/meshy/dedup")
+def meshy_dedup_stats():
+    """Meshy 중복 제거 상태 (인덱스 적중 / 진행 중 작업 합류 수)"""
+    return dedup_stats()
+
+
+@router.get("/scheduler")
+def scheduler_state():
+    """업스트림별 실행 중/대기 중 요청 수, 거절 수, 레인별 대기 시간 히스토그램"""
+    return scheduler_stats()
+
+
+@router.get("/outputs")
+def outputs_stats():
+    """outputs/ 보존 정책 상태 (마지막 스위프 기준 용량, 정리한 수, 반영 대기 중인 기록 수)"""
+    return retention.stats()
+
+
+@router.post("/outputs/sweep")
+async def outputs_sweep():
+    """보존 정책 스위프를 지금 한 번 실행 (OUTPUT_QUOTA_BYTES / OUTPUT_TTL_SECONDS 가 없으면 상태만 반환)"""
+    if not retention.enabled():
+        return retention.stats()
+    return await retention.sweep()
@@ -0,0 +1,64 @@
+import json
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.settings import settings
+from app.services.fuse_batch import fuse_batch
+from app.services.resilience import set_deadline
+from app.services.scheduler import request_lane, set_lane
+
+router = APIRouter(prefix="/fuse", tags=["fuse"])
+
+
+class FuseVariant(BaseModel):
+    hair_style: Optional[str] = None
+    color: Optional[str] = None
+    image_size: Optional[int] = None
+
+
+class FuseBatchReq(BaseModel):
+    face_url: str
+    variants: List[FuseVariant] = Field(..., min_length=1)
+    task_type: Optional[str] = "sync"
+
+
+@router.post("/batch")
+async def fuse_batch_route(
+    req: FuseBatchReq,
+    request: Request,
+    accept: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[str] = Header(default=None),
+):
+    """
+    한 얼굴에 여러 스타일/색상을 한 번에 합성. 변형이 끝나는 순서대로 스트리밍.
+    - 기본: NDJSON (한 줄에 변형 결과 하나, 마지막 줄은 {"done": true, ...})
+    - Accept: text/event-stream 이면 SSE (event: result / event: done)
+    각 결과에는 요청 순서의 index 가 들어 있음. 일부 실패해도 스트림은 200 으로 끝까지 진행.
+    """
+    if len(req.variants) > settings.fuse_batch_max_variants:
+        raise HTTPException(
+            status_code=400,
+            detail=f"too many variants: {len(req.variants)} > {settings.fuse_batch_max_variants}",
+        )
+    set_lane(request_lane(request))
+    set_deadline(x_request_timeout)
+    variants = [v.model_dump() for v in req.variants]
+    sse = "text/event-stream" in (accept or "")
+
+    async def stream():
+        async for item in fuse_batch(req.face_url, variants, req.task_type):
+            body = json.dumps(item, ensure_ascii=False)
+            if sse:
+                yield f"event: {'done' if item.get('done') else 'result'}\ndata: {body}\n\n"
+            else:
+                yield body + "\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.settings import settings
+
+from app.services.jobs import FINISHED, FAILED, JobNotFound, get_job_manager
+from app.services.scheduler import request_lane, set_lane
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# SSE 연결 유지용 주석 전송 간격 (초)
+SSE_KEEPALIVE = 15.0
+
+
+class MeshifyJobReq(BaseModel):
+    image_url: str
+
+
+class PipelineItem(BaseModel):
+    face_url: str
+    hair_style: Optional[str] = None
+    color: Optional[str] = None
+    image_size: Optional[int] = None
+
+
+class PipelineJobReq(BaseModel):
+    items: List[PipelineItem] = Field(..., min_length=1)
+    task_type: Optional[str] = "sync"
+    publish: Optional[str] = None   # local | s3 (기본: PIPELINE_PUBLISH)
+
+
+async def _load(job_id: str):
+    try:
+        return await get_job_manager().get(job_id)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail=f"job not found: {job_id}")
+
+
+@router.post("/meshify", status_code=202)
+async def submit_meshify(req: MeshifyJobReq, request: Request):
+    """잡 등록 후 즉시 job_id 반환 (실제 변환은 워커가 수행)"""
+    job = await get_job_manager().submit(
+        "meshify", {"image_url": req.image_url, "lane": set_lane(request_lane(request))}
+    )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@router.post("/pipeline", status_code=202)
+async def submit_pipeline(req: PipelineJobReq, request: Request):
+    """
+    /fuse → 이미지 정리 → 공개(로컬 /static 또는 S3) → /meshify 를 한 잡으로 실행.
+    아이템별 단계 진행은 GET /jobs/{id} 의 data.items / data.stages 로 확인.
+    """
+    if len(req.items) > settings.pipeline_max_items:
+        raise HTTPException(status_code=400, detail=f"too many items: {len(req.items)} > {settings.pipeline_max_items}")
+    publish = req.publish or settings.pipeline_publish
+    if publish not in ("local", "s3"):
+        raise HTTPException(status_code=400, detail=f"unknown publish target: {publish}")
+    job = await get_job_manager().submit(
+        "pipeline",
+        {
+            "items": [item.model_dump() for item in req.items],
+            "task_type": req.task_type,
+            "publish": publish,
+            # 로컬 공개 시 Meshy 가 접근할 주소
+            "public_base_url": settings.public_base_url or str(request.base_url),
+            "lane": set_lane(request_lane(request)),
+        },
+    )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    job = await _load(job_id)
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "error": job.error,
+        "data": job.data,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+@router.get("/{job_id}/result")
+async def job_result(job_id: str):
+    job = await _load(job_id)
+    if job.status == FAILED:
+        err = job.error or {}
+        raise HTTPException(status_code=err.get("status_code", 500), detail=err.get("message"))
+    if job.status not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"job not finished: {job.status}")
+    return job.result
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events 로 상태 변화를 스트리밍 (종료 상태가 되면 스트림 종료)"""
+    manager = get_job_manager()
+    # 조회와 구독 사이에 끝난 잡을 놓치지 않도록 먼저 구독
+    q = manager.subscribe(job_id)
+    try:
+        job = await _load(job_id)
+    except HTTPException:
+        manager.unsubscribe(job_id, q)
+        raise
+
+    async def stream():
+        try:
+            snapshot = job.to_dict()
+            yield f"event: update\ndata: {json.dumps(snapshot)}\n\n"
+            while snapshot["status"] not in FINISHED:
+                try:
+                    snapshot = await asyncio.wait_for(q.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: update\ndata: {json.dumps(snapshot)}\n\n"
+            yield "event: end\ndata: {}\n\n"
+        finally:
+            manager.unsubscribe(job_id, q)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,39 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.meshy_journal import UNFINISHED, get_journal
+
+router = APIRouter(prefix="/meshy", tags=["meshy"])
+
+
+@router.get("/tasks")
+async def list_tasks(
+    limit: int = Query(default=50, ge=1, le=500),
+    before: Optional[float] = None,
+    state: Optional[str] = None,
+):
+    """
+    최근 갱신 순 Meshy 작업 목록 (저널 인덱스 조회, outputs/ 를 뒤지지 않음).
+    다음 페이지는 응답의 next_before 를 before 로 넘김.
+    """
+    rows = await get_journal().recent(limit=limit, before=before, state=state)
+    return {
+        "tasks": rows,
+        "next_before": rows[-1]["updated_at"] if len(rows) == limit else None,
+    }
+
+
+@router.get("/tasks/{task_id}")
+async def get_task(task_id: str):
+    """작업 하나의 현재 상태 + 상태 전이 기록 + 결과물(모델 포맷/텍스처) 목록"""
+    journal = get_journal()
+    row = await journal.get(task_id, events=True)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"task not found: {task_id}")
+    row["finished"] = row["state"] not in UNFINISHED
+    # size/fetched_at 이 비어 있으면 아직 안 받은 것 (/static 첫 요청 때 받음)
+    row["assets"] = [
+        {k: a[k] for k in ("name", "path", "size", "fetched_at")} for a in await journal.assets(task_id)
+    ]
+    return row
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from app.services.s3 import create_presigned_post
 
@@ -10,4 +10,10 @@ class SignReq(BaseModel):
 
 @router.post("/sign")
 def sign_upload(req: SignReq):
-    return create_presigned_post(req.key_prefix, req.content_type)
+    from app.services.storage import StorageError
+
+    try:
+        return create_presigned_post(req.key_prefix, req.content_type)
+    except StorageError as e:
+        # AWS_S3_BUCKET  ̼   ߵ  Ʈ  Ұ
+        raise HTTPException(status_code=503, detail=f"storage: {str(e)[:400]}")
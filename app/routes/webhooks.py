@@ -0,0 +1,41 @@
+import json
+import logging
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.services.meshy_webhook import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    WEBHOOKS,
+    WebhookRejected,
+    handle,
+    verify,
+)
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+logger = logging.getLogger("hairfusion")
+
+
+@router.post("/meshy")
+async def meshy_webhook(request: Request):
+    """
+    Meshy 작업 상태 알림 수신 (MESHY_COMPLETION=webhook).
+    '<X-Meshy-Timestamp>.<본문>' 의 HMAC-SHA256 서명(X-Meshy-Signature)과 타임스탬프를 검증한 뒤
+    해당 작업을 기다리는 요청/잡을 즉시 깨움.
+    """
+    body = await request.body()
+    try:
+        verify(body, request.headers.get(SIGNATURE_HEADER), request.headers.get(TIMESTAMP_HEADER))
+    except WebhookRejected as e:
+        WEBHOOKS.labels("rejected").inc()
+        logger.warning("meshy webhook rejected: %s", e)
+        raise HTTPException(status_code=401, detail=str(e))
+
+    try:
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise WebhookRejected("payload must be an object")
+        return await handle(payload)
+    except (WebhookRejected, ValueError) as e:
+        WEBHOOKS.labels("rejected").inc()
+        raise HTTPException(status_code=400, detail=str(e))
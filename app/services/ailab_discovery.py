@@ -0,0 +1,108 @@
+from __future__ import annotations
+# hairfusion-service/app/services/ailab_discovery.py
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.settings import settings
+
+
+@dataclass
+class AILabRoute:
+    """성공했던 (url, 헤더 방식, 페이로드 모드) 조합"""
+    url: str
+    header_scheme: str      # 인증 헤더 이름 (예: "ailabapi-api-key", "Authorization")
+    mode: str               # "json" | "form" | "multipart"
+    bases: List[str]        # 발견 당시의 AILAB_BASE_URL 목록 (설정이 바뀌면 무효)
+    discovered_at: float
+
+
+class RouteCache:
+    """
+    AILab 엔드포인트 탐색 결과 캐시.
+    - 한 번 찾은 조합을 TTL 동안 메모리 + 디스크(JSON)에 보관
+    - 401/404 가 나면 invalidate() → 다음 호출에서 재탐색
+    - 동시에 여러 요청이 콜드 상태면 탐색은 lock 을 잡은 하나만 수행
+    """
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.lock = asyncio.Lock()
+        self._route: Optional[AILabRoute] = None
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.discoveries = 0
+        self.invalidations = 0
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            self._route = AILabRoute(**json.loads(self.path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            self._route = None
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self._route)), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def get(self) -> Optional[AILabRoute]:
+        if not self._loaded:
+            self._load()
+        r = self._route
+        if r is None:
+            return None
+        if r.bases != settings.effective_ailab_urls() or time.time() - r.discovered_at > self.ttl:
+            self._route = None
+            return None
+        return r
+
+    def set(self, url: str, header_scheme: str, mode: str) -> AILabRoute:
+        self._route = AILabRoute(
+            url=url,
+            header_scheme=header_scheme,
+            mode=mode,
+            bases=settings.effective_ailab_urls(),
+            discovered_at=time.time(),
+        )
+        self.discoveries += 1
+        try:
+            self._save()
+        except OSError:
+            pass  # 디스크 저장 실패는 메모리 캐시만으로 계속
+        return self._route
+
+    def invalidate(self) -> None:
+        if self._route is not None:
+            self.invalidations += 1
+        self._route = None
+        self._loaded = True
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        route = self.get()
+        lookups = self.hits + self.misses
+        return {
+            "route": asdict(route) if route else None,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "discoveries": self.discoveries,
+            "invalidations": self.invalidations,
+        }
+
+
+route_cache = RouteCache(settings.ailab_route_cache_path, settings.ailab_route_ttl)
+# 얼굴 이미지를 파일로 첨부하는 요청용 (URL 요청과 받는 엔드포인트/형식이 다를 수 있어 따로 보관)
+upload_route_cache = RouteCache(settings.ailab_upload_route_cache_path, settings.ailab_route_ttl)
@@ -1,20 +1,33 @@
 ﻿# hairfusion-service/app/services/ailabtools.py
 import io
+import time
 import uuid
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 
 import httpx
-from PIL import Image
 
 from app.settings import settings
+from app.services.download import download_hedged
+from app.services.http import get_client
+from app.services.imaging import run_image_job
+from app.services.metrics import STAGE_AILAB_ATTEMPT, STAGE_IMAGE_PREP
+from app.services.resilience import DeadlineExceeded, request
+from app.services.retention import note as note_output, sharded
+from app.services.scheduler import QueueFull, get_scheduler
+from app.services.ailab_discovery import AILabRoute, RouteCache, route_cache, upload_route_cache
 
-OUT_DIR = Path("outputs")
-OUT_DIR.mkdir(exist_ok=True)
+if TYPE_CHECKING:
+    from PIL import Image
+
+OUT_DIR = Path("outputs")   # lifespan 에서 생성 (main.ensure_dirs)
 
 # Meshy에 넘기기 전에 최소 보장하고 싶은 해상도 (가장 긴 변 기준)
 MIN_SIZE_FOR_MESHY = 1024
 
+# AILab 에 multipart 로 첨부할 얼굴 이미지: (파일 이름, 바이트, Content-Type) — httpx files 형식
+FaceFile = Tuple[str, bytes, str]
+
 
 # ----- 예외 타입
 class AILabError(Exception):
@@ -29,6 +42,10 @@ class AILabBadReq(AILabError):
     ...
 
 
+class AILabNotFound(AILabError):
+    ...
+
+
 def _candidate_headers() -> List[Dict[str, str]]:
     key = settings.ailab_api_key or ""
     return [
@@ -39,17 +56,40 @@ def _candidate_headers() -> List[Dict[str, str]]:
     ]
 
 
+def _header_scheme(headers: Dict[str, str]) -> str:
+    # 후보 헤더는 첫 번째 키가 인증 헤더 이름
+    return next(iter(headers))
+
+
+def _headers_for_scheme(scheme: str) -> Dict[str, str] | None:
+    for h in _candidate_headers():
+        if _header_scheme(h) == scheme:
+            return h
+    return None
+
+
 def _candidate_payloads(
-    face_url: str,
+    face_url: str | None,
     hair_style: str | None,
     color: str | None,
     image_size: int | None,
     task_type: str | None,
+    face_file: FaceFile | None = None,
 ) -> List[Tuple[str, Dict[str, Any]]]:
     """
     (mode, payload) 조합들을 시도.
     - AILab의 실제 파라미터 스펙이 불확실할 수 있어 json/form 두 경로를 모두 지원.
+    - face_file 이 있으면 이미지를 파일로 첨부하는 multipart 한 가지 (AILab 이 URL 을 다시 받지 않음)
     """
+    if face_file is not None:
+        payload: Dict[str, Any] = {
+            k: str(v)
+            for k, v in (("hair_style", hair_style), ("color", color), ("image_size", image_size), ("task_type", task_type))
+            if v
+        }
+        payload[settings.ailab_upload_field] = face_file
+        return [("multipart", payload)]
+
     json_payload = {
         "image_url": face_url,
         "hair_style": hair_style,
@@ -76,13 +116,16 @@ def _candidate_payloads(
     ]
 
 
-def _prepare_image_for_meshy(raw_bytes: bytes) -> Image.Image:
+def _prepare_image_for_meshy(src: bytes | str | Path) -> "Image.Image":
     """
     AILab에서 받은 이미지를 Meshy에 넘기기 전에 한 번 정리하는 단계.
+    - src: 이미지 바이트 또는 파일 경로
     - 항상 RGB로 변환
     - 가장 긴 변이 MIN_SIZE_FOR_MESHY 보다 작으면 업스케일 (LANCZOS)
     """
-    img = Image.open(io.BytesIO(raw_bytes))
+    from PIL import Image   # 이미지 실행기(워커 프로세스)에서만 필요 → 서비스 기동 시 import 하지 않음
+
+    img = Image.open(io.BytesIO(src) if isinstance(src, bytes) else src)
     # 모드 통일 (예: RGBA, P 모드 등 방지)
     if img.mode not in ("RGB", "RGBA"):
         img = img.convert("RGB")
@@ -102,6 +145,65 @@ def _prepare_image_for_meshy(raw_bytes: bytes) -> Image.Image:
     return img
 
 
+def _fit_upload(data: bytes, max_side: int, quality: int) -> Tuple[Optional[bytes], str]:
+    """
+    업로드된 얼굴 이미지를 AILab 에 보낼 크기로 정리 (이미지 실행기에서 실행).
+    - 긴 변이 max_side 이하인 JPEG/PNG 이고 EXIF 회전이 없으면 (None, MIME) → 원본 그대로 전송
+    - 그 외에는 회전 반영 + 축소 후 재인코딩: 투명도가 있으면 PNG, 없으면 JPEG(quality)
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data))
+    fmt = img.format
+    rotated = img.getexif().get(0x0112, 1) != 1   # Orientation
+    if max(img.size) <= max_side and fmt in ("JPEG", "PNG") and not rotated:
+        return None, Image.MIME[fmt]
+
+    if fmt == "JPEG":
+        # JPEG 은 디코딩 단계에서 1/2·1/4·1/8 로 줄여 읽을 수 있음 (큰 사진의 디코드 시간이 대부분 사라짐)
+        img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    buf = io.BytesIO()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "image/png"
+    img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+async def prepare_upload(data: bytes, content_type: str | None) -> FaceFile:
+    """
+    /fuse 로 직접 올라온 얼굴 이미지를 AILab multipart 첨부 형식으로 변환.
+    FUSE_UPLOAD_MAX_SIDE 보다 크면 축소/재인코딩 (AILab 이 실제로 쓰는 크기 이상은 전송 낭비).
+    이미지가 아니면 AILabBadReq.
+    """
+    if settings.fuse_upload_max_side <= 0:
+        return "face", data, content_type or "application/octet-stream"
+    t0 = time.perf_counter()
+    try:
+        fitted, ctype = await run_image_job(
+            _fit_upload, data, settings.fuse_upload_max_side, settings.fuse_upload_jpeg_quality
+        )
+    except (OSError, ValueError, SyntaxError) as e:
+        # PIL.UnidentifiedImageError 는 OSError
+        raise AILabBadReq(f"invalid face image ({type(e).__name__})")
+    STAGE_IMAGE_PREP.since(t0)
+    ext = ".png" if ctype == "image/png" else ".jpg"
+    return f"face{ext}", fitted if fitted is not None else data, ctype
+
+
+def _normalize_to_png(src: bytes | str, dest: str, compress_level: int = 6) -> str:
+    """
+    _prepare_image_for_meshy + PNG 저장을 한 번에 수행 (이미지 실행기에서 실행).
+    결과 이미지 대신 경로만 돌려줘 프로세스 간 복사를 줄임.
+    이 PNG 가 마스터 (Meshy 로 보내는 무손실 원본). 휴대폰용 WebP/JPEG/썸네일은 derivatives 에서 따로 만듦.
+    compress_level: 무손실이라 화질은 같고, 낮을수록 인코딩이 빠른 대신 파일이 큼 (OUTPUT_PNG_COMPRESS_LEVEL)
+    """
+    _prepare_image_for_meshy(src).save(dest, format="PNG", compress_level=compress_level)
+    return dest
+
+
 async def _try_once(
     client: httpx.AsyncClient,
     url: str,
@@ -112,15 +214,24 @@ async def _try_once(
     """
     단일 (url, headers, mode, payload) 시도.
     성공 시 결과 이미지를 저장하고 경로 반환.
+    합성 호출은 과금될 수 있어 요청이 나가지 않은 오류와 502/503/504/429 만 재시도 (resilience.request).
     """
     if mode == "json":
-        r = await client.post(
-            url, json=payload, headers=headers, timeout=settings.request_timeout
-        )
+        body: Dict[str, Any] = {"json": payload}
+    elif mode == "multipart":
+        # 튜플 값은 파일 첨부, 나머지는 폼 필드 (같은 요청 바디에 함께 전송)
+        body = {
+            "data": {k: v for k, v in payload.items() if not isinstance(v, tuple)},
+            "files": {k: v for k, v in payload.items() if isinstance(v, tuple)},
+        }
     else:
-        r = await client.post(
-            url, data=payload, headers=headers, timeout=settings.request_timeout
-        )
+        body = {"data": payload}
+    t0 = time.perf_counter()
+    r = await request(
+        "ailab", "POST", url,
+        idempotent=False, timeout=settings.request_timeout, client=client, headers=headers, **body,
+    )
+    STAGE_AILAB_ATTEMPT.since(t0)
 
     ctype = r.headers.get("Content-Type", "")
 
@@ -129,6 +240,8 @@ async def _try_once(
         raise AILabAuthError(r.text)
     if r.status_code == 400:
         raise AILabBadReq(r.text)
+    if r.status_code in (404, 405):
+        raise AILabNotFound(f"{r.status_code}: {r.text[:200]}")
     if r.status_code >= 500:
         raise AILabError(f"Server error {r.status_code}: {r.text}")
 
@@ -136,10 +249,14 @@ async def _try_once(
     # 1) 바이너리 이미지 바로 내려오는 경우
     # -----------------------------
     if "image/" in ctype:
-        fname = OUT_DIR / f"result_{uuid.uuid4().hex}.png"
-        img = _prepare_image_for_meshy(r.content)
-        img.save(fname, format="PNG")
-        return str(fname)
+        fname = sharded(OUT_DIR, f"result_{uuid.uuid4().hex}.png")
+        t0 = time.perf_counter()
+        saved = await run_image_job(
+            _normalize_to_png, r.content, str(fname), settings.output_png_compress_level
+        )
+        STAGE_IMAGE_PREP.since(t0)
+        note_output(saved)
+        return saved
 
     # -----------------------------
     # 2) JSON 으로 URL 내려오는 경우
@@ -148,14 +265,22 @@ async def _try_once(
         data = r.json()
         for k in ("result_url", "image_url", "output_url", "url"):
             if k in data:
-                img_resp = await client.get(
-                    data[k], timeout=settings.request_timeout
-                )
-                img_resp.raise_for_status()
-                fname = OUT_DIR / f"result_{uuid.uuid4().hex}.png"
-                img = _prepare_image_for_meshy(img_resp.content)
-                img.save(fname, format="PNG")
-                return str(fname)
+                fname = sharded(OUT_DIR, f"result_{uuid.uuid4().hex}.png")
+                # 원본은 임시 파일로 스트리밍 받은 뒤 정리해서 저장
+                raw = fname.with_name(f".{fname.stem}.src")
+                await download_hedged(data[k], raw)
+                try:
+                    t0 = time.perf_counter()
+                    saved = await run_image_job(
+                        _normalize_to_png, str(raw), str(fname), settings.output_png_compress_level
+                    )
+                    STAGE_IMAGE_PREP.since(t0)
+                    note_output(saved)
+                    return saved
+                finally:
+                    raw.unlink(missing_ok=True)
+    except DeadlineExceeded:
+        raise
     except Exception:
         # JSON 파싱 실패 시 아래 예외 처리로 이동
         pass
@@ -165,23 +290,29 @@ async def _try_once(
 
 
 async def hairstyle_edit_pro(
-    face_url: str,
+    face_url: str | None,
     hair_style: str | None,
     color: str | None,
     image_size: int | None,
     task_type: str | None,
+    face_file: FaceFile | None = None,
 ) -> str:
     """
     AILabTools 헤어스타일 체인저(Pro) 호출.
     settings.effective_ailab_urls() 로 후보 엔드포인트를 가져온 다음,
     여러 헤더/페이로드 조합을 순차 시도.
+    한 번 성공한 조합은 route_cache 에 남겨 다음 호출부터 바로 사용.
+    face_file 이 있으면 face_url 대신 이미지를 multipart 로 첨부 (조합은 upload_route_cache 에 따로 보관).
     """
     if not settings.ailab_api_key:
         # dry-run: API 키가 없을 때는 최소 더미 PNG 반환
-        fname = OUT_DIR / f"dryrun_{uuid.uuid4().hex}.png"
+        from PIL import Image
+
+        fname = sharded(OUT_DIR, f"dryrun_{uuid.uuid4().hex}.png")
         Image.new("RGB", (MIN_SIZE_FOR_MESHY, MIN_SIZE_FOR_MESHY), (0, 0, 0)).save(
             fname
         )
+        note_output(fname)
         return str(fname)
 
     candidates = settings.effective_ailab_urls()
@@ -220,33 +351,111 @@ async def hairstyle_edit_pro(
 
     url_candidates = _make_url_candidates(candidates)
 
-    headers_list = _candidate_headers()
     payload_list = _candidate_payloads(
-        face_url, hair_style, color, image_size, task_type
+        face_url, hair_style, color, image_size, task_type, face_file
     )
+    cache = upload_route_cache if face_file is not None else route_cache
+    # 업스트림 동시 실행 제한 (가득 차면 QueueFull)
+    async with get_scheduler("ailab").slot():
+        return await _call_ailab(url_candidates, payload_list, cache)
+
+
+async def _call_ailab(
+    url_candidates: List[str],
+    payload_list: List[Tuple[str, Dict[str, Any]]],
+    cache: RouteCache = route_cache,
+) -> str:
+    client = get_client("ailab")
+
+    # 1) 캐시된 조합이 있으면 바로 호출, 401/404 일 때만 재탐색으로 넘어감
+    route = cache.get()
+    if route is not None:
+        result = await _try_route(client, route, payload_list, cache)
+        if result is not None:
+            return result
+
+    # 2) 탐색: 콜드 상태의 동시 요청은 하나만 탐색하고 나머지는 그 결과를 사용
+    #    잠금은 탐색에만 씀. 기다린 요청은 잠금을 놓은 뒤 찾아진 조합으로 각자 호출 (동시에 진행)
+    while True:
+        async with cache.lock:
+            route = cache.get()
+            if route is None:
+                cache.misses += 1
+                return await _discover(client, url_candidates, payload_list, cache)
+        result = await _try_route(client, route, payload_list, cache)
+        if result is not None:
+            return result
+
+
+async def _try_route(
+    client: httpx.AsyncClient,
+    route: AILabRoute,
+    payload_list: List[Tuple[str, Dict[str, Any]]],
+    cache: RouteCache = route_cache,
+) -> str | None:
+    """
+    캐시된 조합으로 1회 호출. 조합이 더 이상 유효하지 않으면(401/404) 캐시를 비우고 None.
+    그 밖의 오류(400, 5xx 등)는 조합 문제가 아니므로 그대로 올림.
+    """
+    headers = _headers_for_scheme(route.header_scheme)
+    payload = dict(payload_list).get(route.mode)
+    if headers is None or payload is None:
+        cache.invalidate()
+        return None
+    try:
+        result = await _try_once(client, route.url, headers, route.mode, payload)
+    except (AILabAuthError, AILabNotFound):
+        cache.invalidate()
+        return None
+    cache.hits += 1
+    return result
+
+
+async def _discover(
+    client: httpx.AsyncClient,
+    url_candidates: List[str],
+    payload_list: List[Tuple[str, Dict[str, Any]]],
+    cache: RouteCache = route_cache,
+) -> str:
+    """
+    여러 URL/헤더/페이로드 조합을 순차 시도하고, 성공한 조합을 캐시에 기록.
+    """
+    headers_list = _candidate_headers()
 
     errors: list[str] = []
-    async with httpx.AsyncClient() as client:
-        for url in url_candidates:
-            for headers in headers_list:
-                for mode, payload in payload_list:
-                    try:
-                        return await _try_once(client, url, headers, mode, payload)
-                    except AILabAuthError:
-                        errors.append(
-                            f"{url} -> 401 Unauthorized (headers={list(headers.keys())})"
-                        )
-                        break
-                    except AILabBadReq as e:
-                        errors.append(
-                            f"{url} -> 400 Bad Request (mode={mode}): {str(e)[:120]}"
-                        )
-                        continue
-                    except AILabError as e:
-                        errors.append(f"{url} -> {str(e)[:160]}")
-                        continue
-                    except Exception as e:
-                        errors.append(f"{url} -> Unexpected: {repr(e)[:160]}")
-                        continue
+    for url in url_candidates:
+        url_missing = False
+        for headers in headers_list:
+            if url_missing:
+                break
+            for mode, payload in payload_list:
+                try:
+                    result = await _try_once(client, url, headers, mode, payload)
+                    cache.set(url, _header_scheme(headers), mode)
+                    return result
+                except (QueueFull, DeadlineExceeded):
+                    # 서킷 열림 / 마감 초과 → 다른 후보를 더 시도해도 소용없음
+                    raise
+                except AILabNotFound as e:
+                    # 경로 자체가 없으면 다른 헤더/모드로 시도할 필요 없음
+                    errors.append(f"{url} -> {str(e)[:160]}")
+                    url_missing = True
+                    break
+                except AILabAuthError:
+                    errors.append(
+                        f"{url} -> 401 Unauthorized (headers={list(headers.keys())})"
+                    )
+                    break
+                except AILabBadReq as e:
+                    errors.append(
+                        f"{url} -> 400 Bad Request (mode={mode}): {str(e)[:120]}"
+                    )
+                    continue
+                except AILabError as e:
+                    errors.append(f"{url} -> {str(e)[:160]}")
+                    continue
+                except Exception as e:
+                    errors.append(f"{url} -> Unexpected: {repr(e)[:160]}")
+                    continue
 
     raise AILabError("All candidates failed.\n" + "\n".join(errors))
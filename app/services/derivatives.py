@@ -0,0 +1,203 @@
+from __future__ import annotations
+# hairfusion-service/app/services/derivatives.py
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.settings import settings
+from app.services.metrics import STAGE_SECONDS, counter
+from app.services.singleflight import SingleFlight
+
+# 합성 결과 이미지의 파생본 (마스터 옆에 저장, /static 으로 서빙)
+#   마스터 : outputs/.../<stem>.png  (Meshy 로 보내는 원본, 무손실 PNG)
+#   파생본 : outputs/.../<stem>.w512.webp, <stem>.full.jpg ...
+# 요청: /static/<마스터 경로>?format=webp&w=512 → 없으면 그 자리에서 만들고 이후에는 파일 그대로 서빙
+FORMATS: Dict[str, Tuple[str, str]] = {   # format → (확장자, PIL 포맷)
+    "webp": (".webp", "WEBP"),
+    "jpeg": (".jpg", "JPEG"),
+    "png": (".png", "PNG"),
+}
+FORMAT_ALIASES = {"jpg": "jpeg"}
+# 파생본을 만들 수 있는 마스터 확장자
+MASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+STAGE_DERIVATIVE = STAGE_SECONDS.labels("derivative")
+DERIVATIVE_BYTES = counter(
+    "hairfusion_derivative_bytes_total",
+    "Bytes written for fused-image derivatives, by format",
+    ("format",),
+)
+DERIVATIVES = counter(
+    "hairfusion_derivatives_total",
+    "Derivative lookups, by how they were satisfied (hit, made, coalesced)",
+    ("outcome",),
+)
+
+
+class DerivativeError(ValueError):
+    ...
+
+
+def allowed_widths() -> Set[int]:
+    return {int(w) for w in settings.output_widths.split(",") if w.strip()}
+
+
+def parse(fmt: str | None, width: str | int | None) -> Tuple[str, Optional[int]]:
+    """?format= / ?w= 검증. 폭은 OUTPUT_WIDTHS 에 있는 값만 (임의 크기로 디스크를 채우지 못하도록)"""
+    fmt = FORMAT_ALIASES.get((fmt or "").lower(), (fmt or "").lower()) or "png"
+    if fmt not in FORMATS:
+        raise DerivativeError(f"unsupported format: {fmt} (use {', '.join(FORMATS)})")
+    if width in (None, ""):
+        return fmt, None
+    try:
+        w = int(width)
+    except (TypeError, ValueError):
+        raise DerivativeError(f"invalid width: {width}")
+    if w not in allowed_widths():
+        raise DerivativeError(f"width not allowed: {w} (use {settings.output_widths})")
+    return fmt, w
+
+
+def parse_spec(spec: str) -> Tuple[str, Optional[int]]:
+    """OUTPUT_DERIVATIVES 항목 ("webp@512", "jpeg") → (format, width)"""
+    fmt, _, width = spec.strip().partition("@")
+    return parse(fmt, width or None)
+
+
+def eager_specs() -> List[Tuple[str, Optional[int]]]:
+    return [parse_spec(s) for s in settings.output_derivatives.split(",") if s.strip()]
+
+
+def derivative_path(master: str | Path, fmt: str, width: Optional[int]) -> Path:
+    master = Path(master)
+    ext = FORMATS[fmt][0]
+    if width is None and ext == master.suffix.lower():
+        return master
+    return master.with_name(f"{master.stem}.{f'w{width}' if width else 'full'}{ext}")
+
+
+def derivative_url(master: str | Path, fmt: str, width: Optional[int]) -> str:
+    """마스터(outputs/ 아래 경로) 기준 /static URL"""
+    rel = Path(master).relative_to("outputs").as_posix()
+    return f"/static/{rel}?format={fmt}" + (f"&w={width}" if width else "")
+
+
+def derivative_urls(master: str | Path) -> Dict[str, str]:
+    """OUTPUT_DERIVATIVES 에 지정된 파생본 URL ("webp@512" → URL). outputs/ 밖의 경로면 빈 dict."""
+    try:
+        Path(master).relative_to("outputs")
+    except ValueError:
+        return {}
+    out = {}
+    for fmt, width in eager_specs():
+        out[f"{fmt}@{width}" if width else fmt] = derivative_url(master, fmt, width)
+    return out
+
+
+def derivative_files(master: str | Path) -> List[Path]:
+    """디스크에 있는 마스터의 파생본 (<stem>.w*.* / <stem>.full.*)"""
+    master = Path(master)
+    out = []
+    for p in master.parent.glob(f"{master.stem}.*"):
+        middle = p.name[len(master.stem) + 1:].split(".", 1)[0]
+        if p != master and (middle == "full" or (middle[:1] == "w" and middle[1:].isdigit())):
+            out.append(p)
+    return out
+
+
+def remove_derivatives(master: str | Path) -> None:
+    """마스터를 지울 때 함께 지움"""
+    for p in derivative_files(master):
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+# -----------------------------
+# 인코딩 (이미지 실행기에서 실행)
+# -----------------------------
+def encode_derivative(src: str, dest: str, fmt: str, width: Optional[int], quality: int) -> int:
+    """
+    src 를 fmt(+폭 width 로 축소)로 인코딩해 dest 에 원자적으로 저장. 반환: 바이트 수.
+    quality: WebP/JPEG 품질, PNG 면 compress_level.
+    마스터보다 큰 폭은 늘리지 않고 원래 크기로 인코딩.
+    """
+    from PIL import Image
+
+    pil_format = FORMATS[fmt][1]
+    with Image.open(src) as img:
+        if width and width < img.width:
+            height = max(round(img.height * width / img.width), 1)
+            img = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        else:
+            img.load()
+        if pil_format == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+        if pil_format == "WEBP":
+            params = {"quality": quality, "method": 4}
+        elif pil_format == "JPEG":
+            params = {"quality": quality, "optimize": True, "progressive": True}
+        else:
+            params = {"compress_level": quality}
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        img.save(tmp, format=pil_format, **params)
+    os.replace(tmp, dest)
+    return os.path.getsize(dest)
+
+
+def _quality(fmt: str) -> int:
+    return {
+        "webp": settings.output_webp_quality,
+        "jpeg": settings.output_jpeg_quality,
+        "png": settings.output_png_compress_level,
+    }[fmt]
+
+
+_flight = SingleFlight()
+
+
+async def ensure_derivative(master: str | Path, fmt: str, width: Optional[int]) -> Path:
+    """파생본 경로 반환 (없으면 만듦, 같은 파생본을 동시에 요청하면 한 번만 인코딩)"""
+    from app.services.imaging import run_image_job
+
+    dest = derivative_path(master, fmt, width)
+    if dest.exists():
+        DERIVATIVES.labels("hit").inc()
+        return dest
+
+    async def _make() -> Path:
+        t0 = time.perf_counter()
+        size = await run_image_job(encode_derivative, str(master), str(dest), fmt, width, _quality(fmt))
+        STAGE_DERIVATIVE.since(t0)
+        DERIVATIVE_BYTES.labels(fmt).inc(size)
+        return dest
+
+    _, joined = await _flight.do(str(dest), _make)
+    DERIVATIVES.labels("coalesced" if joined else "made").inc()
+    return dest
+
+
+_eager_tasks: Set[asyncio.Task] = set()
+
+
+async def _make_eager(master: str) -> None:
+    for fmt, width in eager_specs():
+        try:
+            await ensure_derivative(master, fmt, width)
+        except Exception:
+            pass   # 요청 시점에 다시 시도됨
+
+
+def schedule_eager(master: str | Path) -> None:
+    """
+    OUTPUT_DERIVATIVES 파생본을 백그라운드에서 미리 만듦 (응답을 기다리게 하지 않음).
+    아직 만드는 중에 요청이 오면 ensure_derivative 의 single-flight 로 합류.
+    """
+    if not settings.output_derivatives.strip():
+        return
+    task = asyncio.get_running_loop().create_task(_make_eager(str(master)))
+    _eager_tasks.add(task)
+    task.add_done_callback(_eager_tasks.discard)
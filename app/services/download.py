@@ -0,0 +1,247 @@
+from __future__ import annotations
+# hairfusion-service/app/services/download.py
+import asyncio
+import hashlib
+import ipaddress
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from app.settings import settings
+from app.services.http import get_client
+from app.services.metrics import DOWNLOADED, STAGE_DISK_WRITE
+
+
+class DownloadError(Exception):
+    ...
+
+
+class BlockedURL(DownloadError):
+    """클라이언트가 준 URL 이 내부(사설/루프백/링크로컬) 주소를 가리킴"""
+
+
+class DownloadTooLarge(DownloadError):
+    ...
+
+
+@dataclass
+class DownloadResult:
+    path: Path
+    size: int
+
+
+# 이벤트 루프별 동시 다운로드 제한
+_sems: Dict[int, asyncio.Semaphore] = {}
+
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _sems.get(id(loop))
+    if sem is None:
+        sem = _sems[id(loop)] = asyncio.Semaphore(max(settings.download_concurrency, 1))
+    return sem
+
+
+def total_from(r: httpx.Response, offset: int) -> Optional[int]:
+    """
+    응답 헤더로 본 전체 크기 (offset 부터 이어받는 중이면 그만큼 더함). 알 수 없으면 None.
+    206: "Content-Range: bytes 100-999/1000" → 1000 / 200: Content-Length
+    """
+    cr = r.headers.get("Content-Range", "")
+    if "/" in cr:
+        tail = cr.rsplit("/", 1)[1].strip()
+        return int(tail) if tail.isdigit() else None
+    cl = r.headers.get("Content-Length")
+    return offset + int(cl) if cl and cl.isdigit() else None
+
+
+async def download_to_file(
+    url: str,
+    dest: Path,
+    *,
+    client: httpx.AsyncClient | None = None,
+    max_resumes: int | None = None,
+) -> DownloadResult:
+    """
+    url 을 메모리에 통째로 올리지 않고 청크 단위로 dest 에 저장.
+    - <dest>.<rand>.part 임시 파일에 쓰고, 끝나면 원자적으로 rename
+    - 전송 중 연결이 끊기면 Range 요청으로 이어받기 (서버가 무시하면 처음부터)
+    - 크기(Content-Length/Content-Range) 검증 (내용 체크섬은 업스트림이 주지 않으므로 하지 않음)
+    - 파일 쓰기는 스레드에서 수행해 이벤트 루프를 막지 않음
+    """
+    client = client or get_client("download")
+    max_resumes = settings.download_max_resumes if max_resumes is None else max_resumes
+    chunk_size = max(settings.download_chunk_size, 64 * 1024)
+
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:8]}.part")
+
+    async with _semaphore():
+        offset = 0
+        total: Optional[int] = None
+        attempts = 0
+        write_seconds = 0.0
+        f = await asyncio.to_thread(open, tmp, "wb")
+
+        def _sink(chunk: bytes) -> None:
+            nonlocal write_seconds
+            t0 = time.perf_counter()
+            f.write(chunk)
+            write_seconds += time.perf_counter() - t0
+
+        def _restart() -> None:
+            f.seek(0)
+            f.truncate()
+
+        try:
+            while True:
+                headers = {"Range": f"bytes={offset}-"} if offset else {}
+                # 받은 바이트는 chunk_size 만큼 모아서 한 번에 기록 (스레드 왕복 최소화)
+                buf = bytearray()
+                try:
+                    async with client.stream("GET", url, headers=headers) as r:
+                        if offset and r.status_code == 200:
+                            # Range 미지원 → 처음부터 다시
+                            await asyncio.to_thread(_restart)
+                            offset = 0
+                        elif r.status_code not in (200, 206):
+                            raise DownloadError(f"GET {url} -> {r.status_code}")
+                        if r.headers.get("Content-Encoding", "identity") == "identity":
+                            total = total_from(r, offset) or total
+
+                        async for chunk in r.aiter_bytes():
+                            buf += chunk
+                            if len(buf) >= chunk_size:
+                                await asyncio.to_thread(_sink, bytes(buf))
+                                offset += len(buf)
+                                buf.clear()
+                    if buf:
+                        await asyncio.to_thread(_sink, bytes(buf))
+                        offset += len(buf)
+                    break
+                except httpx.TransportError as e:
+                    # 끊기기 전까지 받은 부분은 유효 → 기록 후 그 지점부터 이어받기
+                    if buf:
+                        await asyncio.to_thread(_sink, bytes(buf))
+                        offset += len(buf)
+                    attempts += 1
+                    if attempts > max_resumes:
+                        raise DownloadError(f"GET {url} failed after {attempts} attempts: {e!r}")
+                    await asyncio.sleep(min(0.5 * attempts, 5.0))
+
+            await asyncio.to_thread(f.close)
+            if total is not None and offset != total:
+                raise DownloadError(f"size mismatch for {url}: got {offset}, expected {total}")
+            await asyncio.to_thread(os.replace, tmp, dest)
+            STAGE_DISK_WRITE.observe(write_seconds)
+            DOWNLOADED.inc(offset)
+        except BaseException:
+            if not f.closed:
+                f.close()
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            raise
+
+    return DownloadResult(path=dest, size=offset)
+
+
+# -----------------------------
+# 클라이언트가 준 URL 을 서버가 직접 받을 때 (얼굴 이미지 캐시 키, Meshy 입력 digest)
+# -----------------------------
+def _is_public(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_url(url: str) -> None:
+    """
+    http(s) 이고 호스트가 공인 주소로만 풀리는지 확인 (SSRF 방지). 아니면 BlockedURL.
+    (리다이렉트는 따라가지 않으므로 최종 목적지도 이 호스트)
+    """
+    u = httpx.URL(url)
+    if u.scheme not in ("http", "https") or not u.host:
+        raise BlockedURL(f"unsupported url: {url[:200]}")
+    if settings.download_allow_private:
+        return
+    port = u.port or (443 if u.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(u.host, port, type=socket.SOCK_STREAM)
+    except OSError as e:
+        raise BlockedURL(f"cannot resolve {u.host}: {e}")
+    for *_, sockaddr in infos:
+        ip = ipaddress.ip_address(str(sockaddr[0]).split("%", 1)[0])
+        if not _is_public(ip):
+            raise BlockedURL(f"{u.host} resolves to non-public address {ip}")
+
+
+async def _stream_capped(
+    url: str, max_bytes: int, sink: Callable[[bytes], None], client: httpx.AsyncClient | None = None
+) -> int:
+    await check_public_url(url)
+    client = client or get_client("download")
+    size = 0
+    async with client.stream("GET", url) as r:
+        if r.status_code != 200:
+            raise DownloadError(f"GET {url} -> {r.status_code}")
+        length = r.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise DownloadTooLarge(f"{url} is {length} bytes (max {max_bytes})")
+        async for chunk in r.aiter_bytes():
+            size += len(chunk)
+            if size > max_bytes:
+                # Content-Length 가 없거나 틀려도 한도에서 끊음
+                raise DownloadTooLarge(f"{url} exceeds {max_bytes} bytes")
+            sink(chunk)
+    DOWNLOADED.inc(size)
+    return size
+
+
+async def fetch_bytes(url: str, max_bytes: int, *, client: httpx.AsyncClient | None = None) -> bytes:
+    """
+    클라이언트가 준 URL 을 메모리로 받기 (max_bytes 이하의 작은 입력용).
+    내부 주소면 BlockedURL, 한도를 넘으면 DownloadTooLarge, 200 이 아니면 DownloadError
+    """
+    buf = bytearray()
+    await _stream_capped(url, max_bytes, buf.extend, client)
+    return bytes(buf)
+
+
+async def sha256_of(url: str, max_bytes: int, *, client: httpx.AsyncClient | None = None) -> str:
+    """fetch_bytes 와 같은 제한으로 받으면서 본문은 보관하지 않고 sha256 만 계산"""
+    h = hashlib.sha256()
+    await _stream_capped(url, max_bytes, h.update, client)
+    return h.hexdigest()
+
+
+async def download_hedged(url: str, dest: Path) -> DownloadResult:
+    """
+    작은 결과물(합성 이미지 등)용: HEDGE_DELAY 안에 끝나지 않으면 같은 URL 을 한 번 더 받기 시작해
+    먼저 끝난 쪽을 쓰고 나머지는 취소. 앞 시도가 실패하면 곧바로 다음 시도 (재시도 겸용).
+    요청 마감(X-Request-Timeout)이 있으면 그 안에서만 기다림.
+    """
+    from app.services.resilience import hedged, within_deadline
+
+    dest = Path(dest)
+    attempts = max(settings.hedge_max_attempts, 1)
+
+    async def attempt(i: int) -> DownloadResult:
+        return await download_to_file(url, dest.with_name(f"{dest.name}.h{i}"))
+
+    try:
+        res = await within_deadline(hedged(attempt, settings.hedge_delay, attempts))
+        await asyncio.to_thread(os.replace, res.path, dest)
+        return DownloadResult(path=dest, size=res.size)
+    finally:
+        # 거의 동시에 끝난 시도가 남긴 파일 정리
+        for i in range(attempts):
+            dest.with_name(f"{dest.name}.h{i}").unlink(missing_ok=True)
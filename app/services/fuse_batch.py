@@ -0,0 +1,84 @@
+from __future__ import annotations
+# hairfusion-service/app/services/fuse_batch.py
+import asyncio
+from typing import Any, AsyncIterator, Dict, List
+
+from app.settings import settings
+from app.services.ailabtools import AILabAuthError, AILabBadReq, AILabError
+from app.services.derivatives import derivative_urls
+from app.services.fuse_cache import _fetch_face, cached_hairstyle_edit
+from app.services.resilience import DeadlineExceeded
+from app.services.scheduler import QueueFull
+
+
+def _error_status(exc: BaseException) -> int:
+    if isinstance(exc, QueueFull):
+        return 503
+    if isinstance(exc, DeadlineExceeded):
+        return 504
+    if isinstance(exc, AILabAuthError):
+        return 401
+    if isinstance(exc, AILabBadReq):
+        return 400
+    if isinstance(exc, AILabError):
+        return 502
+    return 500
+
+
+async def fuse_batch(
+    face_url: str,
+    variants: List[Dict[str, Any]],
+    task_type: str | None = "sync",
+    concurrency: int | None = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    얼굴 하나 + 여러 (hair_style, color, image_size) 변형을 동시에 합성하고, 끝나는 순서대로 결과를 내보냄.
+    - 얼굴 이미지는 한 번만 받아서 모든 변형의 캐시 키 계산에 재사용 (실패하면 모든 변형이 캐시 없이 진행)
+    - AILab 경로 탐색은 route_cache 가 공유되므로 첫 변형 하나만 수행
+    - 변형별 실패는 {"ok": False, "status", "error"} 로 보고하고 나머지는 계속 진행
+    - 마지막에 {"done": True, "ok": n, "failed": m} 요약을 내보냄
+    """
+    limit = asyncio.Semaphore(max(concurrency or settings.fuse_batch_concurrency, 1))
+
+    face: bytes | None = None
+    use_cache = True
+    if settings.fuse_cache_enabled and settings.ailab_api_key:
+        try:
+            face = await _fetch_face(face_url)
+        except Exception:
+            use_cache = False   # 변형마다 다시 받지 않고 곧바로 bypass (AILab 이 URL 로 직접 받음)
+
+    async def _one(index: int, variant: Dict[str, Any]) -> Dict[str, Any]:
+        async with limit:
+            try:
+                saved, cache = await cached_hairstyle_edit(
+                    face_url=face_url,
+                    hair_style=variant.get("hair_style"),
+                    color=variant.get("color"),
+                    image_size=variant.get("image_size"),
+                    task_type=task_type,
+                    face=face,
+                    use_cache=use_cache,
+                )
+            except Exception as e:
+                out = {"index": index, **variant, "ok": False, "status": _error_status(e), "error": str(e)[:400]}
+                if isinstance(e, QueueFull):
+                    out["retry_after"] = e.retry_after
+                return out
+        return {
+            "index": index, **variant, "ok": True, "saved_path": saved, "cache": cache,
+            "derivatives": derivative_urls(saved),
+        }
+
+    tasks = [asyncio.create_task(_one(i, v)) for i, v in enumerate(variants)]
+    ok = 0
+    try:
+        for fut in asyncio.as_completed(tasks):
+            result = await fut
+            ok += result["ok"]
+            yield result
+    finally:
+        # 클라이언트가 스트림 도중 끊으면 남은 변형은 취소
+        for t in tasks:
+            t.cancel()
+    yield {"done": True, "ok": ok, "failed": len(variants) - ok}
@@ -0,0 +1,186 @@
+from __future__ import annotations
+# hairfusion-service/app/services/fuse_cache.py
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.settings import settings
+from app.services.ailabtools import hairstyle_edit_pro, prepare_upload
+from app.services.derivatives import remove_derivatives, schedule_eager
+from app.services.download import fetch_bytes
+from app.services.singleflight import SingleFlight
+
+
+class FuseCache:
+    """
+    /fuse 결과의 내용 주소(content-addressed) 캐시.
+    - key = sha256(얼굴 이미지 바이트 + FuseReq 파라미터)
+    - 결과는 <dir>/<key>.png 로 저장 (같은 입력이면 같은 파일)
+    - 총 용량이 max_bytes 를 넘으면 가장 오래 안 쓰인 것부터 삭제 (LRU, mtime 으로 영속)
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.dir = Path(directory)
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()   # key → size (앞쪽이 오래된 것)
+        self._bytes = 0
+        self._loaded = False
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _load(self) -> None:
+        self._loaded = True
+        self.dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for p in self.dir.glob("*.png"):
+            if "." in p.stem:
+                continue   # 파생본 (<key>.w512.png 등) 은 마스터에 딸린 파일
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    def path_for(self, key: str) -> Path:
+        return self.dir / f"{key}.png"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        if not self._loaded:
+            self._load()
+        if key not in self._index:
+            return None
+        p = self.path_for(key)
+        if not p.exists():
+            self._bytes -= self._index.pop(key)
+            return None
+        self._index.move_to_end(key)
+        try:
+            os.utime(p)   # 재시작 후에도 LRU 순서 유지
+        except OSError:
+            pass
+        return p
+
+    def store(self, key: str, produced: Path) -> Path:
+        if not self._loaded:
+            self._load()
+        dest = self.path_for(key)
+        os.replace(produced, dest)
+        size = dest.stat().st_size
+        self._bytes += size - self._index.pop(key, 0)
+        self._index[key] = size
+        self._evict()
+        return dest
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                self.path_for(key).unlink()
+            except OSError:
+                pass
+            remove_derivatives(self.path_for(key))
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._loaded:
+            self._load()
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self.flight),
+        }
+
+
+fuse_cache = FuseCache(settings.fuse_cache_dir, settings.fuse_cache_max_bytes)
+
+
+def cache_key(face_bytes: bytes, params: Dict[str, Any]) -> str:
+    h = hashlib.sha256(face_bytes)
+    h.update(json.dumps(params, sort_keys=True, separators=(",", ":")).encode())
+    return h.hexdigest()
+
+
+async def _fetch_face(face_url: str) -> bytes:
+    """
+    캐시 키용 얼굴 이미지. 업로드와 같은 한도(FUSE_UPLOAD_MAX_BYTES), 내부 주소 거부.
+    실패하면(거부/초과 포함) 호출 측은 캐시 없이 URL 을 그대로 AILab 에 넘김
+    """
+    return await fetch_bytes(face_url, settings.fuse_upload_max_bytes)
+
+
+async def cached_hairstyle_edit(
+    face_url: str | None,
+    hair_style: str | None,
+    color: str | None,
+    image_size: int | None,
+    task_type: str | None,
+    face: bytes | None = None,
+    face_type: str | None = None,
+    use_cache: bool = True,
+) -> Tuple[str, str]:
+    """
+    hairstyle_edit_pro 앞단의 캐시 + single-flight.
+    (저장 경로, "hit" | "miss" | "coalesced" | "bypass") 반환.
+    얼굴 이미지를 가져오지 못하면 캐시 없이 기존 경로로 호출.
+    face: 이미 받아 둔 얼굴 이미지 바이트 (배치처럼 같은 얼굴을 여러 번 쓸 때 재다운로드 방지)
+    face_url 이 None 이면 face 는 클라이언트가 직접 올린 이미지 (face_type 은 그 Content-Type).
+    캐시 미스일 때만 축소/재인코딩해서 AILab 에 파일로 첨부. 캐시 키는 원본 바이트 기준이라
+    같은 이미지를 URL 로 보낸 요청과 결과를 공유함.
+    use_cache=False 면 얼굴 이미지를 받지 않고 바로 bypass (배치에서 이미 받기에 실패한 경우)
+    """
+    params = {"hair_style": hair_style, "color": color, "image_size": image_size, "task_type": task_type}
+
+    async def _produce() -> str:
+        if face_url is None:
+            face_file = await prepare_upload(face, face_type)
+            return await hairstyle_edit_pro(face_url=None, face_file=face_file, **params)
+        return await hairstyle_edit_pro(face_url=face_url, **params)
+
+    async def _bypass() -> Tuple[str, str]:
+        saved = await _produce()
+        schedule_eager(saved)
+        return saved, "bypass"
+
+    # dry-run(키 없음) 이나 캐시 비활성화 시에는 그대로 통과
+    if not use_cache or not settings.fuse_cache_enabled or not settings.ailab_api_key:
+        return await _bypass()
+
+    if face is None:
+        try:
+            face = await _fetch_face(face_url)
+        except Exception:
+            return await _bypass()
+
+    key = cache_key(face, params)
+    hit = fuse_cache.lookup(key)
+    if hit is not None:
+        fuse_cache.hits += 1
+        return str(hit), "hit"
+
+    async def _produce_and_store() -> str:
+        fuse_cache.misses += 1
+        saved = str(fuse_cache.store(key, Path(await _produce())))
+        schedule_eager(saved)
+        return saved
+
+    saved, joined = await fuse_cache.flight.do(key, _produce_and_store)
+    if joined:
+        fuse_cache.coalesced += 1
+        return saved, "coalesced"
+    return saved, "miss"
@@ -0,0 +1,364 @@
+from __future__ import annotations
+# hairfusion-service/app/services/glb_optimize.py
+import io
+import json
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.settings import settings
+from app.services.metrics import STAGE_SECONDS, counter, histogram
+
+GLB_MAGIC = 0x46546C67      # b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# accessor componentType
+FLOAT = 5126
+BYTE = 5120
+UNSIGNED_BYTE = 5121
+UNSIGNED_SHORT = 5123
+
+_NUM_COMPONENTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4}
+
+# 이미 압축된 지오메트리는 건드리지 않음
+_SKIP_EXTENSIONS = {"KHR_draco_mesh_compression", "EXT_meshopt_compression"}
+
+PREVIEW_SUFFIX = ".preview"
+
+STAGE_GLB_PREVIEW = STAGE_SECONDS.labels("glb_preview")
+GLB_BYTES = counter(
+    "hairfusion_glb_bytes_total",
+    "Bytes of GLB models written, by variant (full vs preview)",
+    ("variant",),
+)
+GLB_PREVIEW_RATIO = histogram(
+    "hairfusion_glb_preview_ratio",
+    "Preview GLB size divided by full GLB size",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+).labels()
+
+
+class GLBError(Exception):
+    ...
+
+
+# -----------------------------
+# GLB 컨테이너 읽기/쓰기
+# -----------------------------
+def read_glb(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    if len(data) < 20:
+        raise GLBError("file too short")
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise GLBError("not a glTF 2.0 binary")
+    gltf: Optional[Dict[str, Any]] = None
+    bin_chunk = b""
+    offset = 12
+    while offset + 8 <= min(length, len(data)):
+        chunk_len, chunk_type = struct.unpack_from("<II", data, offset)
+        body = data[offset + 8 : offset + 8 + chunk_len]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(body.decode("utf-8"))
+        elif chunk_type == CHUNK_BIN and not bin_chunk:
+            bin_chunk = bytes(body)
+        offset += 8 + chunk_len
+    if gltf is None:
+        raise GLBError("missing JSON chunk")
+    return gltf, bin_chunk
+
+
+def _pad(b: bytes, fill: bytes) -> bytes:
+    return b + fill * (-len(b) % 4)
+
+
+def write_glb(gltf: Dict[str, Any], bin_chunk: bytes) -> bytes:
+    js = _pad(json.dumps(gltf, separators=(",", ":")).encode("utf-8"), b" ")
+    out = [struct.pack("<II", len(js), CHUNK_JSON), js]
+    if bin_chunk:
+        bn = _pad(bin_chunk, b"\0")
+        out += [struct.pack("<II", len(bn), CHUNK_BIN), bn]
+    body = b"".join(out)
+    return struct.pack("<III", GLB_MAGIC, 2, 12 + len(body)) + body
+
+
+# -----------------------------
+# 버퍼 조립
+# -----------------------------
+class _Builder:
+    """원본 bufferView 는 그대로 두고, 새로 만든 데이터는 뒤에 bufferView 로 추가"""
+
+    def __init__(self, gltf: Dict[str, Any], bin_chunk: bytes) -> None:
+        self.gltf = gltf
+        self.bin = bin_chunk
+        self.views: List[Dict[str, Any]] = gltf.setdefault("bufferViews", [])
+        self.extra: Dict[int, bytes] = {}
+
+    def view_bytes(self, index: int) -> bytes:
+        if index in self.extra:
+            return self.extra[index]
+        v = self.views[index]
+        start = v.get("byteOffset", 0)
+        end = start + v["byteLength"]
+        if v.get("buffer", 0) != 0 or end > len(self.bin):
+            raise GLBError(f"bufferView {index} out of range")
+        return self.bin[start:end]
+
+    def add_view(self, data: bytes, stride: Optional[int] = None, target: Optional[int] = None) -> int:
+        view: Dict[str, Any] = {"buffer": 0, "byteLength": len(data)}
+        if stride:
+            view["byteStride"] = stride
+        if target:
+            view["target"] = target
+        self.views.append(view)
+        index = len(self.views) - 1
+        self.extra[index] = data
+        return index
+
+    def repack(self) -> bytes:
+        """참조되는 bufferView 만 4바이트 정렬로 다시 이어 붙이고 인덱스를 재매핑"""
+        used: set[int] = set()
+        for acc in self.gltf.get("accessors", []):
+            if "bufferView" in acc:
+                used.add(acc["bufferView"])
+            sparse = acc.get("sparse")
+            if sparse:
+                used.add(sparse["indices"]["bufferView"])
+                used.add(sparse["values"]["bufferView"])
+        for img in self.gltf.get("images", []):
+            if "bufferView" in img:
+                used.add(img["bufferView"])
+
+        remap: Dict[int, int] = {}
+        new_views: List[Dict[str, Any]] = []
+        out = bytearray()
+        for old in sorted(used):
+            data = self.view_bytes(old)
+            out += b"\0" * (-len(out) % 4)
+            view = dict(self.views[old])
+            view["buffer"] = 0
+            view["byteOffset"] = len(out)
+            view["byteLength"] = len(data)
+            out += data
+            remap[old] = len(new_views)
+            new_views.append(view)
+
+        for acc in self.gltf.get("accessors", []):
+            if "bufferView" in acc:
+                acc["bufferView"] = remap[acc["bufferView"]]
+            sparse = acc.get("sparse")
+            if sparse:
+                sparse["indices"]["bufferView"] = remap[sparse["indices"]["bufferView"]]
+                sparse["values"]["bufferView"] = remap[sparse["values"]["bufferView"]]
+        for img in self.gltf.get("images", []):
+            if "bufferView" in img:
+                img["bufferView"] = remap[img["bufferView"]]
+
+        self.gltf["bufferViews"] = new_views
+        self.gltf["buffers"] = [{"byteLength": len(out)}] if out else []
+        return bytes(out)
+
+
+# -----------------------------
+# 텍스처
+# -----------------------------
+def _reencode_image(data: bytes, max_size: int, jpeg_quality: int) -> Optional[Tuple[bytes, str]]:
+    """긴 변을 max_size 로 줄이고, 투명도가 없으면 JPEG 로 재인코딩. 이득이 없으면 None"""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    resized = False
+    if max(img.size) > max_size:
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        resized = True
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    if has_alpha and img.convert("RGBA").getextrema()[3][0] == 255:
+        has_alpha = False   # 알파 채널은 있지만 전부 불투명
+
+    buf = io.BytesIO()
+    if has_alpha:
+        img.convert("RGBA").save(buf, format="PNG", optimize=True)
+        mime = "image/png"
+    else:
+        img.convert("RGB").save(buf, format="JPEG", quality=jpeg_quality, optimize=True, progressive=True)
+        mime = "image/jpeg"
+    out = buf.getvalue()
+    if not resized and len(out) >= len(data):
+        return None
+    return out, mime
+
+
+# -----------------------------
+# 정점 속성 양자화 (KHR_mesh_quantization)
+# -----------------------------
+def _read_floats(b: _Builder, acc: Dict[str, Any]) -> List[float]:
+    n = _NUM_COMPONENTS[acc["type"]]
+    count = acc["count"]
+    view = b.views[acc["bufferView"]]
+    data = b.view_bytes(acc["bufferView"])
+    offset = acc.get("byteOffset", 0)
+    stride = view.get("byteStride") or 4 * n
+    if offset + stride * (count - 1) + 4 * n > len(data):
+        raise GLBError("accessor out of range")
+    if stride == 4 * n and sys.byteorder == "little":
+        return memoryview(data)[offset : offset + 4 * n * count].cast("f").tolist()
+    fmt = "<" + "f" * n
+    out: List[float] = []
+    for i in range(count):
+        out.extend(struct.unpack_from(fmt, data, offset + i * stride))
+    return out
+
+
+def _pack(values: List[float], n: int, padded: int, typecode: str, scale: float, lo: float, hi: float) -> bytes:
+    """n 성분 값을 padded 성분 간격으로 정수화 (남는 칸은 0)"""
+    q = [round(min(max(v, lo), hi) * scale) for v in values]
+    if padded != n:
+        out = [0] * (len(q) // n * padded)
+        for c in range(n):
+            out[c::padded] = q[c::n]
+        q = out
+    arr = array(typecode, q)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _quantize_accessor(b: _Builder, acc: Dict[str, Any], semantic: str) -> bool:
+    if acc.get("componentType") != FLOAT or "bufferView" not in acc or acc.get("sparse"):
+        return False
+    n = _NUM_COMPONENTS.get(acc["type"], 0)
+
+    if semantic == "NORMAL" and n == 3:
+        # BYTE 정규화, VEC3 → 4바이트 간격 (bufferView stride 는 4의 배수여야 함)
+        data, ctype, stride = _pack(_read_floats(b, acc), 3, 4, "b", 127.0, -1.0, 1.0), BYTE, 4
+    elif semantic == "TANGENT" and n == 4:
+        data, ctype, stride = _pack(_read_floats(b, acc), 4, 4, "b", 127.0, -1.0, 1.0), BYTE, 4
+    elif semantic.startswith("TEXCOORD_") and n == 2:
+        values = _read_floats(b, acc)
+        if values and (min(values) < 0.0 or max(values) > 1.0):
+            return False   # 타일링 UV 는 정규화 범위 밖 → 그대로 둠
+        data, ctype, stride = _pack(values, 2, 2, "H", 65535.0, 0.0, 1.0), UNSIGNED_SHORT, 4
+    elif semantic.startswith("COLOR_") and n in (3, 4):
+        data, ctype, stride = _pack(_read_floats(b, acc), n, 4, "B", 255.0, 0.0, 1.0), UNSIGNED_BYTE, 4
+    else:
+        # POSITION 은 노드 변환으로 역양자화해야 해서 제외 (인스턴싱된 메시와 충돌)
+        return False
+
+    acc["bufferView"] = b.add_view(data, stride=stride, target=34962)
+    acc["byteOffset"] = 0
+    acc["componentType"] = ctype
+    acc["normalized"] = True
+    acc.pop("min", None)
+    acc.pop("max", None)
+    return True
+
+
+def optimize_glb(
+    src: str,
+    dest: str,
+    max_texture: int = 1024,
+    jpeg_quality: int = 80,
+    quantize: bool = True,
+) -> Dict[str, Any]:
+    """
+    GLB 하나를 가벼운 미리보기용으로 변환해 dest 에 저장 (CPU 작업 → 이미지 실행기에서 호출).
+    - 내장 텍스처: 긴 변 max_texture 로 축소 + (불투명이면) JPEG 재인코딩
+    - NORMAL/TANGENT → BYTE, TEXCOORD(0..1)/COLOR → 정규화 정수 (KHR_mesh_quantization)
+    - 쓰이지 않게 된 bufferView 는 버리고 BIN 청크를 다시 조립
+    반환: {"input_bytes", "output_bytes", "textures", "quantized", "seconds"}
+    """
+    t0 = time.perf_counter()
+    raw = Path(src).read_bytes()
+    gltf, bin_chunk = read_glb(raw)
+
+    used_ext = set(gltf.get("extensionsUsed", [])) | set(gltf.get("extensionsRequired", []))
+    if used_ext & _SKIP_EXTENSIONS:
+        raise GLBError(f"already compressed: {sorted(used_ext & _SKIP_EXTENSIONS)}")
+    if any("uri" in buf for buf in gltf.get("buffers", [])):
+        raise GLBError("external buffers are not supported")
+
+    b = _Builder(gltf, bin_chunk)
+
+    textures = 0
+    for img in gltf.get("images", []):
+        if "bufferView" not in img:
+            continue
+        data = b.view_bytes(img["bufferView"])
+        try:
+            res = _reencode_image(data, max_texture, jpeg_quality)
+        except Exception:
+            continue   # 디코드 못 하는 포맷(KTX2 등)은 그대로
+        if res is not None:
+            data, mime = res
+            img["bufferView"] = b.add_view(data)
+            img["mimeType"] = mime
+            textures += 1
+
+    quantized = 0
+    if quantize:
+        done: set[int] = set()
+        for mesh in gltf.get("meshes", []):
+            for prim in mesh.get("primitives", []):
+                if prim.get("targets"):
+                    continue   # 모프 타깃이 있는 프리미티브는 건너뜀
+                for semantic, idx in prim.get("attributes", {}).items():
+                    if idx in done:
+                        continue
+                    done.add(idx)
+                    if _quantize_accessor(b, gltf["accessors"][idx], semantic):
+                        quantized += 1
+        if quantized:
+            for key in ("extensionsUsed", "extensionsRequired"):
+                exts = gltf.setdefault(key, [])
+                if "KHR_mesh_quantization" not in exts:
+                    exts.append("KHR_mesh_quantization")
+
+    out = write_glb(gltf, b.repack())
+    tmp = f"{dest}.tmp"
+    Path(tmp).write_bytes(out)
+    Path(tmp).replace(dest)
+    return {
+        "input_bytes": len(raw),
+        "output_bytes": len(out),
+        "textures": textures,
+        "quantized": quantized,
+        "seconds": round(time.perf_counter() - t0, 4),
+    }
+
+
+def preview_path(path: Path) -> Path:
+    """meshy_x.glb → meshy_x.preview.glb"""
+    return path.with_name(path.stem + PREVIEW_SUFFIX + path.suffix)
+
+
+async def build_preview(path: Path) -> Optional[Path]:
+    """
+    wait_and_download 뒤에 붙는 선택 단계 (GLB_PREVIEW=true).
+    미리보기 GLB 를 만들고 크기/시간을 지표로 남김. 실패하면 None (원본만 서빙).
+    """
+    from app.services.imaging import run_image_job
+
+    dest = preview_path(path)
+    t0 = time.perf_counter()
+    try:
+        report = await run_image_job(
+            optimize_glb,
+            str(path),
+            str(dest),
+            settings.glb_preview_max_texture,
+            settings.glb_preview_jpeg_quality,
+            settings.glb_preview_quantize,
+        )
+    except Exception:
+        return None
+    STAGE_GLB_PREVIEW.since(t0)
+    GLB_BYTES.labels("full").inc(report["input_bytes"])
+    GLB_BYTES.labels("preview").inc(report["output_bytes"])
+    if report["input_bytes"]:
+        GLB_PREVIEW_RATIO.observe(report["output_bytes"] / report["input_bytes"])
+    return dest
@@ -0,0 +1,112 @@
+from __future__ import annotations
+# hairfusion-service/app/services/http.py
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import httpx
+
+from app.settings import settings
+from app.services.metrics import UPSTREAM_RESPONSES
+
+# 업스트림 이름 → 공유 클라이언트
+#   meshy    : Meshy OpenAPI (작업 생성/조회)
+#   ailab    : AILabTools 합성 API
+#   download : 결과물(GLB, 이미지) 다운로드용 (CDN 등 임의 호스트)
+UPSTREAMS = ("meshy", "ailab", "download")
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": reused,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else None,
+        }
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_stats: Dict[str, ConnectionStats] = {name: ConnectionStats() for name in UPSTREAMS}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _upstream_config(name: str) -> tuple[float, int]:
+    if name == "meshy":
+        return settings.meshy_http_timeout, settings.meshy_max_connections
+    if name == "ailab":
+        return settings.request_timeout, settings.ailab_max_connections
+    if name == "download":
+        return settings.download_timeout, settings.download_max_connections
+    raise KeyError(f"unknown upstream: {name}")
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    timeout, max_conn = _upstream_config(name)
+    stats = _stats[name]
+
+    # httpcore trace 이벤트로 '새 커넥션' 을 센다 (요청 수 - 새 커넥션 = 재사용)
+    async def trace(event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            stats.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            stats.tls_handshakes += 1
+
+    async def on_request(request: httpx.Request) -> None:
+        stats.requests += 1
+        request.extensions["trace"] = trace
+
+    async def on_response(response: httpx.Response) -> None:
+        UPSTREAM_RESPONSES.labels(name, response.status_code).inc()
+
+    return httpx.AsyncClient(
+        http2=settings.http2 and _http2_available(),
+        timeout=httpx.Timeout(timeout, connect=settings.http_connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_conn,
+            max_keepalive_connections=max_conn,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        event_hooks={"request": [on_request], "response": [on_response]},
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    업스트림별 공유 AsyncClient.
+    lifespan 에서 start_clients() 로 미리 만들어 두고, 그 밖(스크립트 등)에서 불리면 여기서 지연 생성.
+    호출 측에서 async with / aclose() 하지 말 것 (커넥션 풀이 닫힘).
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
+
+
+async def start_clients() -> None:
+    for name in UPSTREAMS:
+        get_client(name)
+
+
+async def close_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    for c in clients:
+        await c.aclose()
+
+
+def connection_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: s.to_dict() for name, s in _stats.items()}
@@ -0,0 +1,65 @@
+from __future__ import annotations
+# hairfusion-service/app/services/imaging.py
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, TypeVar
+
+from app.settings import settings
+
+T = TypeVar("T")
+
+# 이미지 디코드/리사이즈/인코드처럼 CPU 를 오래 쓰는 작업 전용 실행기
+#  - 기본은 코어 수만큼의 프로세스 풀 (GIL 회피)
+#  - 프로세스 풀을 쓸 수 없는 환경이면 스레드 풀로 대체 (PIL 은 상당 부분 GIL 을 풀어줌)
+_executor: Executor | None = None
+
+
+def _workers() -> int:
+    return settings.image_workers or os.cpu_count() or 2
+
+
+def _thread_pool() -> Executor:
+    return ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="image")
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if (settings.image_executor or "process").lower() == "thread":
+            _executor = _thread_pool()
+        else:
+            try:
+                _executor = ProcessPoolExecutor(max_workers=_workers())
+            except (OSError, NotImplementedError, ImportError):
+                _executor = _thread_pool()
+    return _executor
+
+
+def executor_kind() -> str:
+    return "process" if isinstance(get_executor(), ProcessPoolExecutor) else "thread"
+
+
+async def run_image_job(fn: Callable[..., T], *args: Any) -> T:
+    """
+    fn(*args) 를 이미지 실행기에서 돌리고 결과를 await.
+    프로세스 풀의 경우 fn 과 인자는 pickle 가능해야 함 (모듈 최상위 함수 + bytes/str).
+    워커 프로세스가 죽어 풀이 깨지면 스레드 풀로 전환해 한 번 재시도.
+    """
+    global _executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_executor(), fn, *args)
+    except BrokenProcessPool:
+        broken, _executor = _executor, _thread_pool()
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(_executor, fn, *args)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,358 @@
+from __future__ import annotations
+# hairfusion-service/app/services/jobs.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.settings import settings
+from app.services.metrics import gauge_callback
+from app.services.resilience import DeadlineExceeded, clear_deadline
+from app.services.scheduler import QueueFull, set_lane
+
+logger = logging.getLogger("hairfusion")
+
+
+# 잡 상태
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobError(Exception):
+    ...
+
+
+class JobNotFound(JobError):
+    ...
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    input: Dict[str, Any]
+    status: str = QUEUED
+    stage: str = "queued"
+    progress: int = 0
+    data: Dict[str, Any] = field(default_factory=dict)      # 핸들러가 남기는 중간 상태 (예: Meshy task_id)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Job":
+        return cls(**d)
+
+
+# -----------------------------
+# 저장소 (memory / sqlite)
+# -----------------------------
+class MemoryJobStore:
+    """프로세스 메모리에만 보관 (재시작 시 유실)"""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    async def put(self, job: Job) -> None:
+        self._jobs[job.id] = job.to_dict()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        d = self._jobs.get(job_id)
+        return Job.from_dict(dict(d)) if d else None
+
+    async def unfinished(self) -> List[Job]:
+        return [Job.from_dict(dict(d)) for d in self._jobs.values() if d["status"] not in FINISHED]
+
+    async def close(self) -> None:
+        ...
+
+
+class SQLiteJobStore:
+    """
+    SQLite 파일에 잡 상태를 보관 → 재시작해도 작업이 남아있음.
+    sqlite 호출은 짧지만 블로킹이므로 스레드로 넘겨 이벤트 루프를 막지 않음.
+    """
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status)")
+            self._conn.commit()
+
+    def _put(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, kind, status, body, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, job.status, json.dumps(job.to_dict()), job.created_at, job.updated_at),
+            )
+            self._conn.commit()
+
+    def _query(self, sql: str, args: tuple) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [Job.from_dict(json.loads(r[0])) for r in rows]
+
+    async def put(self, job: Job) -> None:
+        await asyncio.to_thread(self._put, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        rows = await asyncio.to_thread(self._query, "SELECT body FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    async def unfinished(self) -> List[Job]:
+        return await asyncio.to_thread(
+            self._query,
+            "SELECT body FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (QUEUED, RUNNING),
+        )
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_store() -> MemoryJobStore | SQLiteJobStore:
+    kind = (settings.job_store or "memory").lower()
+    if kind == "sqlite":
+        return SQLiteJobStore(settings.job_db_path)
+    if kind == "memory":
+        return MemoryJobStore()
+    raise JobError(f"unknown JOB_STORE: {settings.job_store}")
+
+
+# -----------------------------
+# 워커 풀
+# -----------------------------
+Updater = Callable[..., Awaitable[None]]
+Handler = Callable[[Job, Updater], Awaitable[Dict[str, Any]]]
+
+
+class JobManager:
+    """
+    submit() 은 잡을 저장하고 큐에 넣은 뒤 바로 반환.
+    고정 개수의 워커 태스크가 큐에서 꺼내 kind 별 핸들러를 실행하고,
+    상태 변화는 저장소에 기록 + 구독자(SSE)에게 전달.
+    """
+
+    def __init__(self, store, workers: int = 4) -> None:
+        self.store = store
+        self.workers = max(workers, 1)
+        self._handlers: Dict[str, Handler] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self.running = 0
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        # 재시작 전에 끝나지 않은 잡은 다시 큐에 넣음 (핸들러가 job.data 로 이어서 진행)
+        for job in await self.store.unfinished():
+            job.status = QUEUED
+            await self.store.put(job)
+            self._queue.put_nowait(job.id)
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.store.close()
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Job:
+        if kind not in self._handlers:
+            raise JobError(f"unknown job kind: {kind}")
+        job = Job(id=uuid.uuid4().hex, kind=kind, input=payload)
+        await self.store.put(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Job:
+        job = await self.store.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(q)
+        return q
+
+    def unsubscribe(self, job_id: str, q: asyncio.Queue) -> None:
+        subs = self._subscribers.get(job_id, [])
+        if q in subs:
+            subs.remove(q)
+        if not subs:
+            self._subscribers.pop(job_id, None)
+
+    async def _save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        await self.store.put(job)
+        snapshot = job.to_dict()
+        for q in self._subscribers.get(job.id, []):
+            q.put_nowait(snapshot)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.store.get(job_id)
+                if job is None or job.status in FINISHED:
+                    continue
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 저장소 오류 등으로 잡 하나를 처리하지 못해도 워커는 계속 (잡은 다음 기동 때 복구 대상)
+                logger.exception("job worker failed on %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job) -> None:
+        self.running += 1
+        try:
+            await self._run_handler(job)
+        finally:
+            self.running -= 1
+
+    async def _run_handler(self, job: Job) -> None:
+        handler = self._handlers.get(job.kind)
+        job.status = RUNNING
+        await self._save(job)
+
+        async def update(stage: str | None = None, progress: int | None = None, **data: Any) -> None:
+            if stage is not None:
+                job.stage = stage
+            if progress is not None:
+                job.progress = max(0, min(int(progress), 100))
+            job.data.update(data)
+            await self._save(job)
+
+        try:
+            if handler is None:
+                raise JobError(f"unknown job kind: {job.kind}")
+            set_lane(job.input.get("lane"))
+            clear_deadline()   # 잡을 만든 요청의 마감(X-Request-Timeout)은 물려받지 않음
+            job.result = await handler(job, update)
+            job.status = SUCCEEDED
+            job.stage = "done"
+            job.progress = 100
+        except asyncio.CancelledError:
+            # 종료(shutdown) 중 취소 → running 으로 남겨 다음 기동 때 재개
+            raise
+        except QueueFull as e:
+            # 업스트림 대기열이 가득 참 → 실패 대신 잠시 후 다시 큐에 넣음
+            job.status = QUEUED
+            job.stage = "throttled"
+            await self._save(job)
+            asyncio.get_running_loop().call_later(e.retry_after, self._queue.put_nowait, job.id)
+            return
+        except Exception as e:
+            job.status = FAILED
+            job.error = {"type": type(e).__name__, "message": str(e)[:400], "status_code": error_status(e)}
+        await self._save(job)
+
+
+def error_status(exc: Exception) -> int:
+    """서비스 예외 → HTTP 상태 코드 (main.py 의 동기 엔드포인트와 동일한 매핑)"""
+    from app.services.ailabtools import AILabAuthError, AILabBadReq, AILabError
+    from app.services.meshy import MeshyAuthError, MeshyBadReq, MeshyError, MeshyTimeout
+
+    if isinstance(exc, (MeshyAuthError, AILabAuthError)):
+        return 401
+    if isinstance(exc, (MeshyBadReq, AILabBadReq)):
+        return 400
+    if isinstance(exc, (MeshyTimeout, DeadlineExceeded)):
+        return 504
+    if isinstance(exc, (MeshyError, AILabError)):
+        return 502
+    return 500
+
+
+# -----------------------------
+# 잡 핸들러
+# -----------------------------
+async def meshify_job(job: Job, update: Updater) -> Dict[str, Any]:
+    """
+    /meshify 와 같은 흐름을 백그라운드에서 수행.
+    Meshy task_id 를 job.data 에 남겨두므로, 재시작 후에는 새 유료 작업을 만들지 않고 이어서 대기.
+    """
+    from app.services.meshy import final_task_json, wait_and_download
+    from app.services.meshy_dedup import meshify_image
+
+    async def on_progress(task_json: Dict[str, Any]) -> None:
+        await update(stage="meshy_wait", progress=task_json.get("progress") or 0)
+
+    task_id = job.data.get("task_id")
+    if task_id:
+        # 재개: 이미 만든 작업을 이어서 대기
+        stored = await wait_and_download(task_id, on_progress)
+        await update(stage="meshy_fetch")
+        task_json = await final_task_json(task_id)
+        return {"job_id": task_id, **stored.to_dict(), "result": task_json}
+
+    async def on_task(new_task_id: str) -> None:
+        await update(stage="meshy_wait", task_id=new_task_id)
+
+    await update(stage="meshy_create")
+    result, dedup = await meshify_image(job.input["image_url"], on_task, on_progress)
+    await update(dedup=dedup)
+    return result
+
+
+_manager: JobManager | None = None
+
+gauge_callback(
+    "hairfusion_jobs_active",
+    "Background jobs currently being executed",
+    lambda: _manager.running if _manager else 0,
+)
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        _manager = JobManager(make_store(), workers=settings.job_workers)
+        _manager.register("meshify", meshify_job)
+
+        from app.services.pipeline import pipeline_job
+        _manager.register("pipeline", pipeline_job)
+    return _manager
+
+
+async def close_job_manager() -> None:
+    global _manager
+    if _manager is not None:
+        await _manager.stop()
+        _manager = None
@@ -1,17 +1,22 @@
 ﻿from __future__ import annotations
-import io
+import asyncio
 import json
 import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any
-
-import httpx
-from PIL import Image
+from typing import Any, Callable, Dict
+from urllib.parse import quote
 
 from app.settings import settings
+from app.services.download import DownloadError, download_to_file
+from app.services.meshy_journal import CREATED, DOWNLOADING, FAILED, STORED, WAITING, get_journal, start_recovery
+from app.services.metrics import STAGE_DOWNLOAD, STAGE_MESHY_CREATE, STAGE_MESHY_POLL, gauge_callback
+from app.services.poller import TaskPoller
+from app.services.resilience import DeadlineExceeded, is_transient, remaining, request
+from app.services.retention import note as note_output, sharded
+from app.services.singleflight import SingleFlight
 
-OUT_DIR = Path("outputs/meshy")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+OUT_DIR = Path("outputs/meshy")   # lifespan 에서 생성 (main.ensure_dirs)
 
 
 class MeshyError(Exception):
@@ -30,6 +35,53 @@ class MeshyTimeout(MeshyError):
     ...
 
 
+@dataclass
+class StoredModel:
+    """
+    결과 GLB 가 저장된 위치.
+    local 모드면 path(outputs/meshy/...) + /static URL, s3 모드면 path 없이 S3 key + public URL.
+    """
+    url: str
+    path: Path | None = None
+    key: str | None = None
+    preview: Path | None = None   # 경량 미리보기 GLB (GLB_PREVIEW=true 일 때)
+    assets: Dict[str, str] | None = None   # 다른 결과물 이름 → URL (usdz, fbx, texture0_base_color ...)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "saved_path": str(self.path) if self.path else None,
+            "public_url": self.url,
+            "s3_key": self.key,
+            "viewer_url": "/viewer?src=" + quote(self.url, safe=""),
+        }
+        if self.preview:
+            out["preview_url"] = self.url + "?variant=preview"
+            out["preview_viewer_url"] = out["viewer_url"] + "&variant=preview"
+        if self.assets:
+            out["assets"] = self.assets
+        return out
+
+    def to_record(self) -> Dict[str, Any]:
+        """저널 저장용 (to_dict 는 API 응답용)"""
+        return {
+            "url": self.url,
+            "path": str(self.path) if self.path else None,
+            "key": self.key,
+            "preview": str(self.preview) if self.preview else None,
+            "assets": self.assets,
+        }
+
+    @classmethod
+    def from_record(cls, d: Dict[str, Any]) -> "StoredModel":
+        return cls(
+            url=d["url"],
+            path=Path(d["path"]) if d.get("path") else None,
+            key=d.get("key"),
+            preview=Path(d["preview"]) if d.get("preview") else None,
+            assets=d.get("assets"),
+        )
+
+
 def _pick_job_id(data: Dict[str, Any]) -> str:
     for k in ("result", "job_id", "id", "task_id", "taskId"):
         if k in data and data[k]:
@@ -71,17 +123,26 @@ async def create_image_to_3d(image_url: str) -> str:
         "should_remesh": False,
     }
 
-    async with httpx.AsyncClient() as client:
-        r = await client.post(url, headers=headers, json=payload, timeout=60)
+    # 웹훅 모드: 완료 시 이 주소로 알림 (POST /webhooks/meshy)
+    if settings.meshy_completion == "webhook" and settings.meshy_webhook_url:
+        payload["callback_url"] = settings.meshy_webhook_url
+
+    t0 = time.perf_counter()
+    # 작업 생성은 과금되므로 요청이 나가지 않은 오류/게이트웨이 응답만 재시도
+    r = await request("meshy", "POST", url, idempotent=False, headers=headers, json=payload)
+    STAGE_MESHY_CREATE.since(t0)
 
-        if r.status_code == 401:
-            raise MeshyAuthError(r.text)
-        if r.status_code == 400:
-            raise MeshyBadReq(r.text)
-        r.raise_for_status()
+    if r.status_code == 401:
+        raise MeshyAuthError(r.text)
+    if r.status_code == 400:
+        raise MeshyBadReq(r.text)
+    r.raise_for_status()
 
-        data = r.json()
-        return _pick_job_id(data)
+    data = r.json()
+    task_id = _pick_job_id(data)
+    # 이 시점부터 유료 작업 → 재시작해도 결과를 받을 수 있게 저널에 먼저 남김
+    await get_journal().record(task_id, CREATED, image_url=image_url)
+    return task_id
 
 
 async def get_job(task_id: str) -> Dict[str, Any]:
@@ -89,45 +150,191 @@ async def get_job(task_id: str) -> Dict[str, Any]:
     url = base + f"/openapi/v1/tasks/{task_id}"
     headers = {"Authorization": f"Bearer {settings.meshy_api_key}"}
 
-    async with httpx.AsyncClient() as client:
-        r = await client.get(url, headers=headers, timeout=60)
+    t0 = time.perf_counter()
+    r = await request("meshy", "GET", url, idempotent=True, headers=headers)
+    STAGE_MESHY_POLL.since(t0)
 
-        if r.status_code == 401:
-            raise MeshyAuthError(r.text)
+    if r.status_code == 401:
+        raise MeshyAuthError(r.text)
 
-        r.raise_for_status()
-        return r.json()
+    r.raise_for_status()
+    return r.json()
 
 
-async def wait_and_download(task_id: str) -> Path:
+async def final_task_json(task_id: str) -> Dict[str, Any]:
     """
-    Meshy 작업 SUCCEEDED까지 대기 후 GLB 다운로드
+    완료된 작업 JSON. wait_and_download 가 저널에 남긴 마지막 조회 결과를 쓰고, 없을 때만 다시 조회.
+    (결과물 URL 은 meshy_assets 에 기록돼 있으므로 응답용으로 Meshy 를 한 번 더 부를 필요 없음)
     """
-    deadline = time.time() + (settings.meshy_timeout or 600)
-    last: Dict[str, Any] = {}
-
-    while time.time() < deadline:
-        last = await get_job(task_id)
-        st = (last.get("status") or "").upper()
+    row = await get_journal().get(task_id)
+    if row and row.get("result"):
+        return row["result"]
+    return await get_job(task_id)
 
-        if st == "SUCCEEDED":
-            model_url = last.get("model_url")
-            if not model_url:
-                raise MeshyError(f"no model_url in {last}")
 
-            async with httpx.AsyncClient() as client:
-                r = await client.get(model_url, timeout=120)
-                r.raise_for_status()
+def _is_terminal(data: Dict[str, Any]) -> bool:
+    return (data.get("status") or "").upper() in ("SUCCEEDED", "FAILED", "CANCELED")
 
-                fname = OUT_DIR / f"meshy_{task_id.replace('-', '')[:16]}.glb"
-                with open(fname, "wb") as f:
-                    f.write(r.content)
 
-                return fname
+_poller: TaskPoller | None = None
 
-        elif st in ("FAILED", "CANCELED"):
-            raise MeshyError(f"job failed: {last}")
 
-        time.sleep(3)
-
-    raise MeshyTimeout(f"job timeout: {task_id}")
+def get_poller() -> TaskPoller:
+    """
+    프로세스 전체에서 공유하는 Meshy 작업 폴러.
+    (요청마다 폴링 루프를 돌리지 않고 하나의 루프가 모든 task_id 를 감시)
+    웹훅 모드에서는 완료를 웹훅(notify)으로 받고, 폴링은 MESHY_WEBHOOK_FALLBACK_INTERVAL 간격의 보정용.
+    """
+    global _poller
+    if _poller is None and settings.meshy_completion == "webhook":
+        fallback = max(settings.meshy_webhook_fallback_interval, settings.meshy_poll_min_interval)
+        _poller = TaskPoller(
+            get_job,
+            _is_terminal,
+            min_interval=fallback,
+            max_interval=fallback,
+            jitter=settings.meshy_poll_jitter,
+            concurrency=settings.meshy_poll_concurrency,
+            first_delay=fallback,
+            is_transient=is_transient,
+        )
+    elif _poller is None:
+        _poller = TaskPoller(
+            get_job,
+            _is_terminal,
+            min_interval=settings.meshy_poll_min_interval,
+            max_interval=settings.meshy_poll_max_interval,
+            factor=settings.meshy_poll_backoff,
+            jitter=settings.meshy_poll_jitter,
+            concurrency=settings.meshy_poll_concurrency,
+            is_transient=is_transient,
+        )
+    return _poller
+
+
+gauge_callback(
+    "hairfusion_meshy_tasks_watched",
+    "Meshy tasks currently watched by the shared poller",
+    lambda: _poller.watching if _poller else 0,
+)
+
+
+# 같은 task_id 의 GLB 저장은 한 번만 (재시작 복구와 잡 재개가 겹치는 경우 등)
+_store_flight = SingleFlight()
+
+
+async def wait_and_download(
+    task_id: str,
+    on_progress: Callable[[Dict[str, Any]], Any] | None = None,
+) -> StoredModel:
+    """
+    Meshy 작업 SUCCEEDED까지 대기 후 GLB 저장
+    - 대기는 공유 폴러에 맡기므로 이벤트 루프를 막지 않음
+    - on_progress: 폴링 때마다 작업 JSON 으로 호출 (잡 진행률 갱신용)
+    - MESHY_STORAGE=s3 이면 응답 본문을 로컬 디스크 없이 S3 멀티파트 업로드로 바로 흘려보냄
+    - 요청 마감(X-Request-Timeout)이 MESHY_TIMEOUT 보다 먼저면 그때 DeadlineExceeded
+      (작업은 백그라운드에서 계속 기다렸다가 저장 → GET /meshy/tasks/{task_id} 로 확인)
+    - 상태 전이는 저널(meshy_journal)에 기록. 이미 저장된 작업이면 다시 받지 않음
+    """
+    journal = get_journal()
+    row = await journal.get(task_id)
+    if row and row["state"] == STORED and row.get("stored"):
+        stored = StoredModel.from_record(row["stored"])
+        if stored.path is None or stored.path.exists():
+            return stored
+
+    await journal.record(task_id, WAITING)
+    timeout = settings.meshy_timeout or 600
+    left = remaining()
+    by_deadline = left is not None and left < timeout
+    try:
+        last = await asyncio.wait_for(get_poller().wait(task_id, on_progress), max(left, 0) if by_deadline else timeout)
+    except asyncio.TimeoutError:
+        if by_deadline:
+            start_recovery(task_id)
+            raise DeadlineExceeded(f"request deadline exceeded while waiting for {task_id}")
+        await journal.record(task_id, FAILED, error="timeout")
+        raise MeshyTimeout(f"job timeout: {task_id}")
+
+    st = (last.get("status") or "").upper()
+    if st != "SUCCEEDED":
+        await journal.record(task_id, FAILED, result=last, error=f"status {st}")
+        raise MeshyError(f"job failed: {last}")
+
+    model_url = last.get("model_url")
+    if not model_url:
+        await journal.record(task_id, FAILED, result=last, error="no model_url")
+        raise MeshyError(f"no model_url in {last}")
+
+    await journal.record(task_id, DOWNLOADING, result=last)
+    try:
+        stored, _ = await _store_flight.do(task_id, lambda: _store(task_id, model_url, last))
+    except MeshyError as e:
+        await journal.record(task_id, FAILED, error=str(e)[:400])
+        raise
+    await journal.record(task_id, STORED, stored=stored.to_record())
+    return stored
+
+
+async def _store(task_id: str, model_url: str, task_json: Dict[str, Any]) -> StoredModel:
+    """
+    GLB 저장 + 다른 결과물 처리를 동시에.
+    작업 JSON 의 모든 결과물 URL 을 저널에 기록하고, MESHY_EAGER_ASSETS 에 있는 것은 GLB 와 함께 받음.
+    """
+    from app.services import meshy_assets
+
+    paths = await meshy_assets.record(task_id, task_json)
+    eager = [n for n in meshy_assets.eager_names(paths) if n != "glb"]
+    stored, fetched = await asyncio.gather(
+        _store_glb(task_id, model_url), meshy_assets.fetch_eager(task_id, eager)
+    )
+    assets = await meshy_assets.asset_urls(task_id, fetched)
+    assets.pop("glb", None)
+    stored.assets = assets or None
+    return stored
+
+
+async def _store_glb(task_id: str, model_url: str) -> StoredModel:
+    name = f"meshy_{task_id.replace('-', '')[:16]}.glb"
+    t0 = time.perf_counter()
+    if settings.meshy_storage == "s3":
+        from app.services.storage import StorageError, stream_url_to_s3
+
+        try:
+            key, url, _ = await stream_url_to_s3(
+                model_url, settings.meshy_s3_prefix + name, content_type="model/gltf-binary"
+            )
+        except StorageError as e:
+            raise MeshyError(f"upload failed: {e}")
+        STAGE_DOWNLOAD.since(t0)
+        return StoredModel(url=url, key=key)
+
+    fname = sharded(OUT_DIR, name)
+    try:
+        await download_to_file(model_url, fname)
+    except DownloadError as e:
+        raise MeshyError(f"download failed: {e}")
+    STAGE_DOWNLOAD.since(t0)
+
+    preview = None
+    if settings.glb_preview_enabled:
+        # 텍스처 축소 + 정점 속성 양자화한 미리보기 GLB (실패하면 원본만 서빙)
+        from app.services.glb_optimize import build_preview
+
+        preview = await build_preview(fname)
+
+    if settings.static_precompress:
+        # /static 에서 Accept-Encoding 에 맞춰 바로 보낼 .gz/.br (실패해도 원본 서빙에는 지장 없음)
+        from app.services.imaging import run_image_job
+        from app.services.static_files import precompress
+
+        for path in (fname, preview):
+            if path is None:
+                continue
+            try:
+                await run_image_job(precompress, str(path))
+            except Exception:
+                pass
+
+    note_output(fname)
+    return StoredModel(url="/static/" + fname.relative_to("outputs").as_posix(), path=fname, preview=preview)
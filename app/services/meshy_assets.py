@@ -0,0 +1,210 @@
+from __future__ import annotations
+# hairfusion-service/app/services/meshy_assets.py
+import asyncio
+import mimetypes
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.settings import settings
+from app.services.download import DownloadError, download_to_file
+from app.services.meshy_journal import get_journal
+from app.services.metrics import STAGE_SECONDS, counter
+from app.services.retention import note as note_output, sharded
+from app.services.singleflight import SingleFlight
+
+# Meshy 작업 결과물 관리
+#   완료된 작업 JSON 의 model_urls(glb/fbx/obj/usdz/mtl), texture_urls, thumbnail_url 을 모두 저널(meshy_assets)에 기록
+#   MESHY_EAGER_ASSETS 에 있는 것은 완료 즉시 동시에 받고, 나머지는 /static 첫 요청 때 받음
+#   같은 결과물을 동시에 요청하면 한 번만 받음. 서명 URL 이 만료돼 실패하면 작업을 다시 조회해 새 URL 로 한 번 더
+OUT_DIR = Path("outputs/meshy")   # meshy.OUT_DIR 과 같은 위치 (GLB 와 나란히 저장)
+
+MODEL_FORMATS = ("glb", "fbx", "obj", "usdz", "mtl")
+# MESHY_EAGER_ASSETS 에서 여러 결과물을 한 번에 가리키는 이름
+GROUPS = {"textures": "texture", "models": MODEL_FORMATS}
+_DEFAULT_EXT = {"thumbnail": ".png", "video": ".mp4"}
+
+mimetypes.add_type("model/vnd.usdz+zip", ".usdz")
+mimetypes.add_type("model/obj", ".obj")
+
+STAGE_ASSET = STAGE_SECONDS.labels("meshy_asset")
+ASSETS = counter(
+    "hairfusion_meshy_assets_total",
+    "Meshy artifact fetches, by trigger (eager, lazy) and outcome",
+    ("trigger", "outcome"),
+)
+
+_flight = SingleFlight()
+
+
+def artifact_urls(task_json: Dict[str, Any]) -> Dict[str, str]:
+    """작업 JSON → {결과물 이름: URL}. 텍스처는 texture<i>_<종류> (예: texture0_base_color)"""
+    out: Dict[str, str] = {}
+    for fmt, url in (task_json.get("model_urls") or {}).items():
+        if url:
+            out[fmt.lower()] = url
+    if task_json.get("model_url") and "glb" not in out:
+        out["glb"] = task_json["model_url"]
+    for name in ("thumbnail", "video"):
+        if task_json.get(f"{name}_url"):
+            out[name] = task_json[f"{name}_url"]
+    for i, textures in enumerate(task_json.get("texture_urls") or []):
+        for kind, url in (textures or {}).items():
+            if url:
+                out[f"texture{i}_{kind}"] = url
+    return out
+
+
+def asset_filename(task_id: str, name: str, url: str) -> str:
+    """
+    저장 파일 이름. GLB 는 기존 이름(meshy_<task16>.glb) 그대로,
+    다른 모델 포맷은 meshy_<task16>.<포맷>, 그 밖에는 meshy_<task16>.<이름><URL 확장자>.
+    """
+    base = f"meshy_{task_id.replace('-', '')[:16]}"
+    if name in MODEL_FORMATS:
+        return f"{base}.{name}"
+    ext = Path(url.split("?", 1)[0]).suffix.lower()
+    if not ext or len(ext) > 6:
+        ext = _DEFAULT_EXT.get(name, ".png")
+    return f"{base}.{name}{ext}"
+
+
+def eager_names(available: Iterable[str]) -> List[str]:
+    wanted = {w.strip().lower() for w in settings.meshy_eager_assets.split(",") if w.strip()}
+    out = []
+    for name in available:
+        for w in wanted:
+            group = GROUPS.get(w)
+            if name == w or (isinstance(group, str) and name.startswith(group)) or (
+                isinstance(group, tuple) and name in group
+            ):
+                out.append(name)
+                break
+    return out
+
+
+def static_url(path: Path) -> str:
+    return "/static/" + path.relative_to("outputs").as_posix()
+
+
+async def record(task_id: str, task_json: Dict[str, Any]) -> Dict[str, Path]:
+    """결과물 URL 과 로컬 경로를 저널에 기록. 반환: 이름 → 로컬 경로"""
+    urls = artifact_urls(task_json)
+    paths = {name: sharded(OUT_DIR, asset_filename(task_id, name, url)) for name, url in urls.items()}
+    await get_journal().record_assets(task_id, {n: (urls[n], paths[n].as_posix()) for n in urls})
+    return paths
+
+
+async def _refresh(task_id: str) -> None:
+    """서명 URL 만료 대비: 작업을 다시 조회해 새 URL 로 갱신"""
+    from app.services.meshy import get_job
+
+    await record(task_id, await get_job(task_id))
+
+
+async def _download(task_id: str, name: str) -> Tuple[Path, int]:
+    journal = get_journal()
+    row = next((a for a in await journal.assets(task_id) if a["name"] == name), None)
+    if row is None:
+        raise DownloadError(f"unknown asset {name} for task {task_id}")
+    path = Path(row["path"])
+    try:
+        res = await download_to_file(row["url"], path)
+    except DownloadError:
+        await _refresh(task_id)
+        row = next(a for a in await journal.assets(task_id) if a["name"] == name)
+        res = await download_to_file(row["url"], path)
+
+    if settings.static_precompress:
+        from app.services.imaging import run_image_job
+        from app.services.static_files import precompress
+
+        try:
+            await run_image_job(precompress, str(path))
+        except Exception:
+            pass
+    await journal.mark_fetched(task_id, name, res.size)
+    note_output(path)
+    return path, res.size
+
+
+async def _upload(task_id: str, name: str) -> str:
+    """MESHY_STORAGE=s3: 로컬 디스크 없이 S3 로 바로 (반환: 공개 URL)"""
+    from app.services.storage import stream_url_to_s3
+
+    row = next(a for a in await get_journal().assets(task_id) if a["name"] == name)
+    filename = Path(row["path"]).name
+    ctype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    try:
+        _, url, size = await stream_url_to_s3(row["url"], settings.meshy_s3_prefix + filename, content_type=ctype)
+    except Exception:
+        await _refresh(task_id)
+        row = next(a for a in await get_journal().assets(task_id) if a["name"] == name)
+        _, url, size = await stream_url_to_s3(row["url"], settings.meshy_s3_prefix + filename, content_type=ctype)
+    await get_journal().mark_fetched(task_id, name, size)
+    return url
+
+
+async def fetch(task_id: str, name: str, trigger: str = "lazy") -> str:
+    """
+    결과물 하나를 저장하고 URL 반환 (local: /static/meshy/..., s3: 공개 URL).
+    이미 받아 둔 파일이면 바로 반환, 같은 결과물을 동시에 요청하면 한 번만 받음.
+    """
+    t0 = time.perf_counter()
+    if settings.meshy_storage == "s3":
+        try:
+            url, _ = await _flight.do((task_id, name), lambda: _upload(task_id, name))
+        except Exception:
+            ASSETS.labels(trigger, "failed").inc()
+            raise
+        ASSETS.labels(trigger, "stored").inc()
+        STAGE_ASSET.since(t0)
+        return url
+
+    rows = {a["name"]: a for a in await get_journal().assets(task_id)}
+    path = Path(rows[name]["path"]) if name in rows else None
+    if path is not None and path.exists():
+        ASSETS.labels(trigger, "hit").inc()
+        return static_url(path)
+    try:
+        (path, _), joined = await _flight.do((task_id, name), lambda: _download(task_id, name))
+    except Exception:
+        ASSETS.labels(trigger, "failed").inc()
+        raise
+    ASSETS.labels(trigger, "coalesced" if joined else "stored").inc()
+    STAGE_ASSET.since(t0)
+    return static_url(path)
+
+
+async def fetch_eager(task_id: str, names: Iterable[str]) -> Dict[str, str]:
+    """names 를 동시에 저장. 실패한 것은 빼고 이름 → URL 반환 (local 이면 나중에 /static 요청 때 다시 시도)"""
+    names = list(names)
+    results = await asyncio.gather(*(fetch(task_id, n, "eager") for n in names), return_exceptions=True)
+    return {n: r for n, r in zip(names, results) if isinstance(r, str)}
+
+
+async def fetch_for_static(path: str) -> bool:
+    """
+    /static 에 없는 파일 요청 → 기록된 결과물이면 받아 두고 True (CachedStaticFiles 에서 호출).
+    path: outputs/ 기준 경로 (예: outputs/meshy/meshy_<task16>.usdz)
+    """
+    if settings.meshy_storage == "s3":
+        return False
+    row = await get_journal().asset_by_path(Path(path).as_posix())
+    if row is None:
+        return False
+    try:
+        await fetch(row["task_id"], row["name"], "lazy")
+    except Exception:
+        return False
+    return True
+
+
+async def asset_urls(task_id: str, eager: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    응답용 이름 → URL. local 이면 기록된 모든 결과물 (/static, 아직 안 받은 것은 첫 요청 때 받음),
+    s3 면 실제로 올린 것(eager)만.
+    """
+    if settings.meshy_storage == "s3":
+        return dict(eager or {})
+    return {a["name"]: static_url(Path(a["path"])) for a in await get_journal().assets(task_id)}
@@ -0,0 +1,214 @@
+from __future__ import annotations
+# hairfusion-service/app/services/meshy_dedup.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.settings import settings
+from app.services.download import sha256_of
+from app.services.meshy import create_image_to_3d, final_task_json, wait_and_download
+from app.services.meshy_journal import CREATED, get_journal
+from app.services.scheduler import get_scheduler
+from app.services.singleflight import SingleFlight
+
+
+class MeshyIndex:
+    """
+    입력 이미지 digest → 완료된 Meshy 결과(task_id, GLB 위치, 최종 작업 JSON) 인덱스.
+    JSON 파일로 영속화하고, retention 이 지났거나 로컬 GLB 가 사라진 항목은 무시/정리.
+    (S3 에 올린 결과는 로컬 파일이 없으므로 retention 만 봄)
+    파일 읽기/쓰기와 GLB 존재 확인은 스레드에서 (async 메서드는 asyncio.to_thread 래퍼, 저널과 같은 방식)
+    """
+
+    def __init__(self, path: str, retention: float) -> None:
+        self.path = Path(path)
+        self.retention = retention
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self._entries), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        if time.time() - entry.get("created_at", 0) > self.retention:
+            return True
+        saved_path = entry.get("saved_path")
+        return bool(saved_path) and not Path(saved_path).exists()
+
+    def _lookup(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self._entries.pop(digest, None)
+                self._save()
+                return None
+            return entry
+
+    def _record(self, digest: str, task_id: str, stored: Dict[str, Any], task_json: Dict[str, Any]) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[digest] = {
+                "task_id": task_id,
+                **stored,
+                "result": task_json,
+                "created_at": time.time(),
+            }
+            # 기록할 때 만료 항목도 함께 정리
+            for k in [k for k, v in self._entries.items() if self._expired(v)]:
+                self._entries.pop(k, None)
+            self._save()
+
+    # ---- async API (이벤트 루프용) ----
+    async def lookup(self, digest: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._lookup, digest)
+
+    async def record(self, digest: str, task_id: str, stored: Dict[str, Any], task_json: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._record, digest, task_id, stored, task_json)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+
+meshy_index = MeshyIndex(settings.meshy_index_path, settings.meshy_dedup_retention)
+_flight = SingleFlight()
+stats = {"hits": 0, "joined": 0, "misses": 0}
+
+
+async def image_digest(image_url: str) -> str:
+    """
+    입력 이미지 바이트의 sha256 (같은 이미지를 다른 URL 로 올려도 같은 digest).
+    본문은 메모리에 두지 않고 받으면서 해시만 계산. 받을 수 없거나 내부 주소를 가리키거나
+    MESHY_DEDUP_MAX_BYTES 보다 크면 URL 문자열 기준으로 대체 (Meshy 는 URL 로 직접 받음)
+    """
+    try:
+        return "sha256:" + await sha256_of(image_url, settings.meshy_dedup_max_bytes)
+    except Exception:
+        return "url:" + hashlib.sha256(image_url.encode()).hexdigest()
+
+
+# 진행 중인 변환(digest)별 구독자. 리더가 만든 task_id / 진행률을 합류한 호출에도 전달
+#   (잡이 합류해도 task_id 를 job.data 에 남겨 재시작 후 새 유료 작업을 만들지 않도록)
+_watchers: Dict[str, Dict[str, Any]] = {}
+
+Subscriber = Tuple[Optional[Callable[[str], Awaitable[Any]]], Optional[Callable[[Dict[str, Any]], Any]]]
+
+
+async def _call(fn: Callable[..., Any], *args: Any) -> None:
+    res = fn(*args)
+    if asyncio.iscoroutine(res) or isinstance(res, asyncio.Future):
+        await res
+
+
+async def _fan_out(w: Dict[str, Any], own: Subscriber, index: int, *args: Any) -> None:
+    """리더 자신의 콜백은 예외를 그대로 올리고, 합류한 쪽 콜백의 실패는 리더에 영향을 주지 않음"""
+    if own[index] is not None:
+        await _call(own[index], *args)
+    others = [sub[index] for sub in list(w["subs"]) if sub is not own and sub[index] is not None]
+    if others:
+        await asyncio.gather(*(_call(cb, *args) for cb in others), return_exceptions=True)
+
+
+async def meshify_image(
+    image_url: str,
+    on_task: Callable[[str], Awaitable[Any]] | None = None,
+    on_progress: Callable[[Dict[str, Any]], Any] | None = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    create_image_to_3d → wait_and_download → get_job 흐름의 중복 제거 버전.
+    - 최근 변환한 이미지면 인덱스에서 즉시 반환 ("hit")
+    - 같은 이미지가 변환 중이면 그 작업에 합류 ("joined") → 유료 작업을 새로 만들지 않음
+      합류한 호출도 on_task / on_progress 를 받음 (이미 만들어진 작업이면 합류 즉시 한 번)
+    - 그 외에는 새 작업 생성 ("miss")
+    반환: ({"job_id", "saved_path", "public_url", "s3_key", "viewer_url", "result"}, 상태)
+    """
+    own: Subscriber = (on_task, on_progress)
+
+    async def _run(w: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        if w is not None:
+            w.update(task_id=None, progress=None)
+
+        async def _task(task_id: str) -> None:
+            if w is None:
+                if on_task is not None:
+                    await on_task(task_id)
+                return
+            w["task_id"] = task_id
+            await _fan_out(w, own, 0, task_id)
+
+        async def _progress(task_json: Dict[str, Any]) -> None:
+            if w is None:
+                if on_progress is not None:
+                    await _call(on_progress, task_json)
+                return
+            w["progress"] = task_json
+            await _fan_out(w, own, 1, task_json)
+
+        # 동시에 진행하는 Meshy 작업 수 제한 (가득 차면 QueueFull)
+        async with get_scheduler("meshy").slot():
+            task_id = await create_image_to_3d(image_url)
+            if settings.meshy_dedup_enabled:
+                # 재시작 후 복구된 결과도 인덱스에 올릴 수 있도록 digest 를 저널에 남김
+                await get_journal().record(task_id, CREATED, digest=digest)
+            await _task(task_id)
+            stored = (await wait_and_download(task_id, _progress)).to_dict()
+            task_json = await final_task_json(task_id)
+        if settings.meshy_dedup_enabled:
+            await meshy_index.record(digest, task_id, stored, task_json)
+        return {"job_id": task_id, **stored, "result": task_json}
+
+    if not settings.meshy_dedup_enabled:
+        return await _run(), "disabled"
+
+    digest = await image_digest(image_url)
+    entry = await meshy_index.lookup(digest)
+    if entry is not None:
+        stats["hits"] += 1
+        stored = {k: entry.get(k) for k in ("saved_path", "public_url", "s3_key", "viewer_url", "preview_url", "assets")}
+        return {"job_id": entry["task_id"], **stored, "result": entry["result"]}, "hit"
+
+    w = _watchers.setdefault(digest, {"task_id": None, "progress": None, "subs": []})
+    w["subs"].append(own)
+    try:
+        if _flight.inflight(digest):
+            # 이미 진행 중인 작업에 합류: 그동안의 task_id / 진행률을 먼저 받음
+            if w["task_id"] and on_task is not None:
+                await on_task(w["task_id"])
+            if w["progress"] and on_progress is not None:
+                await _call(on_progress, w["progress"])
+        result, joined = await _flight.do(digest, lambda: _run(w))
+    finally:
+        w["subs"].remove(own)
+        if not w["subs"] and _watchers.get(digest) is w:
+            _watchers.pop(digest, None)
+    if joined:
+        stats["joined"] += 1
+        return result, "joined"
+    stats["misses"] += 1
+    return result, "miss"
+
+
+def dedup_stats() -> Dict[str, Any]:
+    return {**stats, "inflight": len(_flight), "indexed": len(meshy_index)}
@@ -0,0 +1,338 @@
+from __future__ import annotations
+# hairfusion-service/app/services/meshy_journal.py
+import asyncio
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.settings import settings
+from app.services.metrics import counter
+
+# Meshy 작업 상태 (journal 기준)
+#   created     : 작업 생성 응답을 받음 (task_id 확보 → 이 시점부터 유료)
+#   waiting     : 완료 대기 중 (폴러/웹훅)
+#   downloading : SUCCEEDED, GLB 저장 중
+#   stored      : GLB 저장 완료 (stored 에 위치)
+#   failed      : Meshy 실패/취소, 타임아웃, 다운로드 실패, 복구 포기
+CREATED = "created"
+WAITING = "waiting"
+DOWNLOADING = "downloading"
+STORED = "stored"
+FAILED = "failed"
+UNFINISHED = (CREATED, WAITING, DOWNLOADING)
+
+RECOVERED = counter(
+    "hairfusion_meshy_recovered_total",
+    "Unfinished Meshy tasks resumed from the journal, by outcome",
+    ("outcome",),
+)
+
+_JSON_COLUMNS = ("stored", "result")
+
+
+class MeshyJournal:
+    """
+    Meshy 작업(task_id)의 상태 전이 / 결과 위치를 SQLite(WAL)에 기록하는 저널.
+    - meshy_tasks  : 작업별 현재 상태 (updated_at 인덱스 → 최근 목록은 outputs/ 스캔 없이 인덱스로)
+    - meshy_events : 상태가 바뀔 때마다 한 줄 (언제 어떤 단계였는지 추적용)
+    - meshy_assets : 작업 결과물(모델 포맷/텍스처/썸네일)별 Meshy URL, 로컬 경로, 받은 크기 (meshy_assets 모듈)
+    재시작 후 unfinished() 로 끝나지 않은 작업을 찾아 대기/다운로드를 이어감.
+    sqlite 호출은 스레드로 넘겨 이벤트 루프를 막지 않음 (jobs.SQLiteJobStore 와 같은 방식).
+    """
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            # WAL: 쓰기 중에도 읽기가 막히지 않고, 커밋마다 fsync 하지 않아도 크래시에 안전
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS meshy_tasks (
+                    task_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    image_url TEXT,
+                    digest TEXT,
+                    stored TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS meshy_tasks_updated ON meshy_tasks(updated_at, task_id);
+                CREATE INDEX IF NOT EXISTS meshy_tasks_state ON meshy_tasks(state, updated_at);
+                CREATE TABLE IF NOT EXISTS meshy_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    at REAL NOT NULL,
+                    detail TEXT
+                );
+                CREATE INDEX IF NOT EXISTS meshy_events_task ON meshy_events(task_id, id);
+                CREATE TABLE IF NOT EXISTS meshy_assets (
+                    task_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    fetched_at REAL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (task_id, name)
+                );
+                CREATE INDEX IF NOT EXISTS meshy_assets_path ON meshy_assets(path);
+                """
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # 동기 구현 (스레드에서 실행)
+    # -----------------------------
+    @staticmethod
+    def _row(row: sqlite3.Row | None) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        d = dict(row)
+        for k in _JSON_COLUMNS:
+            if d.get(k):
+                d[k] = json.loads(d[k])
+        return d
+
+    def _record(
+        self,
+        task_id: str,
+        state: str,
+        image_url: str | None,
+        digest: str | None,
+        stored: Dict[str, Any] | None,
+        result: Dict[str, Any] | None,
+        error: str | None,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            prev = self._conn.execute("SELECT state FROM meshy_tasks WHERE task_id = ?", (task_id,)).fetchone()
+            self._conn.execute(
+                """
+                INSERT INTO meshy_tasks (task_id, state, image_url, digest, stored, result, error, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(task_id) DO UPDATE SET
+                    state = excluded.state,
+                    image_url = COALESCE(excluded.image_url, image_url),
+                    digest = COALESCE(excluded.digest, digest),
+                    stored = COALESCE(excluded.stored, stored),
+                    result = COALESCE(excluded.result, result),
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    task_id, state, image_url, digest,
+                    json.dumps(stored) if stored is not None else None,
+                    json.dumps(result) if result is not None else None,
+                    error, now, now,
+                ),
+            )
+            if prev is None or prev["state"] != state:
+                self._conn.execute(
+                    "INSERT INTO meshy_events (task_id, state, at, detail) VALUES (?, ?, ?, ?)",
+                    (task_id, state, now, error),
+                )
+            self._conn.commit()
+
+    def _get(self, task_id: str, events: bool) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._row(self._conn.execute("SELECT * FROM meshy_tasks WHERE task_id = ?", (task_id,)).fetchone())
+            if row is not None and events:
+                row["events"] = [
+                    dict(e) for e in self._conn.execute(
+                        "SELECT state, at, detail FROM meshy_events WHERE task_id = ? ORDER BY id", (task_id,)
+                    )
+                ]
+        return row
+
+    def _select(self, sql: str, args: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [self._row(r) for r in rows]
+
+    def _record_assets(self, task_id: str, assets: Dict[str, Tuple[str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO meshy_assets (task_id, name, url, path, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(task_id, name) DO UPDATE SET url = excluded.url, updated_at = excluded.updated_at
+                """,
+                [(task_id, name, url, path, now) for name, (url, path) in assets.items()],
+            )
+            self._conn.commit()
+
+    def _mark_fetched(self, task_id: str, name: str, size: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE meshy_assets SET size = ?, fetched_at = ? WHERE task_id = ? AND name = ?",
+                (size, time.time(), task_id, name),
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # 비동기 API
+    # -----------------------------
+    async def record(
+        self,
+        task_id: str,
+        state: str,
+        *,
+        image_url: str | None = None,
+        digest: str | None = None,
+        stored: Dict[str, Any] | None = None,
+        result: Dict[str, Any] | None = None,
+        error: str | None = None,
+    ) -> None:
+        """상태 기록 (주지 않은 필드는 기존 값 유지, error 는 매번 덮어씀)"""
+        await asyncio.to_thread(self._record, task_id, state, image_url, digest, stored, result, error)
+
+    async def get(self, task_id: str, events: bool = False) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, task_id, events)
+
+    async def unfinished(self) -> List[Dict[str, Any]]:
+        marks = ",".join("?" * len(UNFINISHED))
+        return await asyncio.to_thread(
+            self._select,
+            f"SELECT * FROM meshy_tasks WHERE state IN ({marks}) ORDER BY created_at",
+            UNFINISHED,
+        )
+
+    async def recent(self, limit: int = 50, before: float | None = None, state: str | None = None) -> List[Dict[str, Any]]:
+        """
+        최근 갱신 순 목록. before(updated_at) 로 다음 페이지 (키셋 페이지네이션 → 인덱스 탐색만).
+        """
+        where, args = [], []
+        if state:
+            where.append("state = ?")
+            args.append(state)
+        if before is not None:
+            where.append("updated_at < ?")
+            args.append(before)
+        sql = "SELECT * FROM meshy_tasks"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY updated_at DESC LIMIT ?"
+        args.append(max(min(limit, 500), 1))
+        return await asyncio.to_thread(self._select, sql, tuple(args))
+
+    # ---- 작업 결과물(모델 포맷 / 텍스처 / 썸네일) URL 과 로컬 위치 (meshy_assets)
+    async def record_assets(self, task_id: str, assets: Dict[str, Tuple[str, str]]) -> None:
+        """assets: 이름 → (Meshy URL, 로컬 경로). 이미 있으면 URL 만 갱신 (서명 URL 재발급)"""
+        await asyncio.to_thread(self._record_assets, task_id, assets)
+
+    async def mark_fetched(self, task_id: str, name: str, size: int) -> None:
+        await asyncio.to_thread(self._mark_fetched, task_id, name, size)
+
+    async def assets(self, task_id: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self._select, "SELECT * FROM meshy_assets WHERE task_id = ? ORDER BY name", (task_id,)
+        )
+
+    async def asset_by_path(self, path: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(self._select, "SELECT * FROM meshy_assets WHERE path = ? LIMIT 1", (path,))
+        return rows[0] if rows else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_journal: MeshyJournal | None = None
+
+
+def get_journal() -> MeshyJournal:
+    global _journal
+    if _journal is None:
+        _journal = MeshyJournal(settings.meshy_journal_path)
+    return _journal
+
+
+def close_journal() -> None:
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+
+# -----------------------------
+# 복구 (재시작 / 요청 마감 후 이어받기)
+# -----------------------------
+_recovering: Set[str] = set()
+_recovery_tasks: Set[asyncio.Task] = set()
+_recovery_sem: asyncio.Semaphore | None = None
+
+
+async def _recover_one(task_id: str) -> None:
+    from app.services.meshy import wait_and_download
+
+    global _recovery_sem
+    if _recovery_sem is None:
+        _recovery_sem = asyncio.Semaphore(max(settings.meshy_recovery_concurrency, 1))
+    try:
+        async with _recovery_sem:
+            stored = await wait_and_download(task_id)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # 실패 상태는 wait_and_download 가 저널에 남김
+        RECOVERED.labels("failed").inc()
+        return
+    finally:
+        _recovering.discard(task_id)
+    RECOVERED.labels("stored").inc()
+
+    # 중복 제거 인덱스에도 올려서 같은 이미지로 다시 요청하면 바로 적중하도록
+    row = await get_journal().get(task_id)
+    if row and row.get("digest") and settings.meshy_dedup_enabled:
+        from app.services.meshy_dedup import meshy_index
+
+        await meshy_index.record(row["digest"], task_id, stored.to_dict(), row.get("result") or {})
+
+
+def start_recovery(task_id: str) -> None:
+    """task_id 의 대기/다운로드를 백그라운드에서 이어감 (이미 진행 중이면 무시)"""
+    if task_id in _recovering:
+        return
+    _recovering.add(task_id)
+    # 빈 컨텍스트에서 시작: 호출한 요청의 마감(X-Request-Timeout)을 물려받지 않도록
+    task = contextvars.Context().run(asyncio.get_running_loop().create_task, _recover_one(task_id))
+    _recovery_tasks.add(task)
+    task.add_done_callback(_recovery_tasks.discard)
+
+
+async def recover_unfinished() -> int:
+    """
+    기동 시 호출: 저널에 끝나지 않은 작업이 있으면 이어서 대기/다운로드.
+    MESHY_RECOVERY_MAX_AGE 보다 오래된 작업은 결과 URL 이 만료됐을 가능성이 커서 failed 로 정리.
+    반환: 복구를 시작한 작업 수
+    """
+    journal = get_journal()
+    cutoff = time.time() - settings.meshy_recovery_max_age
+    started = 0
+    for row in await journal.unfinished():
+        if row["created_at"] < cutoff:
+            await journal.record(row["task_id"], FAILED, error="abandoned: too old to recover")
+            RECOVERED.labels("abandoned").inc()
+            continue
+        start_recovery(row["task_id"])
+        started += 1
+    return started
+
+
+async def stop_recovery() -> None:
+    tasks = list(_recovery_tasks)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _recovering.clear()
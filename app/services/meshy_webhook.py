@@ -0,0 +1,83 @@
+from __future__ import annotations
+# hairfusion-service/app/services/meshy_webhook.py
+import hashlib
+import hmac
+import time
+from typing import Any, Dict
+
+from app.settings import settings
+from app.services.meshy import _is_terminal, get_poller
+from app.services.metrics import counter
+
+SIGNATURE_HEADER = "X-Meshy-Signature"
+TIMESTAMP_HEADER = "X-Meshy-Timestamp"
+# 타임스탬프가 이보다 오래된 알림은 재전송(replay)으로 보고 거부 (초)
+MAX_SKEW = 300
+
+WEBHOOKS = counter(
+    "hairfusion_meshy_webhooks_total",
+    "Meshy task notifications received, by outcome",
+    ("result",),
+)
+
+
+class WebhookRejected(Exception):
+    ...
+
+
+def sign(body: bytes, timestamp: str | None = None, secret: str | None = None) -> str:
+    """'sha256=<hex>' 서명. 타임스탬프가 있으면 '<ts>.<body>' 에 대해 서명 (가짜 Meshy 도 사용)"""
+    key = (secret if secret is not None else settings.meshy_webhook_secret).encode()
+    msg = f"{timestamp}.".encode() + body if timestamp else body
+    return "sha256=" + hmac.new(key, msg, hashlib.sha256).hexdigest()
+
+
+def verify(body: bytes, signature: str | None, timestamp: str | None) -> None:
+    """
+    서명 검증. 비밀키가 없으면 모든 알림을 거부 (위조된 완료 알림 방지).
+    타임스탬프도 필수: 없으면 가로챈 알림을 언제든 다시 보낼 수 있음 (replay)
+    """
+    if not settings.meshy_webhook_secret:
+        raise WebhookRejected("webhook secret not configured")
+    if not signature:
+        raise WebhookRejected("missing signature")
+    if not timestamp:
+        raise WebhookRejected("missing timestamp")
+    try:
+        skew = abs(time.time() - float(timestamp))
+    except ValueError:
+        raise WebhookRejected("bad timestamp")
+    if skew > MAX_SKEW:
+        raise WebhookRejected("stale timestamp")
+    expected = sign(body, timestamp)
+    given = signature if signature.startswith("sha256=") else "sha256=" + signature
+    if not hmac.compare_digest(expected, given):
+        raise WebhookRejected("bad signature")
+
+
+def _task_from(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # {"data": {...작업 JSON...}} 로 감싸서 오는 경우도 허용
+    inner = payload.get("data")
+    return inner if isinstance(inner, dict) else payload
+
+
+async def handle(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    검증된 알림을 공유 폴러에 전달 → 기다리는 wait_and_download 가 바로 깨어남.
+    종료 알림인데 model_url 이 없으면(얇은 알림) 상태를 믿지 않고 즉시 한 번 조회하게 함.
+    """
+    task = _task_from(payload)
+    task_id = next((str(task[k]) for k in ("id", "task_id", "taskId", "result") if task.get(k)), None)
+    if task_id is None:
+        raise WebhookRejected("no task id")
+
+    status = (task.get("status") or "").upper()
+    if status == "SUCCEEDED" and not task.get("model_url"):
+        matched = await get_poller().notify(task_id, None)
+    elif status:
+        matched = await get_poller().notify(task_id, task)
+    else:
+        matched = await get_poller().notify(task_id, None)
+
+    WEBHOOKS.labels("matched" if matched else "unmatched").inc()
+    return {"task_id": task_id, "status": status or None, "terminal": bool(status) and _is_terminal(task), "matched": matched}
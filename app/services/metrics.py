@@ -0,0 +1,202 @@
+from __future__ import annotations
+# hairfusion-service/app/services/metrics.py
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# 기본 지연 버킷 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -----------------------------
+# 값 타입 (라벨 조합 하나당 하나)
+# -----------------------------
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, v: float = 1.0) -> None:
+        self.value += v
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def inc(self, v: float = 1.0) -> None:
+        self.value += v
+
+    def dec(self, v: float = 1.0) -> None:
+        self.value -= v
+
+
+class Histogram:
+    """
+    고정 버킷 히스토그램. observe() 는 리스트 인덱스 증가만 하므로 요청 경로에 둬도 부담 없음.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def since(self, t0: float) -> None:
+        """t0 = time.perf_counter() 로부터 경과 시간 기록"""
+        self.observe(time.perf_counter() - t0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, acc = {}, 0
+        for le, c in zip(list(self.buckets) + ["+Inf"], self.counts):
+            acc += c
+            cumulative[str(le)] = acc
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": cumulative}
+
+
+# -----------------------------
+# 레지스트리 + Prometheus 텍스트 포맷
+# -----------------------------
+class Family:
+    """이름/도움말/라벨이 같은 지표 묶음. labels(...) 로 값 객체를 얻어 재사용할 것."""
+
+    def __init__(self, name: str, help: str, kind: str, label_names: Tuple[str, ...], factory: Callable[[], Any]) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = label_names
+        self._factory = factory
+        self.children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self._factory()
+        return child
+
+
+_registry: List[Family] = []
+_callbacks: List[Tuple[str, str, Callable[[], float]]] = []
+
+
+def _family(name: str, help: str, kind: str, labels: Sequence[str], factory) -> Family:
+    fam = Family(name, help, kind, tuple(labels), factory)
+    _registry.append(fam)
+    return fam
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Family:
+    return _family(name, help, "counter", labels, CounterValue)
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = ()) -> Family:
+    return _family(name, help, "gauge", labels, Gauge)
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Family:
+    return _family(name, help, "histogram", labels, lambda: Histogram(buckets))
+
+
+def gauge_callback(name: str, help: str, fn: Callable[[], float]) -> None:
+    """스크레이프 시점에 fn() 으로 값을 읽는 게이지 (상태를 따로 갱신할 필요 없음)"""
+    _callbacks.append((name, help, fn))
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    out: List[str] = []
+    for fam in _registry:
+        out.append(f"# HELP {fam.name} {fam.help}")
+        out.append(f"# TYPE {fam.name} {fam.kind}")
+        for values, child in fam.children.items():
+            if fam.kind == "histogram":
+                acc = 0
+                for le, c in zip(list(child.buckets) + ["+Inf"], child.counts):
+                    acc += c
+                    le_label = 'le="%s"' % le
+                    out.append(f"{fam.name}_bucket{_labels(fam.label_names, values, le_label)} {acc}")
+                out.append(f"{fam.name}_sum{_labels(fam.label_names, values)} {child.sum}")
+                out.append(f"{fam.name}_count{_labels(fam.label_names, values)} {child.count}")
+            else:
+                out.append(f"{fam.name}{_labels(fam.label_names, values)} {child.value}")
+    for name, help, fn in _callbacks:
+        try:
+            value = float(fn())
+        except Exception:
+            continue
+        out.append(f"# HELP {name} {help}")
+        out.append(f"# TYPE {name} gauge")
+        out.append(f"{name} {value}")
+    return "\n".join(out) + "\n"
+
+
+# -----------------------------
+# 서비스 공통 지표
+# -----------------------------
+STAGE_SECONDS = histogram(
+    "hairfusion_stage_seconds",
+    "Latency of each pipeline stage",
+    ("stage",),
+)
+UPSTREAM_RESPONSES = counter(
+    "hairfusion_upstream_responses_total",
+    "Responses received from upstream services by status code",
+    ("upstream", "status"),
+)
+DOWNLOAD_BYTES = counter(
+    "hairfusion_download_bytes_total",
+    "Bytes downloaded from upstream result URLs",
+)
+UNHANDLED_EXCEPTIONS = counter(
+    "hairfusion_unhandled_exceptions_total",
+    "Exceptions that reached the global exception handler",
+    ("type",),
+)
+LOOP_LAG = histogram(
+    "hairfusion_event_loop_lag_seconds",
+    "How late the event loop woke up a periodic timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# 자주 쓰는 단계는 미리 꺼내 둠 (호출마다 라벨 조회를 하지 않도록)
+STAGE_AILAB_ATTEMPT = STAGE_SECONDS.labels("ailab_attempt")
+STAGE_IMAGE_PREP = STAGE_SECONDS.labels("image_prep")
+STAGE_MESHY_CREATE = STAGE_SECONDS.labels("meshy_create")
+STAGE_MESHY_POLL = STAGE_SECONDS.labels("meshy_poll")
+STAGE_DOWNLOAD = STAGE_SECONDS.labels("download")
+STAGE_DISK_WRITE = STAGE_SECONDS.labels("disk_write")
+STAGE_S3_UPLOAD = STAGE_SECONDS.labels("s3_upload")
+DOWNLOADED = DOWNLOAD_BYTES.labels()
+_LOOP_LAG = LOOP_LAG.labels()
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """interval 마다 깨어나 예정보다 얼마나 늦었는지 기록 (블로킹 코드 탐지용)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        _LOOP_LAG.observe(max(loop.time() - t0 - interval, 0.0))
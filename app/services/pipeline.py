@@ -0,0 +1,246 @@
+from __future__ import annotations
+# hairfusion-service/app/services/pipeline.py
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.settings import settings
+from app.services.scheduler import QueueFull
+
+# 아이템 하나가 거치는 단계 (순서대로)
+#   fuse    : AILab 헤어 합성 (fuse 캐시 경유)
+#   prepare : _prepare_image_for_meshy 로 RGB/최소 크기 정리 후 PNG 저장
+#   publish : Meshy 가 가져갈 수 있는 URL 로 공개 (로컬 /static 또는 S3)
+#   meshy   : Meshy 변환 + GLB 저장 (중복 제거 경유)
+STAGES = ("fuse", "prepare", "publish", "meshy")
+
+# 아이템 진행률에서 단계별 비중 (대부분의 시간은 Meshy 대기)
+_WEIGHTS = {"fuse": 25, "prepare": 5, "publish": 10, "meshy": 60}
+
+OUT_DIR = Path("outputs/pipeline")
+
+Save = Callable[[], Awaitable[None]]
+
+
+def _resume_stage(item: Dict[str, Any]) -> str | None:
+    """저장된 아이템 상태로부터 이어서 할 단계 (재시작 후 재개용)"""
+    if item.get("status") in ("succeeded", "failed"):
+        return None
+    if item.get("task_id") or item.get("image_url"):
+        return "meshy"
+    if item.get("prepared_path"):
+        return "publish"
+    if item.get("fused_path"):
+        return "prepare"
+    return "fuse"
+
+
+def _item_progress(item: Dict[str, Any]) -> int:
+    if item.get("status") in ("succeeded", "failed"):
+        return 100
+    stage = _resume_stage(item)
+    done = sum(_WEIGHTS[s] for s in STAGES[: STAGES.index(stage)])
+    if stage == "meshy":
+        done += _WEIGHTS["meshy"] * (item.get("meshy_progress") or 0) // 100
+    return done
+
+
+def _stage_counts(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    counts = {s: {"active": 0, "done": 0, "failed": 0} for s in STAGES}
+    for item in items:
+        stage = item.get("failed_stage") or item.get("stage") or STAGES[0]
+        for s in STAGES[: STAGES.index(stage)]:
+            counts[s]["done"] += 1
+        status = item.get("status")
+        if status == "failed":
+            counts[stage]["failed"] += 1
+        elif status == "succeeded":
+            counts[stage]["done"] += 1
+        elif status in ("running", "throttled"):
+            counts[stage]["active"] += 1
+    return counts
+
+
+# -----------------------------
+# 단계별 처리
+# -----------------------------
+async def _fuse(item: Dict[str, Any], opts: Dict[str, Any], save: Save) -> None:
+    from app.services.fuse_cache import cached_hairstyle_edit
+
+    saved, cache = await cached_hairstyle_edit(
+        face_url=item["face_url"],
+        hair_style=item.get("hair_style"),
+        color=item.get("color"),
+        image_size=item.get("image_size"),
+        task_type=opts.get("task_type"),
+    )
+    item.update(fused_path=saved, fuse_cache=cache)
+
+
+async def _prepare(item: Dict[str, Any], opts: Dict[str, Any], save: Save) -> None:
+    from app.services.ailabtools import _normalize_to_png
+    from app.services.imaging import run_image_job
+    from app.services.retention import note, sharded
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    dest = sharded(OUT_DIR, f"{opts['job_id']}_{item['index']}.png")
+    await run_image_job(_normalize_to_png, item["fused_path"], str(dest), settings.output_png_compress_level)
+    note(dest)
+    item["prepared_path"] = str(dest)
+
+
+async def _publish(item: Dict[str, Any], opts: Dict[str, Any], save: Save) -> None:
+    path = Path(item["prepared_path"])
+    if opts.get("publish") == "s3":
+        from app.services.storage import upload_file_async
+
+        _, url = await upload_file_async(str(path), key_prefix="pipeline/")
+    else:
+        base = (opts.get("public_base_url") or "").rstrip("/")
+        url = f"{base}/static/{path.relative_to('outputs').as_posix()}"
+    item["image_url"] = url
+
+
+async def _meshy(item: Dict[str, Any], opts: Dict[str, Any], save: Save) -> None:
+    from app.services.meshy import final_task_json, wait_and_download
+    from app.services.meshy_dedup import meshify_image
+
+    async def on_progress(task_json: Dict[str, Any]) -> None:
+        p = task_json.get("progress") or 0
+        if p != item.get("meshy_progress"):
+            item["meshy_progress"] = p
+            await save()
+
+    async def on_task(task_id: str) -> None:
+        item["task_id"] = task_id
+        await save()
+
+    if item.get("task_id"):
+        # 재개: 이미 만든 Meshy 작업을 이어서 대기
+        stored = (await wait_and_download(item["task_id"], on_progress)).to_dict()
+        result = {"job_id": item["task_id"], **stored, "result": await final_task_json(item["task_id"])}
+    else:
+        result, item["dedup"] = await meshify_image(item["image_url"], on_task, on_progress)
+    item["task_id"] = result["job_id"]
+    item["model"] = {k: result.get(k) for k in ("saved_path", "public_url", "s3_key", "viewer_url", "preview_url")}
+
+
+_HANDLERS = {"fuse": _fuse, "prepare": _prepare, "publish": _publish, "meshy": _meshy}
+
+
+# -----------------------------
+# 파이프라인 실행
+# -----------------------------
+async def run_pipeline(items: List[Dict[str, Any]], opts: Dict[str, Any], save: Save) -> None:
+    """
+    아이템들을 단계별 큐 + 워커로 흘려보냄.
+    단계마다 워커가 따로 있어서, 앞 아이템이 Meshy 를 기다리는 동안 다음 아이템의 합성이 진행됨.
+    - 아이템 실패는 그 아이템만 failed 로 표시하고 나머지는 계속 진행
+    - 업스트림 대기열이 가득 차면(QueueFull) retry_after 만큼 쉬었다가 같은 단계를 재시도
+    - 상태는 items(dict 리스트)에 직접 기록하고 save() 로 영속화
+    """
+    from app.services.jobs import error_status
+
+    queues: Dict[str, asyncio.Queue[int]] = {s: asyncio.Queue() for s in STAGES}
+    remaining = sum(1 for item in items if _resume_stage(item) is not None)
+    all_done = asyncio.Event()
+    if remaining == 0:
+        return
+
+    def finish() -> None:
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            all_done.set()
+
+    async def worker(stage: str) -> None:
+        nxt = STAGES[STAGES.index(stage) + 1] if stage != STAGES[-1] else None
+        while True:
+            i = await queues[stage].get()
+            item = items[i]
+            item.update(stage=stage, status="running")
+            await save()
+            try:
+                while True:
+                    try:
+                        await _HANDLERS[stage](item, opts, save)
+                        break
+                    except QueueFull as e:
+                        item["status"] = "throttled"
+                        await save()
+                        await asyncio.sleep(e.retry_after)
+                        item["status"] = "running"
+            except Exception as e:
+                item.update(
+                    status="failed",
+                    failed_stage=stage,
+                    error={"type": type(e).__name__, "message": str(e)[:400], "status_code": error_status(e)},
+                )
+                finish()
+            else:
+                if nxt is None:
+                    item["status"] = "succeeded"
+                    finish()
+                else:
+                    item.update(stage=nxt, status="pending")
+                    queues[nxt].put_nowait(i)
+            await save()
+
+    workers = {
+        "fuse": max(settings.pipeline_fuse_workers, 1),
+        "prepare": 2,
+        "publish": 2,
+        "meshy": max(settings.pipeline_meshy_workers, 1),
+    }
+    tasks = [asyncio.create_task(worker(s)) for s, n in workers.items() for _ in range(n)]
+    for i, item in enumerate(items):
+        stage = _resume_stage(item)
+        if stage is not None:
+            item.update(stage=stage, status="pending")
+            queues[stage].put_nowait(i)
+    # 워커는 끝나지 않는 루프 → 먼저 끝난 워커가 있으면 save() 등에서 난 예외(잡 저장소 오류 등)
+    # 그대로 기다리면 그 단계의 아이템이 영영 끝나지 않으므로 잡을 실패로 올림
+    waiter = asyncio.create_task(all_done.wait())
+    try:
+        done, _ = await asyncio.wait([waiter, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        for t in tasks:
+            if t in done:
+                t.result()
+                raise RuntimeError("pipeline worker exited unexpectedly")
+    finally:
+        waiter.cancel()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(waiter, *tasks, return_exceptions=True)
+
+
+async def pipeline_job(job, update) -> Dict[str, Any]:
+    """
+    잡 핸들러: 입력 아이템마다 fuse → prepare → publish → meshy 를 수행.
+    진행 상황은 job.data["items"](아이템별 단계/상태)와 job.data["stages"](단계별 집계)에 남김.
+    모든 아이템이 실패하면 잡도 실패, 일부만 실패하면 성공 + 아이템별 error.
+    """
+    from app.services.jobs import JobError
+
+    items: List[Dict[str, Any]] = job.data.get("items") or [
+        {"index": i, **spec, "stage": "fuse", "status": "pending"} for i, spec in enumerate(job.input["items"])
+    ]
+    opts = {
+        "job_id": job.id,
+        "task_type": job.input.get("task_type"),
+        "publish": job.input.get("publish") or settings.pipeline_publish,
+        "public_base_url": job.input.get("public_base_url"),
+    }
+
+    async def save() -> None:
+        progress = sum(_item_progress(it) for it in items) // max(len(items), 1)
+        await update(stage="pipeline", progress=progress, items=items, stages=_stage_counts(items))
+
+    await save()
+    await run_pipeline(items, opts, save)
+
+    ok = sum(1 for it in items if it.get("status") == "succeeded")
+    if ok == 0:
+        first = next((it.get("error") for it in items if it.get("error")), None) or {}
+        raise JobError(f"all {len(items)} items failed: {first.get('message')}")
+    return {"items": items, "ok": ok, "failed": len(items) - ok}
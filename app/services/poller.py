@@ -0,0 +1,266 @@
+from __future__ import annotations
+# hairfusion-service/app/services/poller.py
+import asyncio
+import contextvars
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+Fetcher = Callable[[str], Awaitable[Dict[str, Any]]]
+TerminalCheck = Callable[[Dict[str, Any]], bool]
+UpdateHook = Callable[[Dict[str, Any]], Any]
+TransientCheck = Callable[[BaseException], bool]
+
+
+def backoff_delay(
+    attempt: int,
+    min_interval: float,
+    max_interval: float,
+    factor: float = 1.5,
+    jitter: float = 0.2,
+) -> float:
+    """
+    attempt 번째 폴링 이후 다음 폴링까지의 대기 시간(초).
+    - min_interval 에서 시작해 factor 배씩 늘리고 max_interval 에서 멈춤
+    - ±jitter 비율만큼 무작위로 흔들어 여러 작업의 폴링이 한 순간에 몰리지 않게 함
+    """
+    base = min(max_interval, min_interval * (factor ** max(attempt, 0)))
+    if jitter > 0:
+        base *= 1.0 + random.uniform(-jitter, jitter)
+    return max(min_interval * 0.5, min(base, max_interval))
+
+
+@dataclass
+class _Watch:
+    task_id: str
+    future: asyncio.Future
+    next_at: float
+    attempt: int = 0
+    waiters: int = 0
+    last: Dict[str, Any] = field(default_factory=dict)
+    listeners: List[UpdateHook] = field(default_factory=list)
+
+
+class TaskPoller:
+    """
+    여러 task_id 를 하나의 백그라운드 루프에서 감시하는 공유 폴러.
+    - 요청마다 while/sleep 루프를 돌리는 대신, 루프 하나가 '폴링할 때가 된' 작업만 모아 동시에 조회
+    - 같은 task_id 를 여러 요청이 기다리면 조회는 한 번만 수행하고 결과를 공유
+    - 종료 상태(is_terminal)가 되면 마지막 JSON 으로 future 를 완료
+    - notify() 로 외부(웹훅)에서 받은 상태를 바로 반영 → 폴링은 느린 보정용으로만 남길 수 있음
+    - is_transient(예외) 가 True 인 조회 실패는 감시를 끝내지 않고 백오프 후 다시 조회
+    """
+
+    # 기다리는 요청이 생기기 전에 도착한 종료 알림을 잠깐 보관하는 개수
+    EARLY_LIMIT = 256
+
+    def __init__(
+        self,
+        fetch: Fetcher,
+        is_terminal: TerminalCheck,
+        *,
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+        factor: float = 1.5,
+        jitter: float = 0.2,
+        concurrency: int = 8,
+        first_delay: float = 0.0,
+        is_transient: TransientCheck | None = None,
+    ) -> None:
+        self._fetch = fetch
+        self._is_terminal = is_terminal
+        self.min_interval = max(min_interval, 0.01)
+        self.max_interval = max(max_interval, self.min_interval)
+        self.factor = max(factor, 1.0)
+        self.jitter = max(jitter, 0.0)
+        self.concurrency = max(concurrency, 1)
+        self.first_delay = max(first_delay, 0.0)   # 감시 시작 후 첫 조회까지 대기 (웹훅 모드용)
+        self._is_transient = is_transient
+
+        self._early: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._watches: Dict[str, _Watch] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._polls: Set[asyncio.Task] = set()
+
+    # -----------------------------
+    # 외부 API
+    # -----------------------------
+    @property
+    def watching(self) -> int:
+        return len(self._watches)
+
+    async def wait(self, task_id: str, on_update: UpdateHook | None = None) -> Dict[str, Any]:
+        """
+        task_id 가 종료 상태가 될 때까지 대기 후 마지막 작업 JSON 반환.
+        타임아웃은 호출 측에서 asyncio.wait_for 로 감싼다. (취소 시 감시 해제)
+        on_update 를 주면 매 폴링 결과(JSON)로 호출됨 (진행률 전달용)
+        """
+        self._ensure_running()
+
+        early = self._early.pop(task_id, None)
+        if early is not None:
+            # 대기 시작 전에 이미 종료 알림이 와 있음
+            if on_update is not None:
+                await self._call_hook(on_update, early)
+            return early
+
+        w = self._watches.get(task_id)
+        if w is None:
+            loop = asyncio.get_running_loop()
+            w = _Watch(task_id=task_id, future=loop.create_future(), next_at=time.monotonic() + self.first_delay)
+            self._watches[task_id] = w
+            self._wakeup.set()
+
+        w.waiters += 1
+        if on_update is not None:
+            w.listeners.append(on_update)
+        try:
+            return await asyncio.shield(w.future)
+        finally:
+            w.waiters -= 1
+            if on_update is not None and on_update in w.listeners:
+                w.listeners.remove(on_update)
+            if w.waiters <= 0 and self._watches.get(task_id) is w:
+                # 기다리는 요청이 없으면 더 이상 폴링하지 않음
+                self._watches.pop(task_id, None)
+                if not w.future.done():
+                    w.future.cancel()
+
+    async def notify(self, task_id: str, data: Dict[str, Any] | None = None) -> bool:
+        """
+        외부(웹훅 등)에서 받은 작업 상태를 반영. 기다리는 요청이 있으면 True.
+        - data 가 종료 상태면 기다리는 요청을 즉시 완료
+        - data 가 None 이면 '바뀌었으니 확인해 봐라' 로 보고 바로 한 번 조회
+        - 아직 아무도 기다리지 않는 작업의 종료 알림은 잠깐 보관했다가 wait() 에서 사용
+        """
+        w = self._watches.get(task_id)
+        if w is None:
+            if data is not None and self._is_terminal(data):
+                self._early[task_id] = data
+                while len(self._early) > self.EARLY_LIMIT:
+                    self._early.popitem(last=False)
+            return False
+        if data is None:
+            if w.next_at != float("inf"):   # 이미 조회 중이면 그대로 둠
+                w.next_at = time.monotonic()
+                if self._wakeup is not None:
+                    self._wakeup.set()
+            return True
+        await self._apply(w, data, schedule=False)
+        return True
+
+    async def aclose(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._runner = None
+        for t in list(self._polls):
+            t.cancel()
+        await asyncio.gather(*self._polls, return_exceptions=True)
+        self._polls.clear()
+        for w in self._watches.values():
+            if not w.future.done():
+                w.future.cancel()
+        self._watches.clear()
+        self._early.clear()
+
+    # -----------------------------
+    # 내부 루프
+    # -----------------------------
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._runner is not None and not self._runner.done() and self._runner.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        # 빈 컨텍스트에서 시작: 처음 wait() 한 요청의 contextvar(레인, 요청 마감 등)를 루프가 물려받지 않도록
+        self._runner = contextvars.Context().run(loop.create_task, self._run())
+
+    async def _poll_task(self, w: _Watch, sem: asyncio.Semaphore) -> None:
+        try:
+            await self._poll_one(w, sem)
+        finally:
+            if w.next_at == float("inf") and not w.future.done() and self._watches.get(w.task_id) is w:
+                self._schedule(w)   # 예상 못 한 실패로 다음 조회가 예약되지 않았으면 백오프 후 다시
+            if self._wakeup is not None:
+                self._wakeup.set()   # 루프가 새 next_at 으로 대기 시간을 다시 계산하도록
+
+    async def _poll_one(self, w: _Watch, sem: asyncio.Semaphore) -> None:
+        async with sem:
+            try:
+                data = await self._fetch(w.task_id)
+            except Exception as e:
+                if self._is_transient is not None and self._is_transient(e):
+                    # 일시적 오류(연결 끊김, 5xx, 서킷 열림) → 다음 조회 예약 (전체 대기 시간은 호출 측 타임아웃)
+                    self._schedule(w)
+                    return
+                self._finish(w, exc=e)
+                return
+        await self._apply(w, data)
+
+    @staticmethod
+    async def _call_hook(hook: UpdateHook, data: Dict[str, Any]) -> None:
+        try:
+            res = hook(data)
+            if asyncio.iscoroutine(res):
+                await res
+        except Exception:
+            pass
+
+    async def _apply(self, w: _Watch, data: Dict[str, Any], schedule: bool = True) -> None:
+        # schedule=False: 알림으로 받은 상태 → 다음 조회 시점은 건드리지 않음
+        w.last = data
+        for hook in list(w.listeners):
+            await self._call_hook(hook, data)
+
+        if self._is_terminal(data):
+            self._finish(w, result=data)
+            return
+        if not schedule:
+            return
+        self._schedule(w)
+
+    def _schedule(self, w: _Watch) -> None:
+        delay = backoff_delay(
+            w.attempt, self.min_interval, self.max_interval, self.factor, self.jitter
+        )
+        w.attempt += 1
+        w.next_at = time.monotonic() + delay
+
+    def _finish(self, w: _Watch, result: Dict[str, Any] | None = None, exc: BaseException | None = None) -> None:
+        if self._watches.get(w.task_id) is w:
+            self._watches.pop(w.task_id, None)
+        if w.future.done():
+            return
+        if exc is not None:
+            w.future.set_exception(exc)
+        else:
+            w.future.set_result(result or {})
+
+    async def _run(self) -> None:
+        sem = asyncio.Semaphore(self.concurrency)
+        while True:
+            now = time.monotonic()
+            due = [w for w in self._watches.values() if w.next_at <= now]
+
+            # 작업마다 조회 태스크를 따로 띄우고(동시 조회 수는 sem) 곧바로 다음 일정으로:
+            # 느린 get_job 하나가 다른 작업의 조회 / 웹훅 반영 / 새 watch() 를 막지 않도록
+            for w in due:
+                w.next_at = float("inf")   # 조회 중에는 다시 뽑히지 않게 (_poll_one 이 다시 예약)
+                t = asyncio.get_running_loop().create_task(self._poll_task(w, sem))
+                self._polls.add(t)
+                t.add_done_callback(self._polls.discard)
+
+            pending = [w.next_at for w in self._watches.values() if w.next_at != float("inf")]
+            timeout = max(min(pending) - now, 0.0) if pending else None
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
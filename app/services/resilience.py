@@ -0,0 +1,326 @@
+from __future__ import annotations
+# hairfusion-service/app/services/resilience.py
+import asyncio
+import contextvars
+import math
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+import httpx
+
+from app.settings import settings
+from app.services.http import get_client
+from app.services.metrics import counter, gauge_callback
+from app.services.poller import backoff_delay
+from app.services.scheduler import QueueFull
+
+T = TypeVar("T")
+
+RETRIES = counter("hairfusion_upstream_retries_total", "Upstream calls retried after a transient failure", ("upstream",))
+HEDGES = counter("hairfusion_hedged_requests_total", "Hedged attempts started / won", ("outcome",))
+BREAKER_REJECTED = counter("hairfusion_breaker_rejected_total", "Calls rejected by an open circuit breaker", ("upstream",))
+
+# 요청이 기다릴 수 있는 시간(초)을 알려주는 헤더 (예: "X-Request-Timeout: 30")
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# 재시도할 응답 코드
+#   멱등 호출(GET) : 5xx 전체 + 429
+#   비멱등 호출(POST, 과금 가능) : Retry-After 가 붙은 429/503 만 (오리진이 받지 않고 거절했다는 뜻)
+#     502/504 는 게이트웨이 뒤에서 오리진이 이미 처리(과금)했을 수 있으므로 재시도하지 않음
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+SAFE_STATUS = {429, 503}
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# 요청이 아예 나가지 않은 전송 오류 → 비멱등 호출도 재시도해도 안전
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# 요청의 마감 시각 (time.monotonic 기준). 핸들러에서 set_deadline() → 하위 호출까지 전파
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """요청 마감 시각이 지남 → 504"""
+
+
+class CircuitOpen(QueueFull):
+    """
+    업스트림 서킷이 열려 있음 → 호출하지 않고 바로 실패.
+    QueueFull 과 같은 방식(503 + Retry-After, 잡은 잠시 후 재시도)으로 처리되도록 하위 타입으로 둠.
+    """
+
+    def __init__(self, upstream: str, retry_after: int) -> None:
+        super().__init__(upstream, retry_after)
+        self.args = (f"{upstream} circuit is open, retry after {retry_after}s",)
+
+
+# -----------------------------
+# 마감 시각 전파
+# -----------------------------
+def set_deadline(timeout: float | str | None = None) -> float | None:
+    """
+    지금부터 timeout 초 뒤를 마감으로 지정 (헤더 값 문자열도 허용).
+    없거나 잘못된 값이면 REQUEST_DEADLINE (0 이면 마감 없음).
+    """
+    try:
+        seconds = float(timeout) if timeout not in (None, "") else settings.request_deadline
+    except (TypeError, ValueError):
+        seconds = settings.request_deadline
+    deadline = time.monotonic() + seconds if seconds and seconds > 0 else None
+    _deadline.set(deadline)
+    return deadline
+
+
+def clear_deadline() -> None:
+    """백그라운드 잡 등 요청과 수명이 다른 작업에서 호출 (요청의 마감을 물려받지 않도록)"""
+    _deadline.set(None)
+
+
+def remaining() -> float | None:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def timeout_for(default: float | None) -> float | None:
+    """업스트림 호출 타임아웃 = min(기본값, 남은 시간). 이미 지났으면 DeadlineExceeded"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left if default is None else min(default, left)
+
+
+async def within_deadline(aw: Awaitable[T]) -> T:
+    left = remaining()
+    if left is None:
+        return await aw
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    try:
+        return await asyncio.wait_for(aw, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("request deadline exceeded")
+
+
+async def _sleep(delay: float) -> None:
+    left = remaining()
+    if left is not None and delay >= left:
+        raise DeadlineExceeded("request deadline exceeded while backing off")
+    await asyncio.sleep(delay)
+
+
+# -----------------------------
+# 서킷 브레이커
+# -----------------------------
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    업스트림별 서킷 브레이커.
+    - closed   : 정상. 연속 실패(전송 오류/5xx)가 failure_threshold 에 닿으면 open
+    - open     : reset_timeout 동안 호출하지 않고 바로 CircuitOpen
+    - half_open: reset_timeout 이 지나면 시험 호출 하나만 통과 → 성공하면 closed, 실패하면 다시 open
+    4xx 는 업스트림이 살아 있다는 뜻이므로 성공으로 셈.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = max(reset_timeout, 0.0)
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self._open = False
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if not self._open:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> None:
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == OPEN or self._probing:
+            BREAKER_REJECTED.labels(self.name).inc()
+            left = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpen(self.name, max(math.ceil(left), 1))
+        self._probing = True
+
+    def success(self) -> None:
+        self.failures = 0
+        self._open = False
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if not self._open or self._probing:
+                self.opened_total += 1
+            self._open = True
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """결과를 판단하지 못한 채 끝난 시험 호출(취소 등) → 다음 호출이 다시 시험할 수 있게"""
+        self._probing = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "opened_total": self.opened_total}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+# 서킷 브레이커를 두는 업스트림 (download 는 임의의 CDN 호스트라 제외)
+BREAKER_UPSTREAMS = ("ailab", "meshy")
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name, settings.breaker_failure_threshold, settings.breaker_reset_timeout
+        )
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: get_breaker(name).to_dict() for name in BREAKER_UPSTREAMS}
+
+
+for _name in BREAKER_UPSTREAMS:
+    gauge_callback(
+        f"hairfusion_breaker_open_{_name}",
+        f"1 if the {_name} circuit breaker is open (or half-open), else 0",
+        lambda n=_name: 0.0 if get_breaker(n).state == CLOSED else 1.0,
+    )
+
+
+def is_transient(exc: BaseException) -> bool:
+    """잠시 뒤 다시 하면 될 수 있는 실패인지 (폴러가 감시를 끝내지 않고 다음 조회로 넘길지 판단)"""
+    if isinstance(exc, (httpx.TransportError, CircuitOpen)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return False
+
+
+def _retry_after(r: httpx.Response) -> float | None:
+    value = r.headers.get("Retry-After", "")
+    try:
+        return min(float(value), settings.retry_max_delay)
+    except ValueError:
+        return None
+
+
+# -----------------------------
+# 재시도 + 브레이커를 거치는 업스트림 호출
+# -----------------------------
+async def request(
+    upstream: str,
+    method: str,
+    url: str,
+    *,
+    idempotent: bool,
+    timeout: float | None = None,
+    client: httpx.AsyncClient | None = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """
+    get_client(upstream) 로 요청 1건을 보내되
+    - 서킷이 열려 있으면 보내지 않고 CircuitOpen
+    - 전송 오류/재시도 대상 응답이면 지수 백오프(+지터, Retry-After 우선)로 RETRY_MAX_ATTEMPTS 까지 재시도
+      (비멱등 호출은 요청이 나가지 않은 전송 오류와 Retry-After 가 붙은 429/503 만,
+       시도마다 같은 Idempotency-Key 를 붙여 업스트림이 중복 요청을 알아볼 수 있게 함)
+    - 타임아웃과 백오프는 요청 마감(set_deadline)을 넘지 않음
+    재시도를 다 쓰면 마지막 응답을 그대로 돌려주거나(상태 코드 해석은 호출 측) 마지막 예외를 올림.
+    """
+    client = client or get_client(upstream)
+    breaker = get_breaker(upstream) if upstream in BREAKER_UPSTREAMS else None
+    attempts = max(settings.retry_max_attempts, 1)
+    retry_status = RETRYABLE_STATUS if idempotent else SAFE_STATUS
+    if not idempotent:
+        headers = dict(kwargs.get("headers") or {})
+        headers.setdefault(IDEMPOTENCY_HEADER, uuid.uuid4().hex)
+        kwargs["headers"] = headers
+
+    for attempt in range(1, attempts + 1):
+        t = timeout_for(timeout)
+        if t is not None:
+            kwargs["timeout"] = t
+        if breaker is not None:
+            breaker.allow()
+        try:
+            r = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if breaker is not None:
+                breaker.failure()
+            if attempt == attempts or not (idempotent or isinstance(e, _NOT_SENT)):
+                raise
+            delay = None
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        else:
+            if breaker is not None:
+                breaker.failure() if r.status_code >= 500 else breaker.success()
+            if attempt == attempts or r.status_code not in retry_status:
+                return r
+            delay = _retry_after(r)
+            if delay is None and not idempotent:
+                return r
+            await r.aclose()
+
+        RETRIES.labels(upstream).inc()
+        if delay is None:
+            delay = backoff_delay(attempt - 1, settings.retry_base_delay, settings.retry_max_delay, factor=2.0)
+        await _sleep(delay)
+
+    raise AssertionError("unreachable")
+
+
+# -----------------------------
+# 헤지 요청
+# -----------------------------
+async def hedged(fn: Callable[[int], Awaitable[T]], delay: float, attempts: int = 2) -> T:
+    """
+    fn(0) 을 시작하고 delay 초 안에 끝나지 않으면 fn(1) 을 추가로 시작 (attempts 개까지).
+    먼저 성공한 결과를 쓰고 나머지는 취소. 앞 시도가 실패하면 기다리지 않고 다음 시도를 시작.
+    느린 꼬리 지연(한 커넥션/엣지 노드가 느린 경우)을 줄이기 위한 것이므로 멱등 호출에만 사용.
+    """
+    if delay <= 0 or attempts <= 1:
+        return await fn(0)
+
+    pending = {asyncio.create_task(fn(0))}
+    started = 1
+    last_exc: BaseException | None = None
+    try:
+        while pending:
+            timeout = delay if started < attempts else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if started > 1:
+                        HEDGES.labels("hedge_won" if getattr(t, "hedge_index", 0) else "primary_won").inc()
+                    return t.result()
+                last_exc = t.exception()
+            if started < attempts and (not done or not pending):
+                # 느리거나(타임아웃) 모두 실패 → 다음 시도
+                task = asyncio.create_task(fn(started))
+                task.hedge_index = started  # type: ignore[attr-defined]
+                pending.add(task)
+                started += 1
+                HEDGES.labels("fired").inc()
+        assert last_exc is not None
+        raise last_exc
+    finally:
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,533 @@
+from __future__ import annotations
+# hairfusion-service/app/services/retention.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.settings import settings
+from app.services.derivatives import MASTER_SUFFIXES
+from app.services.metrics import STAGE_SECONDS, counter, gauge_callback
+
+# outputs/ 보존 관리 (OUTPUT_QUOTA_BYTES / OUTPUT_TTL_SECONDS 중 하나라도 켜면 동작)
+#   인덱스 : SQLite(WAL) 에 결과물(마스터)별 크기(부속 파일 포함), 만든 시각, 마지막 접근 시각, S3 이전 URL
+#            → 용량 합계 / LRU 후보를 outputs/ 를 훑지 않고 인덱스로 구함
+#   기록   : 저장(note) / /static 서빙(touch) 은 메모리에 모았다가 스위퍼가 한 번에 반영 (요청 경로에서 SQLite 안 건드림)
+#   스위퍼 : TTL 이 지난 것 → 한도를 넘었으면 오래 안 쓰인 것부터 low-water 까지 정리
+#            OUTPUT_OFFLOAD 면 S3 로 옮긴 뒤 지우고, 이후 /static 요청은 S3 URL 로 리다이렉트
+#   부속 파일(.gz/.br, .preview, 파생본)은 마스터와 함께 세고 함께 지움
+#   cache/ (fuse 결과 캐시) 는 FUSE_CACHE_MAX_BYTES 로 따로 관리하므로 제외
+ROOT = Path("outputs")
+EXCLUDED = {"cache"}
+
+STAGE_SWEEP = STAGE_SECONDS.labels("outputs_sweep")
+EVICTED = counter(
+    "hairfusion_outputs_evicted_total",
+    "Output artifacts removed by the retention sweeper, by reason (ttl, quota) and action (deleted, offloaded)",
+    ("reason", "action"),
+)
+EVICTED_BYTES = counter(
+    "hairfusion_outputs_evicted_bytes_total",
+    "Bytes freed under outputs/ by the retention sweeper, by reason",
+    ("reason",),
+)
+OFFLOAD_FAILED = counter(
+    "hairfusion_outputs_offload_failed_total",
+    "Artifacts kept on disk because the S3 offload failed",
+)
+
+
+def enabled() -> bool:
+    return settings.output_quota_bytes > 0 or settings.output_ttl_seconds > 0
+
+
+# -----------------------------
+# 샤딩 (디렉터리당 파일 수 제한)
+# -----------------------------
+_made_dirs: Set[Path] = set()
+
+
+def shard_of(name: str) -> str:
+    """
+    이름 → 2자리 hex 샤드 (이름의 sha1 앞 두 글자).
+    이름 속 토큰을 쓰면 안 됨: Meshy 작업 id 는 UUIDv7 이라 앞부분이 타임스탬프 →
+    같은 시기의 결과물이 전부 한 샤드로 몰림.
+    """
+    return hashlib.sha1(name.encode()).hexdigest()[:2]
+
+
+def sharded(directory: Path, name: str) -> Path:
+    """새 결과물 저장 경로. OUTPUT_SHARDING 이면 <directory>/<샤드>/<name> (샤드 디렉터리는 만들어 둠)"""
+    if not settings.output_sharding:
+        return directory / name
+    d = directory / shard_of(name)
+    if d not in _made_dirs:
+        d.mkdir(parents=True, exist_ok=True)
+        _made_dirs.add(d)
+    return d / name
+
+
+# -----------------------------
+# 경로 / 부속 파일
+# -----------------------------
+def _key(path: str | Path) -> Optional[str]:
+    """outputs/ 기준 posix 경로 (인덱스 키). outputs 밖, 제외 디렉터리, 임시 파일이면 None"""
+    try:
+        rel = Path(os.path.abspath(path)).relative_to(os.path.abspath(ROOT))
+    except ValueError:
+        return None
+    parts = rel.parts
+    if not parts or parts[0] in EXCLUDED or rel.name.startswith(".") or rel.suffix == ".tmp":
+        return None
+    return rel.as_posix()
+
+
+def _sidecar_names(name: str) -> List[str]:
+    """
+    마스터 이름에 딸릴 수 있는 부속 파일 이름 (.gz/.br, .preview, OUTPUT_WIDTHS 기준 파생본).
+    스캔 중 파일마다 호출되므로 pathlib 없이 문자열로만 만듦.
+    """
+    from app.services.derivatives import FORMATS, allowed_widths
+    from app.services.static_files import ENCODINGS, VARIANTS
+
+    stem, ext = os.path.splitext(name)
+    out = [stem + suffix + ext for suffix in VARIANTS.values()]
+    out += [n + suffix for n in [name, *out] for _, suffix in ENCODINGS]
+    if ext.lower() in MASTER_SUFFIXES:
+        for fmt_ext, _ in FORMATS.values():
+            out += [f"{stem}.w{w}{fmt_ext}" for w in allowed_widths()]
+            if fmt_ext != ext.lower():
+                out.append(f"{stem}.full{fmt_ext}")
+    return out
+
+
+def family(master: Path, names: Optional[Set[str]] = None) -> List[Tuple[Path, int]]:
+    """
+    마스터와 디스크에 있는 부속 파일들 (경로, 크기). 마스터가 없으면 빈 리스트.
+    names: 같은 디렉터리의 이름 목록을 이미 알면 (스캔 중) 목록에 없는 파일은 stat 하지 않음
+    """
+    try:
+        out = [(master, os.stat(master).st_size)]
+    except OSError:
+        return []
+    parent = os.path.dirname(master)
+    for n in _sidecar_names(os.path.basename(master)):
+        if names is not None and n not in names:
+            continue
+        try:
+            size = os.stat(os.path.join(parent, n)).st_size
+        except OSError:
+            continue
+        out.append((Path(parent, n), size))
+    return out
+
+
+def _is_sidecar(name: str, names: Set[str]) -> bool:
+    """같은 디렉터리의 이름 목록(names) 기준으로 name 이 다른 파일의 부속 파일인지"""
+    from app.services.static_files import ENCODINGS, VARIANTS
+
+    for _, suffix in ENCODINGS:
+        if name.endswith(suffix) and name[: -len(suffix)] in names:
+            return True
+    for suffix in VARIANTS.values():
+        if suffix + "." in name and name.replace(suffix + ".", ".", 1) in names:
+            return True
+    parts = name.split(".")
+    if len(parts) >= 3 and (parts[-2] == "full" or (parts[-2][:1] == "w" and parts[-2][1:].isdigit())):
+        stem = ".".join(parts[:-2])
+        return any(stem + ext in names for ext in MASTER_SUFFIXES)
+    return False
+
+
+# -----------------------------
+# 인덱스
+# -----------------------------
+class OutputIndex:
+    """
+    outputs/ 결과물 인덱스 (SQLite WAL). 키는 outputs/ 기준 경로.
+    offloaded 가 채워진 행은 S3 로 옮긴 뒤 로컬에서 지운 것 (용량 합계에서 제외).
+    스위퍼 스레드와 /static 리다이렉트 조회가 함께 쓰므로 연결은 잠금으로 보호.
+    """
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS outputs (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    offloaded TEXT
+                );
+                CREATE INDEX IF NOT EXISTS outputs_lru ON outputs(offloaded, accessed_at);
+                """
+            )
+            self._conn.commit()
+
+    def upsert(self, rows: List[Tuple[str, int, float]]) -> None:
+        """rows: (경로, 크기, 접근 시각). 로컬에 다시 생긴 파일이면 offloaded 를 지움"""
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO outputs (path, size, created_at, accessed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size,
+                    accessed_at = MAX(accessed_at, excluded.accessed_at),
+                    offloaded = NULL
+                """,
+                [(path, size, at, at) for path, size, at in rows],
+            )
+            self._conn.commit()
+
+    def delete(self, paths: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM outputs WHERE path = ?", [(p,) for p in paths])
+            self._conn.commit()
+
+    def mark_offloaded(self, urls: Dict[str, str]) -> None:
+        """경로 → S3 URL"""
+        with self._lock:
+            self._conn.executemany("UPDATE outputs SET offloaded = ? WHERE path = ?", [(u, p) for p, u in urls.items()])
+            self._conn.commit()
+
+    def offloaded(self, path: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT offloaded FROM outputs WHERE path = ?", (path,)).fetchone()
+        return row["offloaded"] if row else None
+
+    def local_paths(self) -> Set[str]:
+        with self._lock:
+            return {r["path"] for r in self._conn.execute("SELECT path FROM outputs WHERE offloaded IS NULL")}
+
+    def totals(self) -> Tuple[int, int]:
+        """로컬에 있는 결과물 (개수, 바이트)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS b FROM outputs WHERE offloaded IS NULL"
+            ).fetchone()
+        return row["n"], row["b"]
+
+    def expired(self, accessed_before: float, created_before: float, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT * FROM outputs
+                WHERE offloaded IS NULL AND accessed_at < ? AND created_at < ?
+                ORDER BY accessed_at LIMIT ?
+                """,
+                (accessed_before, created_before, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def lru(self, created_before: float, need: int) -> List[Dict[str, Any]]:
+        """오래 안 쓰인 순서로 need 바이트를 넘길 때까지"""
+        out, freed = [], 0
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT * FROM outputs WHERE offloaded IS NULL AND created_at < ? ORDER BY accessed_at",
+                (created_before,),
+            )
+            for r in cur:
+                if freed >= need:
+                    break
+                out.append(dict(r))
+                freed += r["size"]
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_index: OutputIndex | None = None
+
+
+def get_index() -> OutputIndex:
+    global _index
+    if _index is None:
+        _index = OutputIndex(settings.output_index_path)
+    return _index
+
+
+# -----------------------------
+# 저장 / 접근 기록 (요청 경로에서 호출, 메모리에만)
+# -----------------------------
+_pending: Dict[str, float] = {}   # 키 → 마지막 저장/접근 시각
+
+
+def note(path: str | Path) -> None:
+    """새로 저장한 결과물 (outputs/ 아래 경로)"""
+    if not enabled():
+        return
+    key = _key(path)
+    if key is not None:
+        _pending[key] = time.time()
+
+
+def touch(rel_path: str) -> None:
+    """/static 에서 서빙한 결과물 (outputs/ 기준 경로, CachedStaticFiles 에서 호출)"""
+    if not enabled():
+        return
+    note(ROOT / rel_path)
+
+
+async def offloaded_url(rel_path: str) -> Optional[str]:
+    """S3 로 옮기고 로컬에서 지운 결과물이면 그 URL (/static 리다이렉트용)"""
+    if not enabled() or not settings.output_offload:
+        return None
+    key = _key(ROOT / rel_path)
+    if key is None:
+        return None
+    return await asyncio.to_thread(get_index().offloaded, key)
+
+
+# -----------------------------
+# 스위퍼 (낮은 우선순위 스레드 1개에서 파일 시스템 / SQLite 작업)
+# -----------------------------
+def _lower_priority() -> None:
+    # 리눅스에서는 스레드별로 nice 값이 적용됨 (요청 처리 스레드보다 나중에 스케줄)
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+_pool: ThreadPoolExecutor | None = None
+
+
+async def _run(fn, *args):
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outputs-gc", initializer=_lower_priority)
+    return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+
+
+def _flush(pending: Dict[str, float]) -> None:
+    """모아 둔 저장/접근 기록을 인덱스에 반영 (부속 파일까지 크기를 다시 잼)"""
+    rows, gone = [], []
+    for key, at in pending.items():
+        files = family(ROOT / key)
+        if files:
+            rows.append((key, sum(size for _, size in files), at))
+        else:
+            gone.append(key)   # 이미 옮겨졌거나 지워짐 (예: fuse 캐시로 이동)
+    index = get_index()
+    if rows:
+        index.upsert(rows)
+    if gone:
+        index.delete(gone)
+
+
+def _scan() -> Dict[str, Tuple[int, float]]:
+    """outputs/ 전체를 훑어 마스터 → (부속 포함 크기, mtime)"""
+    found: Dict[str, Tuple[int, float]] = {}
+    stack = [ROOT]
+    while stack:
+        d = stack.pop()
+        try:
+            entries = list(os.scandir(d))
+        except OSError:
+            continue
+        names = {e.name for e in entries if e.is_file(follow_symlinks=False)}
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                if not (d == ROOT and e.name in EXCLUDED):
+                    stack.append(Path(e.path))
+                continue
+            if e.name not in names or _is_sidecar(e.name, names):
+                continue
+            key = _key(e.path)
+            if key is None:
+                continue
+            files = family(Path(e.path), names)
+            if files:
+                found[key] = (sum(size for _, size in files), e.stat().st_mtime)
+    return found
+
+
+def _reconcile() -> Dict[str, int]:
+    """
+    기동 시 1회: 인덱스와 디스크를 맞춤.
+    인덱스에 없는 파일(예전 버전이 만든 것, 꺼져 있던 동안 생긴 것)은 mtime 을 접근 시각으로 등록,
+    디스크에서 사라진 행은 삭제.
+    """
+    index = get_index()
+    found = _scan()
+    known = index.local_paths()
+    added = [(k, size, mtime) for k, (size, mtime) in found.items() if k not in known]
+    missing = [k for k in known if k not in found]
+    if added:
+        index.upsert(added)
+    if missing:
+        index.delete(missing)
+    return {"adopted": len(added), "dropped": len(missing)}
+
+
+def _drop(keys: List[str], offloaded: Dict[str, str]) -> int:
+    """인덱스 갱신 + 파일 삭제 (한 묶음). 디렉터리마다 한 번만 나열해 부속 파일을 찾음. 반환: 지운 바이트"""
+    index = get_index()
+    index.delete([k for k in keys if k not in offloaded])
+    index.mark_offloaded(offloaded)
+    by_dir: Dict[str, List[str]] = {}
+    for k in keys:
+        by_dir.setdefault(os.path.dirname(k), []).append(k)
+    freed = 0
+    for d, group in by_dir.items():
+        try:
+            names = set(os.listdir(ROOT / d))
+        except OSError:
+            continue
+        for k in group:
+            for p, size in family(ROOT / k, names):
+                try:
+                    p.unlink()
+                    freed += size
+                except OSError:
+                    pass
+    return freed
+
+
+async def _offload(keys: List[str]) -> Dict[str, str]:
+    """지우기 전에 S3 로. 반환: 옮긴 것만 경로 → URL (실패한 것은 지우지 않고 다음 스위프에서 다시 시도)"""
+    from app.services.storage import upload_file_async
+
+    out = {}
+    for key in keys:
+        try:
+            _, url = await upload_file_async(str(ROOT / key), key=settings.output_offload_prefix + key)
+        except Exception:
+            OFFLOAD_FAILED.inc()
+            continue
+        out[key] = url
+    return out
+
+
+_stats: Dict[str, Any] = {"entries": 0, "bytes": 0, "sweeps": 0, "evicted": 0, "last_sweep": None}
+
+
+async def _evict_all(rows: List[Dict[str, Any]], reason: str) -> int:
+    """OUTPUT_SWEEP_BATCH 개씩 정리하고 묶음 사이에 잠깐 쉼 (디스크를 독점하지 않도록). 반환: 정리한 수"""
+    n = 0
+    batch = max(settings.output_sweep_batch, 1)
+    action = "offloaded" if settings.output_offload else "deleted"
+    for i in range(0, len(rows), batch):
+        keys = [r["path"] for r in rows[i:i + batch]]
+        offloaded: Dict[str, str] = {}
+        if settings.output_offload:
+            offloaded = await _offload(keys)
+            keys = list(offloaded)
+        freed = await _run(_drop, keys, offloaded)
+        EVICTED.labels(reason, action).inc(len(keys))
+        EVICTED_BYTES.labels(reason).inc(freed)
+        n += len(keys)
+        await asyncio.sleep(0.01)
+    return n
+
+
+_sweep_lock = asyncio.Lock()   # 주기 스위프 / POST /admin/outputs/sweep / 기동 시 맞추기가 겹치지 않게
+
+
+async def sweep() -> Dict[str, Any]:
+    """한 번 정리: 기록 반영 → TTL 만료 → 용량 한도(LRU). 반환: 현재 상태"""
+    async with _sweep_lock:
+        return await _sweep()
+
+
+async def _sweep() -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    pending = dict(_pending)
+    _pending.clear()
+    index = get_index()
+    await _run(_flush, pending)
+
+    now = time.time()
+    young = now - settings.output_min_age_seconds
+    evicted = 0
+    if settings.output_ttl_seconds > 0:
+        while True:
+            rows = await _run(index.expired, now - settings.output_ttl_seconds, young, max(settings.output_sweep_batch, 1))
+            done = await _evict_all(rows, "ttl")
+            evicted += done
+            if done < len(rows) or not rows:
+                break
+    entries, total = await _run(index.totals)
+    if settings.output_quota_bytes > 0 and total > settings.output_quota_bytes:
+        need = total - int(settings.output_quota_bytes * settings.output_quota_low_water)
+        evicted += await _evict_all(await _run(index.lru, young, need), "quota")
+        entries, total = await _run(index.totals)
+
+    _stats.update(entries=entries, bytes=total, last_sweep=now)
+    _stats["sweeps"] += 1
+    _stats["evicted"] += evicted
+    STAGE_SWEEP.since(t0)
+    return stats()
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "pending": len(_pending),
+        "quota_bytes": settings.output_quota_bytes,
+        "ttl_seconds": settings.output_ttl_seconds,
+        "offload": settings.output_offload,
+    }
+
+
+gauge_callback(
+    "hairfusion_outputs_bytes",
+    "Bytes under outputs/ tracked by the retention index (as of the last sweep)",
+    lambda: _stats["bytes"],
+)
+
+_sweeper: asyncio.Task | None = None
+
+
+async def _sweep_forever() -> None:
+    async with _sweep_lock:
+        await _run(_reconcile)
+    while True:
+        try:
+            await sweep()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass   # 다음 주기에 다시
+        await asyncio.sleep(settings.output_sweep_interval)
+
+
+def start_sweeper() -> None:
+    """lifespan 기동 시 호출 (OUTPUT_QUOTA_BYTES / OUTPUT_TTL_SECONDS 가 없으면 아무것도 안 함)"""
+    global _sweeper
+    if enabled() and _sweeper is None:
+        _sweeper = asyncio.get_running_loop().create_task(_sweep_forever())
+
+
+async def stop_sweeper() -> None:
+    """종료: 스위퍼 중지 → 남은 기록 반영 → 인덱스 / 스레드 정리"""
+    global _sweeper, _index, _pool
+    if _sweeper is not None:
+        _sweeper.cancel()
+        await asyncio.gather(_sweeper, return_exceptions=True)
+        _sweeper = None
+    if _pending and enabled():
+        pending = dict(_pending)
+        _pending.clear()
+        await _run(_flush, pending)
+    if _index is not None:
+        _index.close()
+        _index = None
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await asyncio.to_thread(pool.shutdown, wait=True)   # 진행 중인 정리 작업을 기다리는 동안 루프를 막지 않게
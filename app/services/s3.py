@@ -1,17 +1,13 @@
 import uuid
 from datetime import datetime
-import boto3
-from app.settings import settings
 
 # /ڰ .env ε
-s3 = boto3.client(
-    "s3",
-    region_name=settings.aws_region,
-    aws_access_key_id=settings.aws_access_key_id,
-    aws_secret_access_key=settings.aws_secret_access_key,
-)
+# boto3 Ŭ̾Ʈ ù  û   (import   ⵿ , AWS    import  )
+#  storage   Ŭ̾Ʈ ״  (S3_ENDPOINT_URL  ݿ)
 
 def create_presigned_post(key_prefix: str, content_type: str, expires_in: int = 3600):
+    from app.services.storage import bucket_name, s3_client
+
     #  Ű  (: faces/20251028_153000_xxx.png)
     key = f"{key_prefix}/{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex}.png"
 
@@ -19,8 +15,8 @@ def create_presigned_post(key_prefix: str, content_type: str, expires_in: int =
     # Content-Type 迭 starts-with üũ (image/, video/ )
     conditions = [["starts-with", "$Content-Type", content_type.split("/")[0]]]
 
-    post = s3.generate_presigned_post(
-        Bucket=settings.aws_s3_bucket,
+    post = s3_client().generate_presigned_post(
+        Bucket=bucket_name(),
         Key=key,
         Fields=fields,
         Conditions=conditions,
@@ -0,0 +1,229 @@
+from __future__ import annotations
+# hairfusion-service/app/services/scheduler.py
+import asyncio
+import contextvars
+import ipaddress
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple
+
+from app.settings import settings
+from app.services.metrics import counter, gauge, histogram
+
+SCHED_WAIT = histogram(
+    "hairfusion_scheduler_wait_seconds",
+    "Time spent waiting for an upstream slot",
+    ("upstream", "lane"),
+)
+SCHED_QUEUED = gauge("hairfusion_scheduler_queued", "Requests waiting for an upstream slot", ("upstream",))
+SCHED_ACTIVE = gauge("hairfusion_scheduler_active", "Requests holding an upstream slot", ("upstream",))
+SCHED_REJECTED = counter("hairfusion_scheduler_rejected_total", "Requests rejected because the queue was full", ("upstream",))
+
+# 우선순위 레인 지정 헤더 (예: "X-Priority: paid"). 게이트웨이가 인증된 사용자 등급으로 붙여 줌
+PRIORITY_HEADER = "X-Priority"
+
+# 요청의 우선순위 레인 (핸들러에서 set_lane() 으로 지정 → 하위 서비스 호출까지 전파)
+_lane: contextvars.ContextVar[str | None] = contextvars.ContextVar("priority_lane", default=None)
+
+
+class QueueFull(Exception):
+    """대기열이 가득 참 → 503 + Retry-After 로 응답"""
+
+    def __init__(self, upstream: str, retry_after: int) -> None:
+        super().__init__(f"{upstream} queue is full, retry after {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def _parse_weights(spec: str) -> Dict[str, int]:
+    # "paid:3,free:1" → {"paid": 3, "free": 1}
+    weights: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        name, _, w = part.strip().partition(":")
+        if name:
+            weights[name.strip()] = max(int(w or 1), 1)
+    return weights or {"default": 1}
+
+
+def lanes() -> List[str]:
+    return list(_parse_weights(settings.scheduler_lanes))
+
+
+def set_lane(lane: str | None) -> str:
+    """알 수 없는 레인은 기본 레인으로 취급"""
+    lane = (lane or "").strip().lower()
+    if lane not in lanes():
+        lane = settings.scheduler_default_lane
+    _lane.set(lane)
+    return lane
+
+
+@lru_cache(maxsize=4)
+def _trusted_networks(spec: str) -> Tuple[Any, ...]:
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+
+def request_lane(request: Any) -> str | None:
+    """
+    요청의 X-Priority 값. 클라이언트가 직접 'paid' 를 달고 올 수 있으므로
+    SCHEDULER_TRUSTED_PROXIES 에 있는 주소(직접 연결한 쪽)에서 온 요청일 때만 믿고, 아니면 None (기본 레인)
+    """
+    lane = request.headers.get(PRIORITY_HEADER)
+    if not lane or request.client is None:
+        return None
+    try:
+        peer = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return None
+    if any(peer in net for net in _trusted_networks(settings.scheduler_trusted_proxies)):
+        return lane
+    return None
+
+
+def current_lane() -> str:
+    return _lane.get() or settings.scheduler_default_lane
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    lane: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class UpstreamScheduler:
+    """
+    업스트림 하나(AILab, Meshy)에 대한 동시 실행 제한 + 대기열.
+    - 동시에 concurrency 개까지만 실행, 나머지는 레인별 FIFO 대기열에서 대기
+    - 레인 간에는 가중 라운드로빈 (예: paid 3 : free 1) → 우선순위를 주되 기아는 막음
+    - 대기 중인 요청이 max_queue 이상이면 바로 QueueFull
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, weights: Dict[str, int]) -> None:
+        self.name = name
+        self.concurrency = max(concurrency, 1)
+        self.max_queue = max(max_queue, 0)
+        self.weights = weights
+        self._queues: Dict[str, Deque[_Waiter]] = {lane: deque() for lane in weights}
+        # 가중치만큼 레인 이름을 반복한 순서표 (paid, paid, paid, free, ...)
+        self._order = [lane for lane, w in weights.items() for _ in range(w)]
+        self._cursor = 0
+        self.active = 0
+        self._service_ewma = 1.0   # 평균 점유 시간(초) 추정 → Retry-After 계산용
+
+        self.queue_depth = SCHED_QUEUED.labels(name)
+        self.active_gauge = SCHED_ACTIVE.labels(name)
+        self.rejected = SCHED_REJECTED.labels(name)
+        self.wait_seconds = {lane: SCHED_WAIT.labels(name, lane) for lane in weights}
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def retry_after(self) -> int:
+        # 대기열이 한 바퀴 도는 데 걸릴 대략적인 시간
+        est = self._service_ewma * (self.queued + 1) / self.concurrency
+        return max(1, math.ceil(est))
+
+    def _next_waiter(self) -> _Waiter | None:
+        for _ in range(len(self._order)):
+            lane = self._order[self._cursor]
+            self._cursor = (self._cursor + 1) % len(self._order)
+            q = self._queues[lane]
+            while q:
+                w = q.popleft()
+                if not w.future.done():
+                    return w
+        return None
+
+    def _dispatch(self) -> None:
+        while self.active < self.concurrency:
+            w = self._next_waiter()
+            if w is None:
+                break
+            self.active += 1
+            w.future.set_result(None)
+        self.queue_depth.set(self.queued)
+        self.active_gauge.set(self.active)
+
+    async def acquire(self, lane: str) -> None:
+        lane = lane if lane in self._queues else next(iter(self._queues))
+        if self.active < self.concurrency and self.queued == 0:
+            self.active += 1
+            self.active_gauge.set(self.active)
+            self.wait_seconds[lane].observe(0.0)
+            return
+
+        if self.queued >= self.max_queue:
+            self.rejected.inc()
+            raise QueueFull(self.name, self.retry_after())
+
+        w = _Waiter(future=asyncio.get_running_loop().create_future(), lane=lane)
+        self._queues[lane].append(w)
+        self.queue_depth.set(self.queued)
+        try:
+            await w.future
+        except asyncio.CancelledError:
+            if w.future.done() and not w.future.cancelled():
+                # 슬롯을 받은 직후 취소됨 → 반납
+                self.release(0.0)
+            else:
+                w.future.cancel()
+                try:
+                    self._queues[lane].remove(w)
+                except ValueError:
+                    pass
+                self.queue_depth.set(self.queued)
+            raise
+        self.wait_seconds[lane].observe(time.monotonic() - w.enqueued_at)
+
+    def release(self, held: float) -> None:
+        self.active -= 1
+        if held > 0:
+            self._service_ewma = 0.8 * self._service_ewma + 0.2 * held
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane: str | None = None) -> AsyncIterator[None]:
+        await self.acquire(lane or current_lane())
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - t0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queued": self.queued,
+            "queued_by_lane": {lane: len(q) for lane, q in self._queues.items()},
+            "max_queue": self.max_queue,
+            "rejected": int(self.rejected.value),
+            "retry_after": self.retry_after(),
+            "wait_seconds": {lane: h.snapshot() for lane, h in self.wait_seconds.items()},
+        }
+
+
+_schedulers: Dict[str, UpstreamScheduler] = {}
+
+
+def get_scheduler(upstream: str) -> UpstreamScheduler:
+    s = _schedulers.get(upstream)
+    if s is None:
+        concurrency = {
+            "ailab": settings.ailab_concurrency,
+            "meshy": settings.meshy_concurrency,
+        }[upstream]
+        s = _schedulers[upstream] = UpstreamScheduler(
+            upstream, concurrency, settings.scheduler_max_queue, _parse_weights(settings.scheduler_lanes)
+        )
+    return s
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return {name: get_scheduler(name).stats() for name in ("ailab", "meshy")}
@@ -0,0 +1,49 @@
+from __future__ import annotations
+# hairfusion-service/app/services/singleflight.py
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.services.resilience import clear_deadline, timeout_for, within_deadline
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    같은 key 로 동시에 들어온 호출을 하나로 합침.
+    처음 호출한 쪽이 fn() 을 시작하고, 나머지는 그 결과(또는 예외)를 함께 받음.
+    완료되면 key 는 비워지므로 이후 호출은 다시 실행됨 (결과 캐시는 호출 측 책임).
+
+    공유 작업은 요청 마감(set_deadline) 없이 별도 태스크로 실행하고, 각 호출은 자기 마감까지만 기다림.
+    (짧은 X-Request-Timeout 을 준 요청 하나 때문에 합류한 요청/마감 없는 백그라운드 잡까지 504 가 나지 않도록)
+    기다리던 호출이 마감 초과/취소로 빠져도 공유 작업은 계속됨.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def inflight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 기다리는 쪽이 없어도 'never retrieved' 경고가 나지 않게
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """(결과, 다른 호출에 합류했는지) 반환. 자기 마감을 넘기면 DeadlineExceeded"""
+        task = self._inflight.get(key)
+        joined = task is not None
+        if task is None:
+            timeout_for(None)   # 이미 마감이 지났으면 시작하지 않음
+            ctx = contextvars.copy_context()   # 레인 등 다른 컨텍스트는 물려주고 마감만 비움
+            ctx.run(clear_deadline)
+            task = asyncio.get_running_loop().create_task(fn(), context=ctx)
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await within_deadline(asyncio.shield(task)), joined
+
+    def __len__(self) -> int:
+        return len(self._inflight)
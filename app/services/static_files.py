@@ -0,0 +1,222 @@
+from __future__ import annotations
+# hairfusion-service/app/services/static_files.py
+import gzip
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.services import retention
+from app.services.derivatives import MASTER_SUFFIXES, DerivativeError, ensure_derivative, parse
+
+mimetypes.add_type("model/gltf-binary", ".glb")
+mimetypes.add_type("model/gltf+json", ".gltf")
+mimetypes.add_type("image/webp", ".webp")
+
+# 이름에 16자 이상 hex 토큰이 있으면 내용 주소(또는 작업 ID) 기반 이름 → 내용이 바뀌지 않음
+#   예) cache/fuse/<sha256>.png, meshy/meshy_<task16>.glb, result_<uuid>.png
+_CONTENT_TOKEN = re.compile(r"[0-9a-f]{16,}")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"   # 캐시는 하되 매번 ETag 로 재검증
+
+# 미리 압축해 둘 가치가 있는 확장자 (PNG/JPEG 등 이미 압축된 포맷은 제외)
+COMPRESSIBLE = {".glb", ".gltf", ".bin", ".json", ".html", ".svg", ".txt", ".obj"}
+# 선호 순서대로 (Content-Encoding, 파일 접미사)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# 원본 대비 이 비율 이상이면 압축본을 남기지 않음
+MIN_SAVING = 0.95
+# ?variant=preview 로 고를 수 있는 형제 파일 접미사 (glb_optimize.preview_path 와 같은 규칙)
+VARIANTS = {"preview": ".preview"}
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def content_token(name: str) -> Optional[str]:
+    m = _CONTENT_TOKEN.search(Path(name).stem.lower())
+    return m.group(0) if m else None
+
+
+# -----------------------------
+# 쓰기 시점 사전 압축
+# -----------------------------
+def _write_atomic(dest: str, data: bytes) -> None:
+    tmp = f"{dest}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+
+
+def precompress(path: str) -> Dict[str, int]:
+    """
+    path 옆에 <path>.gz (그리고 brotli 가 설치돼 있으면 <path>.br) 를 만들어 둠.
+    압축 효과가 거의 없으면 만들지 않음. CPU 작업이므로 이미지 실행기에서 호출할 것.
+    반환: {"identity": 원본 크기, "gzip": ..., "br": ...} (만든 것만)
+    """
+    if Path(path).suffix.lower() not in COMPRESSIBLE:
+        return {}
+    raw = Path(path).read_bytes()
+    sizes = {"identity": len(raw)}
+
+    encoders = [("gzip", ".gz", lambda b: gzip.compress(b, compresslevel=9, mtime=0))]
+    brotli = _brotli()
+    if brotli is not None:
+        encoders.insert(0, ("br", ".br", lambda b: brotli.compress(b, quality=11)))
+
+    for enc, suffix, compress in encoders:
+        data = compress(raw)
+        if len(data) < len(raw) * MIN_SAVING:
+            _write_atomic(path + suffix, data)
+            sizes[enc] = len(data)
+    return sizes
+
+
+def remove_variants(path: str) -> None:
+    for _, suffix in ENCODINGS:
+        try:
+            os.unlink(path + suffix)
+        except OSError:
+            pass
+
+
+# -----------------------------
+# 서빙
+# -----------------------------
+def _accepted(accept_encoding: str) -> set[str]:
+    out = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if token and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            out.add(token.lower())
+    return out
+
+
+def _pick_variant(full_path: str, accept_encoding: str) -> Optional[Tuple[str, str, os.stat_result]]:
+    accepted = _accepted(accept_encoding)
+    for enc, suffix in ENCODINGS:
+        if enc in accepted:
+            try:
+                st = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            return enc, full_path + suffix, st
+    return None
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    outputs/ 서빙용 StaticFiles.
+    - 내용 주소 이름: 이름에서 나온 강한 ETag + Cache-Control immutable (1년)
+      (기본 ETag 는 mtime 기반이라 fuse 캐시가 LRU 갱신으로 utime 하면 바뀌어 버림)
+    - 그 밖의 이름: 기본 ETag + no-cache (매번 재검증 → 304)
+    - Range 요청은 Starlette FileResponse 가 처리 (206 / 다중 범위)
+    - Range 가 아닌 요청이면 미리 만든 .br / .gz 를 Accept-Encoding 에 맞춰 골라 보냄
+    - ?variant=preview 면 <name>.preview<ext> 가 있을 때 그것을 보냄 (없으면 원본)
+    - 이미지에 ?format=webp|jpeg|png (&w=<OUTPUT_WIDTHS 중 하나>) 가 붙으면 파생본을 보냄
+      (처음 요청 때 이미지 실행기에서 만들어 마스터 옆에 저장, 이후에는 그 파일을 그대로 서빙)
+    - meshy/ 아래에 없는 파일이 Meshy 작업 결과물로 기록돼 있으면 그때 받아서 서빙 (meshy_assets)
+    - 보존 정책(retention)으로 S3 에 옮긴 뒤 지운 파일이면 S3 URL 로 307 리다이렉트
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        params = QueryParams(scope.get("query_string", b""))
+        derive = ("format" in params or "w" in params) and os.path.splitext(path)[1].lower() in MASTER_SUFFIXES
+        try:
+            response = await super().get_response(await self._derivative(path, params) if derive else path, scope)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            response = await self._missing(path, params, derive, scope, e)
+        if response.status_code < 400:
+            retention.touch(path)   # 보존 정책의 마지막 접근 시각 (메모리에만 기록)
+        return response
+
+    async def _missing(
+        self, path: str, params: QueryParams, derive: bool, scope: Scope, not_found: HTTPException
+    ) -> Response:
+        """
+        없는 파일: Meshy 작업 결과물로 기록돼 있으면 받아서 서빙,
+        보존 정책으로 S3 에 옮겨 둔 것이면 그 URL 로 리다이렉트, 둘 다 아니면 404.
+        """
+        if path.startswith("meshy" + os.sep):
+            from app.services.meshy_assets import fetch_for_static
+
+            if await fetch_for_static(os.path.join(str(self.directory), path)):
+                return await super().get_response(await self._derivative(path, params) if derive else path, scope)
+        url = await retention.offloaded_url(path)
+        if url is not None:
+            return RedirectResponse(url, status_code=307)
+        raise not_found
+
+    async def _derivative(self, path: str, params: QueryParams) -> str:
+        try:
+            fmt, width = parse(params.get("format"), params.get("w"))
+        except DerivativeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        full_path, st = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return path   # 마스터가 없으면 기본 처리(404)
+        derived = await ensure_derivative(full_path, fmt, width)
+        return os.path.join(os.path.dirname(path), derived.name)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        suffix = VARIANTS.get(QueryParams(scope.get("query_string", b"")).get("variant", ""))
+        if suffix:
+            base, ext = os.path.splitext(full_path)
+            try:
+                stat_result = os.stat(base + suffix + ext)
+                full_path = base + suffix + ext
+            except OSError:
+                pass
+        name = os.path.basename(full_path)
+        token = content_token(name)
+
+        headers = {"Cache-Control": IMMUTABLE if token else REVALIDATE}
+        etag = f'"{token}-{stat_result.st_size:x}"' if token else None
+        path, st = full_path, stat_result
+
+        if Path(name).suffix.lower() in COMPRESSIBLE:
+            headers["Vary"] = "Accept-Encoding"
+            if "range" not in request_headers:
+                picked = _pick_variant(full_path, request_headers.get("accept-encoding", ""))
+                if picked is not None:
+                    enc, path, st = picked
+                    headers["Content-Encoding"] = enc
+                    # 표현(인코딩)이 다르면 ETag 도 달라야 함
+                    etag = f'"{token}-{stat_result.st_size:x}-{enc}"' if token else None
+        if etag:
+            headers["ETag"] = etag
+
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            stat_result=st,
+            headers=headers,
+            media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -1,53 +1,128 @@
+import asyncio
+import json
 import mimetypes
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
+import httpx
 
 from app.settings import settings
+from app.services.download import total_from
+from app.services.http import get_client
+from app.services.metrics import DOWNLOADED, STAGE_S3_UPLOAD
 
 
 class StorageError(Exception):
     pass
 
 
-def _s3_client():
+# boto3/botocore 는 import 가 무거워(수백 ms) 첫 S3 호출 때까지 미룸
+def _boto_errors() -> tuple:
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    return (BotoCoreError, ClientError)
+
+
+@lru_cache(maxsize=1)
+def s3_client():
+    """
+    프로세스 전체에서 재사용하는 S3 클라이언트 (boto3 클라이언트는 스레드 안전).
+    커넥션 풀은 업로드 워커 × 파트 동시성만큼 잡아둠.
+    """
+    import boto3
+    from botocore.config import Config
+
     try:
-        return boto3.client(
+        return boto3.session.Session().client(
             "s3",
             region_name=settings.aws_region,
             aws_access_key_id=settings.aws_access_key_id or None,
             aws_secret_access_key=settings.aws_secret_access_key or None,
+            endpoint_url=settings.s3_endpoint_url or None,
+            config=Config(
+                max_pool_connections=max(settings.s3_upload_workers * settings.s3_part_concurrency, 10),
+                retries={"max_attempts": 5, "mode": "adaptive"},
+            ),
         )
     except Exception as e:
         raise StorageError(f"Failed to init S3 client: {e}")
 
 
+@lru_cache(maxsize=1)
+def _transfer_config():
+    from boto3.s3.transfer import TransferConfig
+
+    # threshold 이상이면 멀티파트, 파트는 part_concurrency 개씩 병렬 전송
+    return TransferConfig(
+        multipart_threshold=settings.s3_multipart_threshold,
+        multipart_chunksize=settings.s3_multipart_chunksize,
+        max_concurrency=settings.s3_part_concurrency,
+        use_threads=True,
+    )
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _upload_pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(settings.s3_upload_workers, 1), thread_name_prefix="s3-upload"
+        )
+    return _executor
+
+
+def shutdown_uploads() -> None:
+    """진행 중인 업로드가 끝날 때까지 기다림 (블로킹 — 이벤트 루프에서는 asyncio.to_thread 로)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
 def _guess_content_type(path: Path) -> str:
     ctype, _ = mimetypes.guess_type(str(path))
+    if ctype is None and path.suffix.lower() == ".glb":
+        return "model/gltf-binary"
     return ctype or "application/octet-stream"
 
 
+def bucket_name() -> str:
+    """설정된 업로드 버킷 (AWS_S3_BUCKET 이 없으면 StorageError)"""
+    if not settings.aws_s3_bucket:
+        raise StorageError("AWS_S3_BUCKET not configured")
+    return settings.aws_s3_bucket
+
+
 def public_url(bucket: str, key: str) -> str:
     # 단순 퍼블릭 URL (정적 퍼블릭 버킷 전제)
+    if settings.s3_endpoint_url:
+        return f"{settings.s3_endpoint_url.rstrip('/')}/{bucket}/{key}"
     return f"https://{bucket}.s3.amazonaws.com/{key}"
 
 
-def upload_file(local_path: str, key_prefix: str = "results/") -> Tuple[str, str]:
+def upload_file(
+    local_path: str,
+    key_prefix: str = "results/",
+    key: Optional[str] = None,
+) -> Tuple[str, str]:
     """
     파일을 S3 버킷에 업로드하고 (public-read) (key, url) 을 반환
+    (블로킹 — 이벤트 루프에서는 upload_file_async 사용)
     """
-    if not settings.s3_bucket:
-        raise StorageError("S3_BUCKET not configured")
+    bucket = bucket_name()
 
     path = Path(local_path)
     if not path.exists():
         raise StorageError(f"Local file not found: {local_path}")
 
-    key = f"{key_prefix}{uuid.uuid4().hex}{path.suffix.lower()}"
-    client = _s3_client()
+    key = key or f"{key_prefix}{uuid.uuid4().hex}{path.suffix.lower()}"
+    client = s3_client()
 
     extra_args = {
         "ACL": "public-read",
@@ -55,14 +130,217 @@ def upload_file(local_path: str, key_prefix: str = "results/") -> Tuple[str, str
         "CacheControl": "public, max-age=31536000",
     }
 
+    t0 = time.perf_counter()
     try:
         client.upload_file(
             Filename=str(path),
-            Bucket=settings.s3_bucket,
+            Bucket=bucket,
             Key=key,
             ExtraArgs=extra_args,
+            Config=_transfer_config(),
         )
-    except (BotoCoreError, ClientError) as e:
+    except _boto_errors() as e:
         raise StorageError(f"S3 upload failed: {e}")
+    STAGE_S3_UPLOAD.since(t0)
+
+    return key, public_url(bucket, key)
+
+
+def upload_bytes(
+    body: bytes,
+    key: str,
+    content_type: str = "application/octet-stream",
+) -> Tuple[str, str]:
+    bucket = bucket_name()
+    try:
+        s3_client().put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ACL="public-read",
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000",
+        )
+    except _boto_errors() as e:
+        raise StorageError(f"S3 upload failed: {e}")
+    return key, public_url(bucket, key)
+
+
+async def upload_file_async(
+    local_path: str,
+    key_prefix: str = "results/",
+    key: Optional[str] = None,
+) -> Tuple[str, str]:
+    """upload_file 을 업로드 스레드 풀에서 실행 (이벤트 루프를 막지 않음)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_upload_pool(), upload_file, local_path, key_prefix, key)
+
+
+async def upload_job_artifacts(
+    job_id: str,
+    files: Dict[str, str],
+    metadata: Optional[Dict[str, Any]] = None,
+    key_prefix: str = "jobs/",
+) -> Dict[str, Dict[str, str]]:
+    """
+    한 작업의 산출물(합성 PNG, GLB 등)과 메타데이터를 한 번에 업로드.
+    files: {"fused": "outputs/result_x.png", "model": "outputs/meshy/meshy_x.glb"}
+    → {"fused": {"key": ..., "url": ...}, ..., "metadata": {...}}
+    키는 <key_prefix><job_id>/<이름><확장자> 로 고정 (재업로드해도 같은 위치).
+    """
+    base = f"{key_prefix}{job_id}/"
+    names = list(files)
+    results = await asyncio.gather(
+        *(
+            upload_file_async(files[n], key=f"{base}{n}{Path(files[n]).suffix.lower()}")
+            for n in names
+        )
+    )
+    out: Dict[str, Dict[str, str]] = {n: {"key": k, "url": u} for n, (k, u) in zip(names, results)}
+
+    if metadata is not None:
+        doc = {**metadata, "artifacts": out}
+        loop = asyncio.get_running_loop()
+        k, u = await loop.run_in_executor(
+            _upload_pool(),
+            upload_bytes,
+            json.dumps(doc, ensure_ascii=False).encode("utf-8"),
+            f"{base}metadata.json",
+            "application/json",
+        )
+        out["metadata"] = {"key": k, "url": u}
+    return out
+
+
+async def upload_many(paths: List[str], key_prefix: str = "results/") -> List[Tuple[str, str]]:
+    return list(await asyncio.gather(*(upload_file_async(p, key_prefix) for p in paths)))
+
+
+# -----------------------------
+# URL → S3 스트리밍 (로컬 디스크를 거치지 않음)
+# -----------------------------
+_MIN_PART = 5 * 1024 * 1024   # S3 멀티파트 최소 파트 크기 (마지막 파트 제외)
+
+
+async def stream_url_to_s3(
+    url: str,
+    key: str,
+    *,
+    content_type: str = "application/octet-stream",
+    client: httpx.AsyncClient | None = None,
+    max_resumes: int | None = None,
+) -> Tuple[str, str, int]:
+    """
+    url 응답 본문을 파트 크기만큼 모아 곧바로 S3 멀티파트 업로드로 올림 (임시 파일 없음).
+    - 메모리에는 최대 S3_PART_CONCURRENCY 개 파트만 유지 (업로드가 밀리면 수신도 대기)
+    - 본문이 S3_MULTIPART_THRESHOLD 보다 작으면 put_object 한 번으로 끝냄
+    - 전송이 끊기면 Range 로 이어받기 (서버가 무시하면 이미 받은 만큼 건너뜀)
+    - 실패하면 멀티파트 업로드를 abort 해 조각이 버킷에 남지 않게 함
+    반환: (key, public_url, size)
+    """
+    client = client or get_client("download")
+    max_resumes = settings.download_max_resumes if max_resumes is None else max_resumes
+    part_size = max(settings.s3_multipart_chunksize, _MIN_PART)
+    first_part = max(part_size, settings.s3_multipart_threshold)
+    bucket = bucket_name()
+    s3 = s3_client()
+    extra = {
+        "ACL": "public-read",
+        "ContentType": content_type,
+        "CacheControl": "public, max-age=31536000",
+    }
+
+    sem = asyncio.Semaphore(max(settings.s3_part_concurrency, 1))
+    tasks: List[asyncio.Task] = []
+    parts: List[Dict[str, Any]] = []
+    upload_id: Optional[str] = None
+    buf = bytearray()
+
+    async def _upload_part(number: int, body: bytes) -> None:
+        try:
+            resp = await asyncio.to_thread(
+                s3.upload_part, Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+            parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+        finally:
+            sem.release()
+
+    async def _flush() -> None:
+        nonlocal upload_id, buf
+        for t in tasks:
+            if t.done() and t.exception() is not None:
+                raise t.exception()
+        if upload_id is None:
+            resp = await asyncio.to_thread(s3.create_multipart_upload, Bucket=bucket, Key=key, **extra)
+            upload_id = resp["UploadId"]
+        await sem.acquire()
+        body, buf = bytes(buf), bytearray()
+        tasks.append(asyncio.create_task(_upload_part(len(tasks) + 1, body)))
+
+    t0 = time.perf_counter()
+    received = 0
+    total: Optional[int] = None
+    attempts = 0
+    try:
+        while True:
+            headers = {"Range": f"bytes={received}-"} if received else {}
+            skip = 0
+            try:
+                async with client.stream("GET", url, headers=headers) as r:
+                    if received and r.status_code == 200:
+                        # Range 미지원 → 처음부터 오지만 이미 올린 부분은 버림
+                        skip = received
+                    elif r.status_code not in (200, 206):
+                        raise StorageError(f"GET {url} -> {r.status_code}")
+                    if r.headers.get("Content-Encoding", "identity") == "identity":
+                        total = total_from(r, received - skip) or total
+
+                    async for chunk in r.aiter_bytes():
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk, skip = chunk[skip:], 0
+                        buf += chunk
+                        received += len(chunk)
+                        if len(buf) >= (part_size if upload_id else first_part):
+                            await _flush()
+                break
+            except httpx.TransportError as e:
+                attempts += 1
+                if attempts > max_resumes:
+                    raise StorageError(f"GET {url} failed after {attempts} attempts: {e!r}")
+                await asyncio.sleep(min(0.5 * attempts, 5.0))
+
+        if total is not None and received != total:
+            raise StorageError(f"size mismatch for {url}: got {received}, expected {total}")
+
+        if upload_id is None:
+            await asyncio.to_thread(s3.put_object, Bucket=bucket, Key=key, Body=bytes(buf), **extra)
+        else:
+            if buf:
+                await _flush()
+            await asyncio.gather(*tasks)
+            parts.sort(key=lambda p: p["PartNumber"])
+            await asyncio.to_thread(
+                s3.complete_multipart_upload,
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+    except BaseException as e:
+        for t in tasks:
+            t.cancel()
+        if upload_id is not None:
+            try:
+                await asyncio.to_thread(s3.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+            except Exception:
+                pass
+        if isinstance(e, _boto_errors()):
+            raise StorageError(f"S3 upload failed: {e}")
+        raise
 
-    return key, public_url(settings.s3_bucket, key)
+    STAGE_S3_UPLOAD.since(t0)
+    DOWNLOADED.inc(received)
+    return key, public_url(bucket, key), received
@@ -48,12 +48,166 @@ from pydantic_settings import BaseSettings
 from pydantic import Field
 
 class Settings(BaseSettings):
-    aws_region: str = Field(..., alias="AWS_REGION")
-    aws_s3_bucket: str = Field(..., alias="AWS_S3_BUCKET")
+    # S3 를 쓰지 않는 배포에서도 앱이 뜨도록 기본값을 둠 (S3 기능 호출 시 StorageError)
+    aws_region: str | None = Field(default=None, alias="AWS_REGION")
+    aws_s3_bucket: str = Field(default="", alias="AWS_S3_BUCKET")
     aws_access_key_id: str | None = Field(default=None, alias="AWS_ACCESS_KEY_ID")
     aws_secret_access_key: str | None = Field(default=None, alias="AWS_SECRET_ACCESS_KEY")
     allowed_origins: str | None = Field(default=None, alias="ALLOWED_ORIGINS")
 
+    # ====== S3 업로드 ======
+    s3_endpoint_url: str | None = Field(default=None, alias="S3_ENDPOINT_URL")      # MinIO/moto 등
+    s3_upload_workers: int = Field(default=4, alias="S3_UPLOAD_WORKERS")            # 동시 업로드 파일 수
+    s3_part_concurrency: int = Field(default=8, alias="S3_PART_CONCURRENCY")        # 파일당 병렬 파트 수
+    s3_multipart_threshold: int = Field(default=8 * 1024 * 1024, alias="S3_MULTIPART_THRESHOLD")
+    s3_multipart_chunksize: int = Field(default=8 * 1024 * 1024, alias="S3_MULTIPART_CHUNKSIZE")
+
+    # ====== AILabTools ======
+    ailab_api_key: str = Field(default="", alias="AILAB_API_KEY")
+    ailab_base_url: str = Field(default="", alias="AILAB_BASE_URL")   # 콤마로 여러 개 지정 가능
+    request_timeout: float = Field(default=180.0, alias="REQUEST_TIMEOUT")  # 초
+    # 성공한 (url, 헤더, 모드) 조합 캐시
+    ailab_route_cache_path: str = Field(default="data/ailab_route.json", alias="AILAB_ROUTE_CACHE_PATH")
+    ailab_route_ttl: float = Field(default=86400.0, alias="AILAB_ROUTE_TTL")  # 초
+    # 얼굴 이미지를 파일로 보내는 요청(/fuse multipart)은 조합을 따로 탐색/캐시
+    ailab_upload_route_cache_path: str = Field(default="data/ailab_upload_route.json", alias="AILAB_UPLOAD_ROUTE_CACHE_PATH")
+    ailab_upload_field: str = Field(default="image", alias="AILAB_UPLOAD_FIELD")   # multipart 파일 필드 이름
+    # /fuse 직접 업로드: 최대 크기 / AILab 로 보내기 전 축소 기준(긴 변 px, 0 이면 원본 그대로)
+    fuse_upload_max_bytes: int = Field(default=15 * 1024 * 1024, alias="FUSE_UPLOAD_MAX_BYTES")
+    fuse_upload_max_side: int = Field(default=2048, alias="FUSE_UPLOAD_MAX_SIDE")
+    fuse_upload_jpeg_quality: int = Field(default=90, alias="FUSE_UPLOAD_JPEG_QUALITY")
+    # /fuse 결과 캐시 (얼굴 이미지 + 파라미터 기준)
+    fuse_cache_enabled: bool = Field(default=True, alias="FUSE_CACHE_ENABLED")
+    fuse_cache_dir: str = Field(default="outputs/cache/fuse", alias="FUSE_CACHE_DIR")
+    fuse_cache_max_bytes: int = Field(default=512 * 1024 * 1024, alias="FUSE_CACHE_MAX_BYTES")
+    # POST /fuse/batch: 한 요청 안에서 동시에 돌릴 변형 수 / 최대 변형 수
+    fuse_batch_concurrency: int = Field(default=4, alias="FUSE_BATCH_CONCURRENCY")
+    fuse_batch_max_variants: int = Field(default=16, alias="FUSE_BATCH_MAX_VARIANTS")
+
+    # ====== Meshy ======
+    meshy_api_key: str = Field(default="", alias="MESHY_API_KEY")
+    meshy_base_url: str = Field(default="https://api.meshy.ai", alias="MESHY_BASE_URL")
+    meshy_timeout: float = Field(default=600.0, alias="MESHY_TIMEOUT")  # 초
+
+    # 작업 상태 폴링 (백오프 + 지터)
+    meshy_poll_min_interval: float = Field(default=1.0, alias="MESHY_POLL_MIN_INTERVAL")  # 초
+    meshy_poll_max_interval: float = Field(default=10.0, alias="MESHY_POLL_MAX_INTERVAL")  # 초
+    meshy_poll_backoff: float = Field(default=1.5, alias="MESHY_POLL_BACKOFF")            # 간격 배수
+    meshy_poll_jitter: float = Field(default=0.2, alias="MESHY_POLL_JITTER")              # 간격 대비 비율
+    meshy_poll_concurrency: int = Field(default=8, alias="MESHY_POLL_CONCURRENCY")        # 동시 조회 수
+
+    # 완료 통지 방식: poll | webhook (webhook 이면 폴링은 느린 보정용으로만)
+    meshy_completion: str = Field(default="poll", alias="MESHY_COMPLETION")
+    meshy_webhook_secret: str = Field(default="", alias="MESHY_WEBHOOK_SECRET")      # HMAC-SHA256 서명 키
+    meshy_webhook_url: str | None = Field(default=None, alias="MESHY_WEBHOOK_URL")   # 작업 생성 시 callback_url 로 전달
+    meshy_webhook_fallback_interval: float = Field(default=60.0, alias="MESHY_WEBHOOK_FALLBACK_INTERVAL")  # 초
+
+    # 같은 입력 이미지의 중복 작업 방지
+    meshy_dedup_enabled: bool = Field(default=True, alias="MESHY_DEDUP_ENABLED")
+    meshy_dedup_retention: float = Field(default=7 * 86400.0, alias="MESHY_DEDUP_RETENTION")  # 초
+    meshy_dedup_max_bytes: int = Field(default=20 * 1024 * 1024, alias="MESHY_DEDUP_MAX_BYTES")  # 이보다 큰 입력 이미지는 URL 기준으로 중복 판단
+    meshy_index_path: str = Field(default="data/meshy_index.json", alias="MESHY_INDEX_PATH")
+
+    # 결과 GLB 저장 위치: local(outputs/meshy + /static) | s3(로컬 디스크 없이 S3 로 바로 스트리밍)
+    meshy_storage: str = Field(default="local", alias="MESHY_STORAGE")
+    meshy_s3_prefix: str = Field(default="meshy/", alias="MESHY_S3_PREFIX")
+    # 작업 결과물(모델 포맷 glb/fbx/obj/usdz, textures, thumbnail) 중 완료 즉시 동시에 받을 것
+    # 나머지는 URL 만 저널에 기록해 두고 /static 첫 요청 때 받음 (local 저장일 때)
+    meshy_eager_assets: str = Field(default="glb", alias="MESHY_EAGER_ASSETS")   # 예: "glb,usdz,thumbnail"
+
+    # ====== 정적 파일 / 뷰어 ======
+    static_precompress: bool = Field(default=True, alias="STATIC_PRECOMPRESS")   # GLB 저장 시 .gz/.br 생성
+    # GLB 미리보기 변형 (<name>.preview.glb): 텍스처 축소/재인코딩 + KHR_mesh_quantization
+    glb_preview_enabled: bool = Field(default=False, alias="GLB_PREVIEW")
+    glb_preview_max_texture: int = Field(default=1024, alias="GLB_PREVIEW_MAX_TEXTURE")   # 텍스처 긴 변 최대(px)
+    glb_preview_jpeg_quality: int = Field(default=80, alias="GLB_PREVIEW_JPEG_QUALITY")
+    glb_preview_quantize: bool = Field(default=True, alias="GLB_PREVIEW_QUANTIZE")
+    # 합성 결과 이미지: 마스터(Meshy 가 받는 PNG) + 파생본(/static/<마스터>?format=webp&w=512)
+    output_png_compress_level: int = Field(default=3, alias="OUTPUT_PNG_COMPRESS_LEVEL")   # 0~9 (낮을수록 빠르고 큼)
+    output_derivatives: str = Field(default="", alias="OUTPUT_DERIVATIVES")       # 미리 만들 파생본 (예: "webp@512,webp")
+    output_widths: str = Field(default="256,512,1024", alias="OUTPUT_WIDTHS")     # 허용하는 썸네일 폭(px)
+    output_webp_quality: int = Field(default=80, alias="OUTPUT_WEBP_QUALITY")
+    output_jpeg_quality: int = Field(default=85, alias="OUTPUT_JPEG_QUALITY")
+    # outputs/ 보존 정책 (retention): 용량 한도 / TTL 을 넘으면 오래 안 쓰인 결과물부터 정리
+    # (cache/fuse 는 FUSE_CACHE_MAX_BYTES 로 따로 관리하므로 제외)
+    output_quota_bytes: int = Field(default=0, alias="OUTPUT_QUOTA_BYTES")              # 0 이면 한도 없음
+    output_ttl_seconds: float = Field(default=0.0, alias="OUTPUT_TTL_SECONDS")          # 마지막 접근 후 보존 기간 (0 이면 무기한)
+    output_quota_low_water: float = Field(default=0.9, alias="OUTPUT_QUOTA_LOW_WATER")  # 한도 초과 시 이 비율까지 비움
+    output_min_age_seconds: float = Field(default=600.0, alias="OUTPUT_MIN_AGE_SECONDS")  # 갓 만든 결과물은 정리하지 않음
+    output_sweep_interval: float = Field(default=300.0, alias="OUTPUT_SWEEP_INTERVAL")  # 초
+    output_sweep_batch: int = Field(default=200, alias="OUTPUT_SWEEP_BATCH")           # 한 번에 지우는 수 (사이사이 양보)
+    output_index_path: str = Field(default="data/outputs_index.sqlite3", alias="OUTPUT_INDEX_PATH")
+    output_sharding: bool = Field(default=True, alias="OUTPUT_SHARDING")   # 새 결과물을 <dir>/<2자리 hex>/ 아래에 저장
+    output_offload: bool = Field(default=False, alias="OUTPUT_OFFLOAD")    # 지우기 전에 S3 로 옮기고 /static 은 그쪽으로 리다이렉트
+    output_offload_prefix: str = Field(default="outputs/", alias="OUTPUT_OFFLOAD_PREFIX")
+    # 버전을 고정해 unpkg 리다이렉트를 피하고 브라우저 캐시를 오래 쓰도록
+    viewer_script_url: str = Field(
+        default="https://unpkg.com/@google/model-viewer@3.5.0/dist/model-viewer.min.js",
+        alias="VIEWER_SCRIPT_URL",
+    )
+
+    # ====== 비동기 작업(잡) ======
+    job_store: str = Field(default="sqlite", alias="JOB_STORE")                 # memory | sqlite
+    job_db_path: str = Field(default="data/jobs.sqlite3", alias="JOB_DB_PATH")
+    job_workers: int = Field(default=4, alias="JOB_WORKERS")                    # 워커 태스크 수
+
+    # ====== 파이프라인 잡 (fuse → prepare → publish → meshy) ======
+    # Meshy 가 합성 이미지를 가져갈 수 있는 외부 주소 (비우면 요청의 base URL 사용)
+    public_base_url: str | None = Field(default=None, alias="PUBLIC_BASE_URL")
+    pipeline_publish: str = Field(default="local", alias="PIPELINE_PUBLISH")    # local | s3
+    pipeline_max_items: int = Field(default=16, alias="PIPELINE_MAX_ITEMS")
+    pipeline_fuse_workers: int = Field(default=2, alias="PIPELINE_FUSE_WORKERS")
+    pipeline_meshy_workers: int = Field(default=4, alias="PIPELINE_MESHY_WORKERS")
+
+    # ====== 업스트림 동시 실행 제한 / 대기열 ======
+    ailab_concurrency: int = Field(default=4, alias="AILAB_CONCURRENCY")
+    meshy_concurrency: int = Field(default=4, alias="MESHY_CONCURRENCY")       # 동시에 진행할 Meshy 작업 수
+    scheduler_max_queue: int = Field(default=32, alias="SCHEDULER_MAX_QUEUE")  # 업스트림별 최대 대기 수
+    scheduler_lanes: str = Field(default="paid:3,free:1", alias="SCHEDULER_LANES")  # 레인:가중치
+    scheduler_default_lane: str = Field(default="free", alias="SCHEDULER_DEFAULT_LANE")
+    # X-Priority 를 믿을 게이트웨이/프록시 주소 (IP 또는 CIDR, 쉼표 구분). 비우면 헤더를 무시하고 모두 기본 레인
+    scheduler_trusted_proxies: str = Field(default="", alias="SCHEDULER_TRUSTED_PROXIES")
+
+    # ====== 공유 HTTP 클라이언트 (업스트림별 커넥션 풀) ======
+    http2: bool = Field(default=False, alias="HTTP2")                          # h2 패키지 필요
+    http_connect_timeout: float = Field(default=10.0, alias="HTTP_CONNECT_TIMEOUT")
+    http_keepalive_expiry: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    meshy_http_timeout: float = Field(default=60.0, alias="MESHY_HTTP_TIMEOUT")
+    meshy_max_connections: int = Field(default=20, alias="MESHY_MAX_CONNECTIONS")
+    ailab_max_connections: int = Field(default=20, alias="AILAB_MAX_CONNECTIONS")
+    download_timeout: float = Field(default=120.0, alias="DOWNLOAD_TIMEOUT")
+    download_max_connections: int = Field(default=20, alias="DOWNLOAD_MAX_CONNECTIONS")
+
+    # ====== 스트리밍 다운로드 ======
+    download_concurrency: int = Field(default=4, alias="DOWNLOAD_CONCURRENCY")      # 동시 다운로드 수
+    download_max_resumes: int = Field(default=3, alias="DOWNLOAD_MAX_RESUMES")      # 끊김 시 이어받기 횟수
+    download_chunk_size: int = Field(default=1024 * 1024, alias="DOWNLOAD_CHUNK_SIZE")  # 바이트
+    # 클라이언트가 준 URL(face_url / image_url)을 서버가 직접 받을 때 사설/루프백/링크로컬 주소도 허용 (로컬 테스트용)
+    download_allow_private: bool = Field(default=False, alias="DOWNLOAD_ALLOW_PRIVATE")
+
+    # ====== 이미지 처리 실행기 ======
+    image_executor: str = Field(default="process", alias="IMAGE_EXECUTOR")   # process | thread
+    image_workers: int = Field(default=0, alias="IMAGE_WORKERS")             # 0 이면 CPU 코어 수
+
+    # ====== Meshy 작업 저널 (SQLite WAL) / 재시작 복구 ======
+    meshy_journal_path: str = Field(default="data/meshy_journal.sqlite3", alias="MESHY_JOURNAL_PATH")
+    meshy_recover_on_startup: bool = Field(default=True, alias="MESHY_RECOVER_ON_STARTUP")
+    meshy_recovery_concurrency: int = Field(default=4, alias="MESHY_RECOVERY_CONCURRENCY")
+    meshy_recovery_max_age: float = Field(default=3 * 86400.0, alias="MESHY_RECOVERY_MAX_AGE")   # 초 (결과 URL 만료 고려)
+
+    # ====== 업스트림 복원력 (재시도 / 헤지 / 서킷 브레이커 / 마감) ======
+    retry_max_attempts: int = Field(default=3, alias="RETRY_MAX_ATTEMPTS")          # 첫 시도 포함
+    retry_base_delay: float = Field(default=0.25, alias="RETRY_BASE_DELAY")         # 초, 시도마다 2배
+    retry_max_delay: float = Field(default=4.0, alias="RETRY_MAX_DELAY")
+    hedge_delay: float = Field(default=1.5, alias="HEDGE_DELAY")                    # 결과 이미지 다운로드 헤지 (0 이면 끔)
+    hedge_max_attempts: int = Field(default=2, alias="HEDGE_MAX_ATTEMPTS")
+    breaker_failure_threshold: int = Field(default=5, alias="BREAKER_FAILURE_THRESHOLD")  # 연속 실패 수
+    breaker_reset_timeout: float = Field(default=30.0, alias="BREAKER_RESET_TIMEOUT")     # open 유지 시간(초)
+    request_deadline: float = Field(default=0.0, alias="REQUEST_DEADLINE")          # X-Request-Timeout 없을 때 기본값 (0 이면 없음)
+
+    def effective_ailab_urls(self) -> list[str]:
+        return [u.strip() for u in (self.ailab_base_url or "").split(",") if u.strip()]
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,51 @@
+# hairfusion-service/bench/_servers.py
+"""
+벤치마크용 헬퍼: ASGI 앱을 별도 스레드의 uvicorn 으로 띄운다.
+(서버마다 자기 이벤트 루프를 가지므로, 한쪽 루프가 막혀도 클라이언트 측 측정은 계속 진행됨)
+"""
+import os
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import uvicorn
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(app, port: int | None = None) -> Iterator[str]:
+    port = port or free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    th = threading.Thread(target=server.run, daemon=True)
+    th.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError(f"server on :{port} did not start")
+        time.sleep(0.02)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        th.join(timeout=5)
+
+
+def isolated_workdir() -> str:
+    """
+    outputs/ 가 저장소를 더럽히지 않도록 임시 작업 디렉터리로 이동.
+    app.settings 가 요구하는 최소 환경변수도 채워둔다.
+    """
+    os.environ.setdefault("AWS_REGION", "ap-northeast-2")
+    os.environ.setdefault("AWS_S3_BUCKET", "bench-bucket")
+    work = tempfile.mkdtemp(prefix="hairfusion-bench-")
+    os.chdir(work)
+    return work
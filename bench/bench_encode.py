@@ -0,0 +1,103 @@
+# hairfusion-service/bench/bench_encode.py
+"""
+합성 결과 이미지 인코딩 벤치마크: 포맷/품질/크기별 인코딩 시간과 바이트 수.
+
+    python -m bench.bench_encode --runs 5
+    python -m bench.bench_encode --image face.png --runs 5   # 실제 결과 이미지로 측정
+
+- master_png_l<N> : _normalize_to_png (Meshy 로 보내는 마스터 PNG, compress_level=N)
+- <format>@<w>    : derivatives.encode_derivative (마스터 → WebP/JPEG/PNG, 폭 w 로 축소)
+--image 가 없으면 사진과 비슷한 합성 이미지(그라디언트 + 도형 + 약한 노이즈, 1024px)를 씀.
+결과는 JSON (중앙값 ms, 바이트, 마스터 대비 비율).
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _sample(size: int) -> bytes:
+    # 단색/순수 노이즈는 PNG·WebP 에 너무 유리/불리하므로 둘을 섞은 사진 비슷한 이미지
+    from PIL import Image, ImageDraw, ImageFilter
+
+    grad = Image.linear_gradient("L").resize((size, size))
+    img = Image.merge("RGB", (grad, grad.rotate(90), grad.rotate(180)))
+    draw = ImageDraw.Draw(img)
+    for i in range(12):
+        r = size // (3 + i)
+        x, y = (i * 97) % size, (i * 193) % size
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=((i * 40) % 256, (i * 70) % 256, (i * 110) % 256))
+    img = img.filter(ImageFilter.GaussianBlur(size / 256))
+    noise = Image.effect_noise((size, size), 12).convert("RGB")
+    img = Image.blend(img, noise, 0.15)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _median_ms(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return round(statistics.median(times) * 1000, 2)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--image", help="입력 이미지 (없으면 합성 이미지)")
+    ap.add_argument("--size", type=int, default=1024)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--png-levels", default="1,3,6,9")
+    ap.add_argument("--formats", default="webp,jpeg,png")
+    ap.add_argument("--widths", default="full,512,256")
+    ap.add_argument("--webp-quality", type=int, default=80)
+    ap.add_argument("--jpeg-quality", type=int, default=85)
+    args = ap.parse_args()
+
+    from app.services.ailabtools import _normalize_to_png
+    from app.services.derivatives import encode_derivative
+
+    raw = Path(args.image).read_bytes() if args.image else _sample(args.size)
+    tmp = Path(tempfile.mkdtemp(prefix="encode-bench-"))
+    quality = {"webp": args.webp_quality, "jpeg": args.jpeg_quality}
+
+    rows = {}
+    master = None
+    for level in (int(x) for x in args.png_levels.split(",")):
+        dest = tmp / f"master_l{level}.png"
+        ms = _median_ms(lambda: _normalize_to_png(raw, str(dest), level), args.runs)
+        rows[f"master_png_l{level}"] = {"encode_ms": ms, "bytes": dest.stat().st_size}
+        if level == 6 or master is None:
+            master = dest   # 파생본은 기존 기본값(6)으로 저장한 마스터에서 만듦
+
+    master_bytes = master.stat().st_size
+    for fmt in args.formats.split(","):
+        for w in args.widths.split(","):
+            width = None if w == "full" else int(w)
+            dest = tmp / f"d_{fmt}_{w}"
+            q = quality.get(fmt, 6)
+            ms = _median_ms(lambda: encode_derivative(str(master), str(dest), fmt, width, q), args.runs)
+            size = dest.stat().st_size
+            rows[f"{fmt}@{w}"] = {
+                "encode_ms": ms,
+                "bytes": size,
+                "vs_master": round(size / master_bytes, 3),
+            }
+
+    from PIL import Image
+
+    with Image.open(master) as img:
+        master_size = img.size
+    print(json.dumps({"master_size": master_size, "master_bytes": master_bytes, "runs": args.runs, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# hairfusion-service/bench/bench_fuse_route.py
+"""
+AILab 엔드포인트 탐색 캐시 벤치마크.
+
+    python -m bench.bench_fuse_route --requests 20 --latency 0.02
+
+- cold : 매 요청 전에 캐시를 비움 (예전처럼 매번 후보 조합을 전부 훑음)
+- warm : 캐시된 조합으로 바로 호출
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir, serve  # noqa: E402
+from bench import fake_ailab  # noqa: E402
+
+
+def _pct(values, q):
+    values = sorted(values)
+    idx = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return round(values[idx] * 1000, 2)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.02)
+    ap.add_argument("--accept-path", default="/hair")
+    ap.add_argument("--accept-header", default="Authorization")
+    args = ap.parse_args()
+
+    isolated_workdir()
+    fake = fake_ailab.create_app(
+        accept_path="/base" + args.accept_path,
+        accept_header=args.accept_header,
+        latency=args.latency,
+    )
+    with serve(fake) as ailab_url:
+        os.environ["AILAB_BASE_URL"] = ailab_url + "/base"
+        os.environ["AILAB_API_KEY"] = "bench"
+
+        import httpx
+        import app.main as main_mod
+
+        results = {}
+        with serve(main_mod.app) as base:
+            client = httpx.Client(base_url=base, timeout=120)
+            for mode in ("cold", "warm"):
+                lat = []
+                calls0 = fake.state.stats["calls"]
+                for _ in range(args.requests):
+                    if mode == "cold":
+                        client.delete("/admin/ailab/route")
+                    t0 = time.perf_counter()
+                    r = client.post("/fuse", json={"face_url": "http://example/face.png"})
+                    r.raise_for_status()
+                    lat.append(time.perf_counter() - t0)
+                results[mode] = {
+                    "requests": args.requests,
+                    "p50_ms": _pct(lat, 50),
+                    "p95_ms": _pct(lat, 95),
+                    "max_ms": _pct(lat, 100),
+                    "upstream_calls_per_request": round(
+                        (fake.state.stats["calls"] - calls0) / args.requests, 2
+                    ),
+                }
+            results["route_cache"] = client.get("/admin/ailab/route").json()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
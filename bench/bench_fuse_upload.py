@@ -0,0 +1,142 @@
+# hairfusion-service/bench/bench_fuse_upload.py
+"""
+/fuse 입력 경로 벤치마크: URL(스토리지 경유) vs multipart 직접 업로드.
+
+    python -m bench.bench_fuse_upload --requests 20 --face-side 2048 --store-latency 0.03 --uplink-mbps 20
+
+- url    : 클라이언트가 얼굴 이미지를 객체 저장소(로컬 대역, S3 역할)에 PUT → /fuse(JSON, face_url)
+           → AILab 이 image_url 에서 다시 내려받음 (네트워크 왕복 3번)
+- upload : /fuse 에 multipart 로 바로 올림 → 서비스가 FUSE_UPLOAD_MAX_SIDE 로 축소해 AILab 에 파일로 첨부
+store-latency 는 저장소 요청 1건당 더해지는 지연(초)으로, S3 왕복 비용을 흉내냄.
+uplink-mbps 를 주면 클라이언트 → (저장소 | 서비스) 업로드를 그 속도로 제한 (모바일 상향 대역폭).
+결과 캐시는 끄고 측정 (매 요청이 AILab 까지 감). 결과는 JSON.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir, serve  # noqa: E402
+from bench import fake_ailab  # noqa: E402
+
+
+def _pct(values, q):
+    values = sorted(values)
+    idx = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return round(values[idx] * 1000, 2)
+
+
+def _face_jpeg(side: int) -> bytes:
+    # 노이즈가 섞인 사진 크기의 JPEG (단색 이미지는 너무 작게 압축돼 전송 비용이 드러나지 않음)
+    from PIL import Image
+
+    img = Image.effect_noise((side, side), 40).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _throttled(body: bytes, mbps: float):
+    # 64KB 씩 보내면서 대역폭(Mbit/s)에 맞춰 쉼
+    chunk = 64 * 1024
+    for i in range(0, len(body), chunk):
+        part = body[i:i + chunk]
+        if mbps > 0:
+            time.sleep(len(part) * 8 / (mbps * 1_000_000))
+        yield part
+
+
+def _object_store(latency: float):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import Response
+
+    app = FastAPI(title="fake-object-store")
+    objects: dict[str, bytes] = {}
+
+    @app.put("/objects/{name}")
+    async def put(name: str, request: Request):
+        await asyncio.sleep(latency)
+        objects[name] = await request.body()
+        return Response(status_code=200)
+
+    @app.get("/objects/{name}")
+    async def get(name: str):
+        await asyncio.sleep(latency)
+        return Response(objects[name], media_type="image/jpeg")
+
+    return app
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20)
+    ap.add_argument("--face-side", type=int, default=2048, help="업로드할 얼굴 이미지 한 변(px)")
+    ap.add_argument("--max-side", type=int, default=1024, help="FUSE_UPLOAD_MAX_SIDE")
+    ap.add_argument("--latency", type=float, default=0.02, help="AILab 처리 지연(초)")
+    ap.add_argument("--store-latency", type=float, default=0.03, help="저장소 요청 1건당 지연(초)")
+    ap.add_argument("--uplink-mbps", type=float, default=0.0, help="클라이언트 업로드 대역폭 (0 이면 제한 없음)")
+    args = ap.parse_args()
+
+    isolated_workdir()
+    face = _face_jpeg(args.face_side)
+    fake = fake_ailab.create_app(accept_mode="form,multipart", latency=args.latency, fetch_input=True)
+    with serve(fake) as ailab_url, serve(_object_store(args.store_latency)) as store_url:
+        os.environ["AILAB_BASE_URL"] = ailab_url + "/api/hairstyle"
+        os.environ["AILAB_API_KEY"] = "bench"
+        os.environ["FUSE_CACHE_ENABLED"] = "false"
+        os.environ["FUSE_UPLOAD_MAX_SIDE"] = str(args.max_side)
+
+        import httpx
+        import app.main as main_mod
+
+        results = {"face_bytes": len(face)}
+        with serve(main_mod.app) as base:
+            client = httpx.Client(timeout=120)
+
+            def send(method: str, url: str, **kw) -> None:
+                # 본문을 한 번 인코딩한 뒤 대역폭 제한을 걸어 전송 (multipart 도 같은 방식)
+                req = client.build_request(method, url, **kw)
+                body = req.read()
+                headers = {k: v for k, v in req.headers.items() if k.lower() != "content-length"}
+                headers["Content-Length"] = str(len(body))
+                client.request(
+                    method, url, content=_throttled(body, args.uplink_mbps), headers=headers
+                ).raise_for_status()
+
+            def via_url(i: int) -> None:
+                url = f"{store_url}/objects/face_{i}.jpg"
+                send("PUT", url, content=face, headers={"Content-Type": "image/jpeg"})
+                client.post(f"{base}/fuse", json={"face_url": url}).raise_for_status()
+
+            def via_upload(i: int) -> None:
+                send("POST", f"{base}/fuse", files={"face": ("face.jpg", face, "image/jpeg")})
+
+            for mode, fn in (("url", via_url), ("upload", via_upload)):
+                fn(-1)   # 엔드포인트 탐색 / 커넥션 준비는 측정에서 제외
+                lat = []
+                bytes0, calls0 = fake.state.stats["input_bytes"], fake.state.stats["calls"]
+                for i in range(args.requests):
+                    t0 = time.perf_counter()
+                    fn(i)
+                    lat.append(time.perf_counter() - t0)
+                results[mode] = {
+                    "requests": args.requests,
+                    "p50_ms": _pct(lat, 50),
+                    "p95_ms": _pct(lat, 95),
+                    "max_ms": _pct(lat, 100),
+                    "ailab_calls_per_request": round((fake.state.stats["calls"] - calls0) / args.requests, 2),
+                    "ailab_input_bytes_per_request": (fake.state.stats["input_bytes"] - bytes0) // args.requests,
+                }
+            results["speedup_p50"] = round(results["url"]["p50_ms"] / results["upload"]["p50_ms"], 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# hairfusion-service/bench/bench_imaging.py
+"""
+_prepare_image_for_meshy (+ PNG 저장) 마이크로 벤치마크.
+
+    python -m bench.bench_imaging --sizes 256,512,1024,2048 --modes P,RGBA,L,RGB --batch 16
+
+- single_ms     : 이미지 1장을 현재 스레드에서 처리하는 시간 (중앙값)
+- inline_ips    : 이벤트 루프 스레드에서 순차 처리할 때 images/sec (예전 방식)
+- executor_ips  : 이미지 실행기(프로세스/스레드 풀)에 batch 장을 동시에 넘길 때 images/sec
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir  # noqa: E402
+
+
+def _sample(size: int, mode: str) -> bytes:
+    from PIL import Image
+
+    img = Image.effect_noise((size, size), 64).convert("RGB")
+    if mode == "P":
+        img = img.convert("P", palette=Image.ADAPTIVE)
+    elif mode != "RGB":
+        img = img.convert(mode)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+async def _executor_run(fn, raw: bytes, out: str, batch: int) -> float:
+    from app.services.imaging import run_image_job
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(run_image_job(fn, raw, f"{out}_{i}.png") for i in range(batch)))
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="256,512,1024,2048")
+    ap.add_argument("--modes", default="P,RGBA,L,RGB")
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    isolated_workdir()
+    from app.services.ailabtools import _normalize_to_png
+    from app.services.imaging import executor_kind, shutdown_executor
+
+    out_dir = tempfile.mkdtemp(prefix="imgbench-")
+    rows = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        for mode in args.modes.split(","):
+            raw = _sample(size, mode)
+            out = os.path.join(out_dir, f"{mode}_{size}")
+
+            single = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                _normalize_to_png(raw, out + ".png")
+                single.append(time.perf_counter() - t0)
+            med = statistics.median(single)
+
+            pooled = asyncio.run(_executor_run(_normalize_to_png, raw, out, args.batch))
+            rows.append({
+                "size": size,
+                "mode": mode,
+                "input_bytes": len(raw),
+                "single_ms": round(med * 1000, 2),
+                "inline_ips": round(1 / med, 2),
+                "executor_ips": round(args.batch / pooled, 2),
+            })
+
+    print(json.dumps({"executor": executor_kind(), "cpus": os.cpu_count(), "results": rows}, indent=2))
+    shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
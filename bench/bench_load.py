@@ -0,0 +1,228 @@
+# hairfusion-service/bench/bench_load.py
+"""
+부하 테스트: 가짜 AILab / Meshy 를 띄우고, 서비스를 별도 프로세스(uvicorn)로 실행한 뒤
+/fuse, /meshify, /static 을 동시 요청으로 두드려 지연/처리량/메모리를 측정.
+
+    python -m bench.bench_load --scenarios fuse,meshify,static --concurrency 16 --requests 200
+    python -m bench.bench_load --scenarios meshify --glb-mb 20 --task-seconds 5 --out load.json
+
+- fuse    : POST /fuse (가짜 AILab 는 경로/헤더/모드를 틀리면 404/401/400 → 첫 요청이 탐색 수행)
+- meshify : POST /meshify (PENDING → IN_PROGRESS → SUCCEEDED 후 GLB 다운로드)
+- static  : GET /static/meshy/<glb> (glb-mb 크기 파일)
+시나리오별 p50/p95/p99/max 지연, RPS, 상태 코드 분포, 서비스 프로세스의 최대 RSS 를 JSON 으로 출력.
+기본값으로 fuse 캐시 / Meshy 중복 제거는 끔 (매 요청이 업스트림까지 가도록). --cache 로 켤 수 있음.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bench._servers import free_port, isolated_workdir, serve  # noqa: E402
+from bench import fake_ailab, fake_meshy  # noqa: E402
+
+SCENARIOS = ("fuse", "meshify", "static")
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return round(values[idx] * 1000, 2)
+
+
+def _rss_kb(pid: int, field: str = "VmRSS") -> int | None:
+    """/proc/<pid>/status 의 VmRSS(현재) / VmHWM(최대) 값 (KB). 리눅스가 아니면 None."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """시나리오 동안 주기적으로 RSS 를 읽어 최대값을 기록 (시나리오별 peak)"""
+
+    def __init__(self, pid: int, interval: float = 0.05) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._th = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            kb = _rss_kb(self.pid)
+            if kb:
+                self.peak_kb = max(self.peak_kb, kb)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._th.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._th.join()
+
+
+def _start_service(env: dict, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **env, "PYTHONPATH": str(ROOT)},
+    )
+    import httpx
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"service exited with {proc.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("service did not start")
+
+
+async def _drive(make_request, requests: int, concurrency: int) -> dict:
+    import httpx
+
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(requests))
+
+    async def worker(client):
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                r = await make_request(client, i)
+                statuses[str(r.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - t0)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(requests / wall, 2),
+        "p50_ms": _pct(latencies, 50),
+        "p95_ms": _pct(latencies, 95),
+        "p99_ms": _pct(latencies, 99),
+        "max_ms": _pct(latencies, 100),
+        "status": dict(statuses),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--ailab-latency", type=float, default=0.05)
+    ap.add_argument("--meshy-latency", type=float, default=0.01)
+    ap.add_argument("--task-seconds", type=float, default=2.0)
+    ap.add_argument("--glb-mb", type=float, default=2.0)
+    ap.add_argument("--cache", action="store_true", help="fuse 캐시 / Meshy 중복 제거 켜기")
+    ap.add_argument("--env", action="append", default=[], help="서비스에 넘길 환경변수 KEY=VALUE (반복 가능)")
+    ap.add_argument("--out", help="결과 JSON 을 저장할 파일 (기본: stdout)")
+    args = ap.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"unknown scenarios: {sorted(unknown)}")
+
+    out = Path(args.out).resolve() if args.out else None   # 작업 디렉터리를 옮기기 전에 고정
+    workdir = isolated_workdir()
+    glb_size = int(args.glb_mb * 1024 * 1024)
+    ailab = fake_ailab.create_app(latency=args.ailab_latency)
+    meshy = fake_meshy.create_app(task_seconds=args.task_seconds, glb_size=glb_size, latency=args.meshy_latency)
+
+    with serve(ailab) as ailab_url, serve(meshy) as meshy_url:
+        env = {
+            "AILAB_BASE_URL": ailab_url,
+            "AILAB_API_KEY": "bench",
+            "MESHY_BASE_URL": meshy_url,
+            "MESHY_API_KEY": "bench",
+            "JOB_STORE": "memory",
+            "MESHY_POLL_MIN_INTERVAL": "0.5",
+            "MESHY_POLL_MAX_INTERVAL": "2.0",
+            "FUSE_CACHE_ENABLED": str(args.cache).lower(),
+            "MESHY_DEDUP_ENABLED": str(args.cache).lower(),
+            # 얼굴/입력 이미지를 로컬 대역(127.0.0.1)에서 받으므로 내부 주소 차단을 풂
+            "DOWNLOAD_ALLOW_PRIVATE": "true",
+            # 동시 요청 수만큼은 대기열에 받아주도록 (어드미션 컨트롤 자체를 재는 게 아니면)
+            "SCHEDULER_MAX_QUEUE": str(max(args.concurrency * 2, 32)),
+        }
+        env.update(kv.split("=", 1) for kv in args.env)
+
+        static_name = "bench.glb"
+        static_path = Path(workdir) / "outputs" / "meshy" / static_name
+        static_path.parent.mkdir(parents=True, exist_ok=True)
+        static_path.write_bytes(b"glTF" + os.urandom(max(glb_size - 4, 0)))
+
+        port = free_port()
+        proc = _start_service(env, port)
+        base = f"http://127.0.0.1:{port}"
+
+        requests = {
+            "fuse": lambda c, i: c.post(
+                f"{base}/fuse",
+                json={"face_url": f"{ailab_url}/images/face{i}.png", "hair_style": "BuzzCut"},
+            ),
+            "meshify": lambda c, i: c.post(f"{base}/meshify", json={"image_url": f"{ailab_url}/images/in{i}.png"}),
+            "static": lambda c, i: c.get(f"{base}/static/meshy/{static_name}"),
+        }
+
+        results = {}
+        try:
+            for name in scenarios:
+                calls0 = dict(ailab.state.stats), dict(meshy.state.stats)
+                with RssSampler(proc.pid) as rss:
+                    results[name] = asyncio.run(_drive(requests[name], args.requests, args.concurrency))
+                results[name]["peak_rss_mb"] = round(rss.peak_kb / 1024, 1) if rss.peak_kb else None
+                results[name]["upstream_calls"] = {
+                    "ailab": {k: v - calls0[0][k] for k, v in ailab.state.stats.items()},
+                    "meshy": {k: v - calls0[1][k] for k, v in meshy.state.stats.items()},
+                }
+            hwm = _rss_kb(proc.pid, "VmHWM")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    report = {
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "service_peak_rss_mb": round(hwm / 1024, 1) if hwm else None,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if out:
+        out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# hairfusion-service/bench/bench_meshy_assets.py
+"""
+Meshy 결과물(다른 모델 포맷 / 텍스처 / 썸네일) 수집 벤치마크.
+
+    python -m bench.bench_meshy_assets --requests 4 --asset-latency 0.2
+
+- serial : GLB 만 받는 /meshify 이후 클라이언트가 작업을 다시 조회해 나머지를 하나씩 받음 (예전 방식)
+- eager  : MESHY_EAGER_ASSETS=models,textures,thumbnail → /meshify 안에서 GLB 와 함께 동시에 받음
+- lazy   : GLB 만 받고, 나머지는 /static 첫 요청 때 받음
+           (첫 요청 / 두 번째 요청 지연, 같은 결과물 동시 요청 시 실제 다운로드 수)
+- expired: 결과물 URL 만료(url_ttl) 후 lazy 요청 → 작업 재조회로 새 URL 을 받아 성공하는지
+결과는 JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir, serve  # noqa: E402
+from bench import fake_meshy  # noqa: E402
+
+FORMATS = ("glb", "fbx", "obj", "usdz")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=4)
+    ap.add_argument("--task-seconds", type=float, default=0.5)
+    ap.add_argument("--asset-latency", type=float, default=0.2, help="결과물 파일 하나 내려받을 때 지연(초)")
+    ap.add_argument("--asset-kb", type=int, default=512)
+    ap.add_argument("--textures", type=int, default=1)
+    ap.add_argument("--url-ttl", type=float, default=3.0, help="결과물 URL 유효 시간(초)")
+    ap.add_argument("--concurrent", type=int, default=8, help="lazy: 같은 결과물 동시 요청 수")
+    args = ap.parse_args()
+
+    isolated_workdir()
+    fake = fake_meshy.create_app(
+        task_seconds=args.task_seconds,
+        formats=FORMATS,
+        textures=args.textures,
+        thumbnail=True,
+        asset_size=args.asset_kb * 1024,
+        asset_latency=args.asset_latency,
+        url_ttl=args.url_ttl,
+    )
+    with serve(fake) as meshy_url:
+        os.environ.update(
+            MESHY_BASE_URL=meshy_url,
+            MESHY_API_KEY="bench",
+            MESHY_DEDUP_ENABLED="false",
+            MESHY_POLL_MIN_INTERVAL="0.05",
+            MESHY_POLL_MAX_INTERVAL="0.2",
+            JOB_STORE="memory",
+        )
+        import httpx
+        import app.main as main_mod
+        from app.settings import settings
+
+        stats = fake.state.stats
+        results = {}
+        with serve(main_mod.app) as base:
+            client = httpx.Client(timeout=120)
+
+            def meshify() -> dict:
+                r = client.post(f"{base}/meshify", json={"image_url": "http://example/face.png"})
+                r.raise_for_status()
+                return r.json()
+
+            # serial: GLB 만 받고 → 작업 재조회 → 나머지를 순서대로
+            settings.meshy_eager_assets = "glb"
+            lat = []
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                body = meshify()
+                task = client.get(
+                    f"{meshy_url}/openapi/v1/tasks/{body['job_id']}", headers={"Authorization": "Bearer bench"}
+                ).json()
+                urls = [u for f, u in task["model_urls"].items() if f != "glb"]
+                urls += [u for tex in task.get("texture_urls", []) for u in tex.values()]
+                urls += [task["thumbnail_url"]]
+                for u in urls:
+                    client.get(u).raise_for_status()
+                lat.append(time.perf_counter() - t0)
+            results["serial"] = {"p50_ms": _ms(sorted(lat)[len(lat) // 2]), "assets": len(urls) + 1}
+
+            # eager: /meshify 안에서 동시에
+            settings.meshy_eager_assets = "models,textures,thumbnail"
+            lat = []
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                body = meshify()
+                lat.append(time.perf_counter() - t0)
+            on_disk = sum(1 for u in body["assets"].values() if Path("outputs", u[len("/static/"):]).exists())
+            results["eager"] = {"p50_ms": _ms(sorted(lat)[len(lat) // 2]), "assets": len(body["assets"]) + 1, "on_disk": on_disk}
+
+            # lazy: 응답은 GLB 만 기다리고, 나머지는 첫 요청 때
+            settings.meshy_eager_assets = "glb"
+            t0 = time.perf_counter()
+            body = meshify()
+            meshify_s = time.perf_counter() - t0
+            usdz = base + body["assets"]["usdz"]
+            t0 = time.perf_counter()
+            client.get(usdz).raise_for_status()
+            first = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            client.get(usdz).raise_for_status()
+            second = time.perf_counter() - t0
+
+            fbx = base + body["assets"]["fbx"]
+            before = stats.get("download_fbx", 0)
+
+            async def burst() -> list:
+                async with httpx.AsyncClient(timeout=120) as ac:
+                    return [r.status_code for r in await asyncio.gather(*(ac.get(fbx) for _ in range(args.concurrent)))]
+
+            codes = asyncio.run(burst())
+            results["lazy"] = {
+                "meshify_ms": _ms(meshify_s),
+                "first_request_ms": _ms(first),
+                "cached_request_ms": _ms(second),
+                "concurrent_requests": args.concurrent,
+                "concurrent_ok": codes.count(200),
+                "upstream_downloads": stats.get("download_fbx", 0) - before,
+            }
+
+            # expired: URL 유효 시간이 지난 뒤 lazy 요청
+            body = meshify()
+            time.sleep(args.url_ttl + 0.2)
+            expired0, polls0 = stats["expired"], stats["poll"]
+            r = client.get(base + body["assets"]["obj"])
+            results["expired"] = {
+                "status": r.status_code,
+                "expired_responses": stats["expired"] - expired0,
+                "task_requeries": stats["poll"] - polls0,
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# hairfusion-service/bench/bench_polling.py
+"""
+Meshy 폴링 벤치마크: /meshify 동시 처리량과, 그 동안의 /health 지연을 측정.
+
+    python -m bench.bench_polling --jobs 8 --task-seconds 3
+
+- blocking : 예전 wait_and_download (async 함수 안의 time.sleep(3)) 을 재현
+- shared   : 현재 공유 폴러(app.services.poller) 경로
+결과는 JSON 으로 stdout 에 출력.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir, serve  # noqa: E402
+from bench import fake_meshy  # noqa: E402
+
+
+def _legacy_wait_and_download(legacy_sleep: float):
+    """baseline 의 블로킹 폴링 루프를 그대로 재현"""
+    import httpx
+    from app.services import meshy
+
+    async def wait_and_download(task_id: str, on_progress=None) -> "meshy.StoredModel":
+        deadline = time.time() + (meshy.settings.meshy_timeout or 600)
+        while time.time() < deadline:
+            last = await meshy.get_job(task_id)
+            st = (last.get("status") or "").upper()
+            if st == "SUCCEEDED":
+                async with httpx.AsyncClient() as client:
+                    r = await client.get(last["model_url"], timeout=120)
+                    r.raise_for_status()
+                    fname = meshy.OUT_DIR / f"meshy_{task_id.replace('-', '')[:16]}.glb"
+                    with open(fname, "wb") as f:
+                        f.write(r.content)
+                    return meshy.StoredModel(url="/static/meshy/" + fname.name, path=fname)
+            elif st in ("FAILED", "CANCELED"):
+                raise meshy.MeshyError(f"job failed: {last}")
+            time.sleep(legacy_sleep)
+        raise meshy.MeshyTimeout(task_id)
+
+    return wait_and_download
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return round(values[idx] * 1000, 2)
+
+
+async def _drive(base: str, jobs: int) -> dict:
+    import httpx
+
+    health: list[float] = []
+    done = asyncio.Event()
+
+    async def probe(client):
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get(f"{base}/health")
+            health.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.05)
+
+    async def one(client):
+        t0 = time.perf_counter()
+        r = await client.post(f"{base}/meshify", json={"image_url": "http://example/face.png"})
+        r.raise_for_status()
+        return time.perf_counter() - t0
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        prober = asyncio.create_task(probe(client))
+        t0 = time.perf_counter()
+        lat = await asyncio.gather(*(one(client) for _ in range(jobs)))
+        wall = time.perf_counter() - t0
+        done.set()
+        await prober
+        conns = (await client.get(f"{base}/admin/http")).json()
+
+    return {
+        "jobs": jobs,
+        "wall_s": round(wall, 3),
+        "jobs_per_s": round(jobs / wall, 3),
+        "meshify_p50_ms": _pct(lat, 50),
+        "meshify_max_ms": _pct(lat, 100),
+        "health_samples": len(health),
+        "health_p50_ms": _pct(health, 50),
+        "health_p99_ms": _pct(health, 99),
+        "health_max_ms": _pct(health, 100),
+        "health_mean_ms": round(statistics.mean(health) * 1000, 2) if health else None,
+        "upstream_connections": conns,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=8)
+    ap.add_argument("--task-seconds", type=float, default=3.0)
+    ap.add_argument("--legacy-sleep", type=float, default=3.0)
+    ap.add_argument("--mode", choices=("both", "blocking", "shared"), default="both")
+    args = ap.parse_args()
+
+    isolated_workdir()
+    fake = fake_meshy.create_app(task_seconds=args.task_seconds)
+    with serve(fake) as meshy_url:
+        os.environ["MESHY_BASE_URL"] = meshy_url
+        os.environ["MESHY_API_KEY"] = "bench"
+        os.environ["MESHY_DEDUP_ENABLED"] = "false"   # 두 모드가 같은 이미지를 쓰므로 결과 재사용을 끔
+        os.environ.setdefault("MESHY_POLL_MIN_INTERVAL", "0.5")
+        os.environ.setdefault("MESHY_POLL_MAX_INTERVAL", "2.0")
+
+        import app.main as main_mod
+        from app.services import meshy_dedup
+
+        # /meshify 는 meshy_dedup.meshify_image 를 거쳐 wait_and_download 를 부름
+        shared = meshy_dedup.wait_and_download
+        results = {}
+        modes = ("blocking", "shared") if args.mode == "both" else (args.mode,)
+        for mode in modes:
+            meshy_dedup.wait_and_download = (
+                _legacy_wait_and_download(args.legacy_sleep) if mode == "blocking" else shared
+            )
+            polls0 = fake.state.stats["poll"]
+            with serve(main_mod.app) as base:
+                results[mode] = asyncio.run(_drive(base, args.jobs))
+            results[mode]["upstream_polls"] = fake.state.stats["poll"] - polls0
+        meshy_dedup.wait_and_download = shared
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# hairfusion-service/bench/bench_retention.py
+"""
+outputs/ 보존 정책 벤치마크: 결과물 N 개가 쌓인 디렉터리에서
+
+    python -m bench.bench_retention --files 20000
+
+- listing        : 평평한 디렉터리(예전 outputs/) vs 샤딩(<2자리 hex>/) 에서 파일 하나가 속한 디렉터리 나열 시간
+- shards         : Meshy 결과물 이름(meshy_<UUIDv7 앞 16자리>.glb) N 개를 나눴을 때 쓰인 샤드 수 / 가장 큰 샤드의 파일 수
+- scan_*   : 인덱스 없이 정리 (outputs/ 전체 scandir + stat → mtime 정렬 → 한도까지 삭제)
+- index_* : retention.sweep (모아 둔 접근 기록 반영 → 인덱스에서 LRU 후보 → 삭제)
+  *_bulk   : 한 번에 전체의 20% 를 지우는 경우 (한도를 처음 켰을 때)
+  *_steady : 한도 근처에서 주기마다 새 결과물 --steady 개만큼 넘친 경우 (평상시 스위프, --rounds 번 평균)
+- reconcile : 기동 시 1회 하는 인덱스 ↔ 디스크 맞추기 (전체 스캔) 비용
+결과는 JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir  # noqa: E402
+from bench.fake_meshy import uuid7  # noqa: E402
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _populate(root: Path, n: int, size: int, sharded: bool) -> list:
+    from app.services.retention import shard_of
+
+    root.mkdir(parents=True, exist_ok=True)
+    body = b"x" * size
+    now = time.time()
+    paths = []
+    for i in range(n):
+        name = f"result_{uuid.uuid4().hex}.png"
+        d = root / shard_of(name) if sharded else root
+        d.mkdir(exist_ok=True)
+        p = d / name
+        p.write_bytes(body)
+        t = now - 3600 + i * (3000 / n)   # 오래된 것부터 차례로
+        os.utime(p, (t, t))
+        paths.append(p)
+    return paths
+
+
+def _scan_evict(root: Path, quota: int) -> int:
+    entries = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            st = os.stat(os.path.join(dirpath, name))
+            entries.append((st.st_mtime, st.st_size, os.path.join(dirpath, name)))
+    entries.sort()
+    total = sum(e[1] for e in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= quota:
+            break
+        os.unlink(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=20000)
+    ap.add_argument("--size", type=int, default=4096)
+    ap.add_argument("--steady", type=int, default=200, help="평상시 스위프 한 번 사이에 새로 생기는 결과물 수")
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    isolated_workdir()
+    quota = int(args.files * args.size * 0.8)
+    os.environ.update(
+        OUTPUT_QUOTA_BYTES=str(quota),
+        OUTPUT_QUOTA_LOW_WATER="1.0",
+        OUTPUT_MIN_AGE_SECONDS="0",
+    )
+    from app.services import retention
+
+    results = {"files": args.files}
+
+    # listing
+    flat = _populate(Path("flat"), args.files, 16, sharded=False)
+    shard = _populate(Path("sharded"), args.files, 16, sharded=True)
+    t0 = time.perf_counter()
+    for _ in range(20):
+        os.listdir(flat[0].parent)
+    flat_s = (time.perf_counter() - t0) / 20
+    t0 = time.perf_counter()
+    for _ in range(20):
+        os.listdir(shard[0].parent)
+    shard_s = (time.perf_counter() - t0) / 20
+    results["listing"] = {"flat_ms": _ms(flat_s), "sharded_ms": _ms(shard_s)}
+    shutil.rmtree("flat")
+    shutil.rmtree("sharded")
+
+    # Meshy 작업 id 는 앞부분이 타임스탬프 → 샤드가 고르게 퍼지는지
+    counts: dict = {}
+    for _ in range(args.files):
+        shard = retention.shard_of(f"meshy_{uuid7().replace('-', '')[:16]}.glb")
+        counts[shard] = counts.get(shard, 0) + 1
+    results["shards"] = {"used": len(counts), "largest": max(counts.values())}
+
+    def overflow(root: Path) -> list:
+        # 한도 근처에서 새 결과물 --steady 개 (가장 최근)
+        added = _populate(root, args.steady, args.size, sharded=True)
+        for p in added:
+            os.utime(p, None)
+        return added
+
+    # 인덱스 없이 정리
+    root = Path("outputs")
+    _populate(root, args.files, args.size, sharded=True)
+    t0 = time.perf_counter()
+    removed = _scan_evict(root, quota)
+    results["scan_bulk"] = {"ms": _ms(time.perf_counter() - t0), "removed": removed}
+    total = 0.0
+    for _ in range(args.rounds):
+        overflow(root)
+        t0 = time.perf_counter()
+        _scan_evict(root, quota)
+        total += time.perf_counter() - t0
+    results["scan_steady"] = {"ms": _ms(total / args.rounds)}
+    shutil.rmtree(root)
+
+    # 인덱스로 정리
+    paths = _populate(root, args.files, args.size, sharded=True)
+
+    async def run() -> None:
+        t0 = time.perf_counter()
+        adopted = await retention._run(retention._reconcile)
+        results["reconcile"] = {"ms": _ms(time.perf_counter() - t0), **adopted}
+        # 최근 요청 100 건이 접근 기록으로 쌓여 있는 상태에서 정리
+        for p in paths[:100]:
+            retention.touch(p.relative_to(root).as_posix())
+        t0 = time.perf_counter()
+        state = await retention.sweep()
+        results["index_bulk"] = {"ms": _ms(time.perf_counter() - t0), "removed": state["evicted"]}
+        results["survived_touched"] = sum(p.exists() for p in paths[:100])
+        total = 0.0
+        for _ in range(args.rounds):
+            for p in overflow(root):
+                retention.note(p)
+            t0 = time.perf_counter()
+            await retention.sweep()
+            total += time.perf_counter() - t0
+        results["index_steady"] = {"ms": _ms(total / args.rounds)}
+        await retention.stop_sweeper()
+
+    asyncio.run(run())
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# hairfusion-service/bench/bench_s3.py
+"""
+S3 업로드 벤치마크 (로컬 S3 대역: moto 서버).
+
+    pip install "moto[server]"
+    python -m bench.bench_s3 --sizes-mb 1,50 --files 4
+
+- single  : upload_file_async 로 파일 하나씩 순차 업로드 → MB/s
+- batch   : upload_job_artifacts 로 files 개를 한 번에 업로드 → MB/s
+- via_disk: 가짜 Meshy 에서 GLB 다운로드(디스크) 후 업로드 (MESHY_STORAGE=local + 업로드와 같은 경로)
+- stream  : stream_url_to_s3 로 디스크 없이 바로 멀티파트 업로드 (MESHY_STORAGE=s3)
+결과는 JSON 으로 출력.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench import fake_meshy  # noqa: E402
+from bench._servers import free_port, isolated_workdir, serve  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes-mb", default="1,50")
+    ap.add_argument("--files", type=int, default=4)
+    args = ap.parse_args()
+
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('moto is required: pip install "moto[server]"')
+
+    isolated_workdir()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    port = free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    try:
+        os.environ.update(
+            S3_ENDPOINT_URL=f"http://127.0.0.1:{port}",
+            AWS_S3_BUCKET="bench-bucket",
+            AWS_ACCESS_KEY_ID="bench",
+            AWS_SECRET_ACCESS_KEY="bench",
+            AWS_REGION="us-east-1",
+        )
+        from app.services import storage
+
+        storage.s3_client().create_bucket(Bucket="bench-bucket")
+        tmp = Path(tempfile.mkdtemp(prefix="s3bench-"))
+        rows = []
+        for mb in (int(x) for x in args.sizes_mb.split(",")):
+            paths = []
+            for i in range(args.files):
+                p = tmp / f"f{mb}_{i}.glb"
+                p.write_bytes(os.urandom(mb * 1024 * 1024))
+                paths.append(str(p))
+
+            async def single():
+                t0 = time.perf_counter()
+                for p in paths:
+                    await storage.upload_file_async(p)
+                return time.perf_counter() - t0
+
+            async def batch():
+                t0 = time.perf_counter()
+                await storage.upload_job_artifacts(
+                    "bench", {f"a{i}": p for i, p in enumerate(paths)}, metadata={"size_mb": mb}
+                )
+                return time.perf_counter() - t0
+
+            async def transfer(base: str):
+                from app.services.download import download_to_file
+                from app.services.http import close_clients
+
+                try:
+                    t0 = time.perf_counter()
+                    for i in range(len(paths)):
+                        dest = tmp / f"dl{mb}_{i}.glb"
+                        await download_to_file(f"{base}/files/d{i}.glb", dest)
+                        await storage.upload_file_async(str(dest))
+                    t_disk = time.perf_counter() - t0
+
+                    t0 = time.perf_counter()
+                    for i in range(len(paths)):
+                        await storage.stream_url_to_s3(f"{base}/files/s{i}.glb", f"stream/{mb}_{i}.glb")
+                    return t_disk, time.perf_counter() - t0
+                finally:
+                    await close_clients()
+
+            total_mb = mb * len(paths)
+            t_single = asyncio.run(single())
+            t_batch = asyncio.run(batch())
+            with serve(fake_meshy.create_app(glb_size=mb * 1024 * 1024)) as base:
+                t_disk, t_stream = asyncio.run(transfer(base))
+            rows.append({
+                "file_mb": mb,
+                "files": len(paths),
+                "single_s": round(t_single, 3),
+                "single_mb_s": round(total_mb / t_single, 2),
+                "batch_s": round(t_batch, 3),
+                "batch_mb_s": round(total_mb / t_batch, 2),
+                "via_disk_s": round(t_disk, 3),
+                "via_disk_mb_s": round(total_mb / t_disk, 2),
+                "stream_s": round(t_stream, 3),
+                "stream_mb_s": round(total_mb / t_stream, 2),
+            })
+        print(json.dumps({
+            "multipart_threshold": storage.settings.s3_multipart_threshold,
+            "part_concurrency": storage.settings.s3_part_concurrency,
+            "upload_workers": storage.settings.s3_upload_workers,
+            "results": rows,
+        }, indent=2))
+        storage.shutdown_uploads()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# hairfusion-service/bench/bench_startup.py
+"""
+콜드 스타트 벤치마크: app.main import 시간(python -X importtime)과 첫 /health 응답까지의 시간.
+
+    python -m bench.bench_startup --runs 5
+    python -m bench.bench_startup --runs 5 --budget-ms 800   # 초과하면 종료 코드 1 (CI 회귀 감시용)
+
+- 매 실행은 새 프로세스 + 빈 임시 작업 디렉터리 (outputs/, data/ 없음)
+- AWS_* 환경변수 없이 실행 → S3 설정 없이도 앱이 떠야 함
+- import 중에 무거운 모듈(boto3, PIL 등)이 로드되면 heavy_modules 에 표시
+결과는 JSON (중앙값/최소/최대, import 누적 시간 상위 모듈).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bench._servers import free_port  # noqa: E402
+
+# 기동 경로에서 import 되면 안 되는 무거운 모듈 (첫 사용 시점까지 미룸)
+HEAVY = ("boto3", "botocore", "PIL", "numpy", "torch")
+
+
+def _env() -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith("AWS_")}
+    env["PYTHONPATH"] = str(ROOT)
+    env["JOB_STORE"] = "memory"
+    return env
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    # "import time:  self [us] | cumulative | imported package"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cum_us)))
+    return rows
+
+
+def measure_import(workdir: str) -> dict:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=workdir, env=_env(), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app.main failed:\n{proc.stderr[-2000:]}")
+    rows = _parse_importtime(proc.stderr)
+    total = next((cum for name, _, cum in rows if name.strip() == "app.main"), None)
+    top_level = {name.strip(): cum for name, _, cum in rows}
+    return {
+        "app_main_ms": round(total / 1000, 1) if total else None,
+        "process_wall_ms": round(wall * 1000, 1),
+        "heavy_modules": sorted({m for m in top_level if m.split(".")[0] in HEAVY and "." not in m}),
+        "rows": rows,
+    }
+
+
+def measure_first_health(workdir: str, timeout: float = 30.0) -> float:
+    import httpx
+
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=_env(),
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"service exited with {proc.returncode}")
+            try:
+                r = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+                if r.status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("service did not answer /health")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _summary(values: list[float]) -> dict:
+    return {"median": round(median(values), 1), "min": round(min(values), 1), "max": round(max(values), 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="누적 import 시간 상위 모듈 수")
+    ap.add_argument("--budget-ms", type=float, help="app.main import 중앙값 상한 (넘으면 종료 코드 1)")
+    args = ap.parse_args()
+
+    imports, healths, last = [], [], None
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="hf-startup-") as work:
+            last = measure_import(work)
+            imports.append(last["app_main_ms"])
+        with tempfile.TemporaryDirectory(prefix="hf-startup-") as work:
+            healths.append(measure_first_health(work) * 1000)
+
+    # 마지막 실행 기준 누적 시간 상위 app.* / 서드파티 패키지
+    top = sorted(last["rows"], key=lambda r: r[2], reverse=True)
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_app_main_ms": _summary(imports),
+        "first_health_ms": _summary(healths),
+        "heavy_modules": last["heavy_modules"],
+        "top_cumulative_ms": [
+            {"module": name.strip(), "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+            for name, s, c in top[: args.top]
+        ],
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.budget_ms is not None and report["import_app_main_ms"]["median"] > args.budget_ms:
+        sys.exit(f"import budget exceeded: {report['import_app_main_ms']['median']} ms > {args.budget_ms} ms")
+    if last["heavy_modules"]:
+        sys.exit(f"heavy modules imported at startup: {last['heavy_modules']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# hairfusion-service/bench/bench_static.py
+"""
+정적 결과물(GLB) 재방문 벤치마크: 기존 StaticFiles vs CachedStaticFiles.
+
+    python -m bench.bench_static --glb-mb 8 --views 10
+
+브라우저 캐시를 흉내 내는 클라이언트로 같은 GLB 를 views 번 조회:
+- Cache-Control 에 max-age 가 살아 있으면 요청하지 않음 (immutable)
+- 아니면 If-None-Match 로 재검증 (304 면 본문 없음)
+- --touch: 조회 사이마다 파일 mtime 을 갱신 (fuse 캐시의 LRU utime 과 같은 상황)
+서버별 전송 바이트, 요청 수, 첫 조회/재방문 TTFB 와 Range(206) 동작, /viewer 재방문을 JSON 으로 출력.
+"""
+import argparse
+import array
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir, serve  # noqa: E402
+
+
+def _synthetic_glb(size: int) -> bytes:
+    # 실제 GLB 의 정점 버퍼처럼 연속적인 float32 값 (완전 난수보다 현실적인 압축률)
+    n = max(size // 4 - 5, 0)
+    floats = array.array("f", (math.sin(i * 0.0007) * 10.0 + (i % 97) * 0.01 for i in range(n)))
+    return (b"glTF" + (2).to_bytes(4, "little") + size.to_bytes(4, "little") + floats.tobytes())[:size]
+
+
+class BrowserCache:
+    """Cache-Control max-age / ETag 만 다루는 최소 브라우저 캐시"""
+
+    def __init__(self) -> None:
+        self.etag = None
+        self.fresh_until = 0.0
+
+    def update(self, headers) -> None:
+        self.etag = headers.get("etag") or self.etag
+        cc = headers.get("cache-control", "")
+        for part in cc.split(","):
+            part = part.strip()
+            if part.startswith("max-age=") and "no-cache" not in cc:
+                self.fresh_until = time.time() + int(part.split("=", 1)[1])
+
+
+async def _views(url: str, views: int, touch: Path | None, encoding: str) -> dict:
+    import httpx
+
+    cache = BrowserCache()
+    transferred = 0
+    requests = 0
+    ttfb = []
+    async with httpx.AsyncClient(timeout=None) as client:
+        for _ in range(views):
+            if touch is not None:
+                os.utime(touch)
+            if time.time() < cache.fresh_until:
+                ttfb.append(0.0)
+                continue
+            headers = {"Accept-Encoding": encoding}
+            if cache.etag:
+                headers["If-None-Match"] = cache.etag
+            t0 = time.perf_counter()
+            async with client.stream("GET", url, headers=headers) as r:
+                first = None
+                async for chunk in r.aiter_raw():
+                    first = first or time.perf_counter()
+                    transferred += len(chunk)
+                ttfb.append((first or time.perf_counter()) - t0)
+                requests += 1
+                if r.status_code == 200 or r.status_code == 304:
+                    cache.update(r.headers)
+
+        r = await client.get(url, headers={"Range": "bytes=0-65535"})
+        range_check = {"status": r.status_code, "bytes": len(r.content), "content_range": r.headers.get("content-range")}
+
+    return {
+        "requests": requests,
+        "bytes_transferred": transferred,
+        "first_ttfb_ms": round(ttfb[0] * 1000, 2),
+        "repeat_ttfb_mean_ms": round(sum(ttfb[1:]) / max(len(ttfb) - 1, 1) * 1000, 2),
+        "range": range_check,
+    }
+
+
+async def _viewer(base: str, views: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        etag, transferred, statuses = None, 0, {}
+        t0 = time.perf_counter()
+        for _ in range(views):
+            r = await client.get(f"{base}/viewer", params={"file": "x.glb"}, headers={"If-None-Match": etag} if etag else {})
+            etag = r.headers.get("etag") or etag
+            transferred += len(r.content)
+            statuses[str(r.status_code)] = statuses.get(str(r.status_code), 0) + 1
+        wall = time.perf_counter() - t0
+    return {"views": views, "bytes": transferred, "status": statuses, "mean_ms": round(wall / views * 1000, 2)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--glb-mb", type=float, default=8.0)
+    ap.add_argument("--views", type=int, default=10)
+    ap.add_argument("--touch", action="store_true", help="조회 사이마다 mtime 갱신")
+    ap.add_argument("--encoding", default="gzip, deflate, br")
+    args = ap.parse_args()
+
+    work = Path(isolated_workdir())
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+
+    from app.main import app
+    from app.services.static_files import precompress
+
+    name = "meshy_0123456789abcdef.glb"
+    glb = work / "outputs" / "meshy" / name
+    glb.parent.mkdir(parents=True, exist_ok=True)
+    glb.write_bytes(_synthetic_glb(int(args.glb_mb * 1024 * 1024)))
+    t0 = time.perf_counter()
+    sizes = precompress(str(glb))
+    precompress_s = time.perf_counter() - t0
+
+    plain = Starlette(routes=[Mount("/static", StaticFiles(directory=str(work / "outputs")))])
+    touch = glb if args.touch else None
+    results = {"precompress": {"sizes": sizes, "seconds": round(precompress_s, 3)}}
+    with serve(plain) as plain_base, serve(app) as base:
+        results["plain"] = asyncio.run(_views(f"{plain_base}/static/meshy/{name}", args.views, touch, args.encoding))
+        results["cached"] = asyncio.run(_views(f"{base}/static/meshy/{name}", args.views, touch, args.encoding))
+        results["viewer"] = asyncio.run(_viewer(base, args.views))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
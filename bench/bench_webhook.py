@@ -0,0 +1,96 @@
+# hairfusion-service/bench/bench_webhook.py
+"""
+Meshy 완료 통지 방식 비교: 폴링 vs 웹훅(+느린 보정 폴링).
+
+    python -m bench.bench_webhook --jobs 8 --task-seconds 4
+
+- poll    : 공유 폴러가 백오프 간격으로 get_job 조회
+- webhook : 가짜 Meshy 가 작업 종료 순간 서명된 알림을 POST /webhooks/meshy 로 보냄
+            (보정 폴링 간격은 --fallback 초)
+작업별 '완료 후 응답까지 지연'(응답 시간 - task_seconds)과 업스트림 조회 수를 JSON 으로 출력.
+(upstream_polls 에는 완료 후 결과 JSON 을 한 번 더 읽는 get_job 호출이 작업당 1회 포함됨)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench._servers import isolated_workdir, serve  # noqa: E402
+from bench import fake_meshy  # noqa: E402
+
+SECRET = "bench-secret"
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return round(values[idx] * 1000, 2)
+
+
+async def _drive(base: str, jobs: int, task_seconds: float) -> dict:
+    import httpx
+
+    async def one(client, i):
+        t0 = time.perf_counter()
+        r = await client.post(f"{base}/meshify", json={"image_url": f"http://example/face{i}.png"})
+        r.raise_for_status()
+        return time.perf_counter() - t0
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        lat = await asyncio.gather(*(one(client, i) for i in range(jobs)))
+    lag = [max(x - task_seconds, 0.0) for x in lat]
+    return {
+        "jobs": jobs,
+        "completion_lag_p50_ms": _pct(lag, 50),
+        "completion_lag_max_ms": _pct(lag, 100),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=8)
+    ap.add_argument("--task-seconds", type=float, default=4.0)
+    ap.add_argument("--fallback", type=float, default=30.0)
+    ap.add_argument("--mode", choices=("both", "poll", "webhook"), default="both")
+    args = ap.parse_args()
+
+    isolated_workdir()
+    fake = fake_meshy.create_app(task_seconds=args.task_seconds, webhook_secret=SECRET)
+    with serve(fake) as meshy_url:
+        os.environ.update(
+            MESHY_BASE_URL=meshy_url,
+            MESHY_API_KEY="bench",
+            MESHY_WEBHOOK_SECRET=SECRET,
+            MESHY_WEBHOOK_FALLBACK_INTERVAL=str(args.fallback),
+            MESHY_DEDUP_ENABLED="false",
+            MESHY_CONCURRENCY=str(max(args.jobs, 4)),   # 대기열 지연이 섞이지 않도록
+            JOB_STORE="memory",
+        )
+        import app.main as main_mod
+        from app.services import meshy
+
+        results = {}
+        modes = ("poll", "webhook") if args.mode == "both" else (args.mode,)
+        for mode in modes:
+            # 모드마다 폴러를 새로 만들도록 싱글턴을 비움
+            meshy.settings.meshy_completion = mode
+            meshy._poller = None
+            before = dict(fake.state.stats)
+            with serve(main_mod.app) as base:
+                meshy.settings.meshy_webhook_url = f"{base}/webhooks/meshy"
+                results[mode] = asyncio.run(_drive(base, args.jobs, args.task_seconds))
+            results[mode]["upstream_polls"] = fake.state.stats["poll"] - before["poll"]
+            results[mode]["webhooks_delivered"] = fake.state.stats["webhook"] - before["webhook"]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
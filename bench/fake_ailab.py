@@ -0,0 +1,88 @@
+# hairfusion-service/bench/fake_ailab.py
+"""
+로컬 AILab 대역 서버.
+hairstyle_edit_pro 가 거치는 오동작을 그대로 흉내냄:
+- accept_path 가 아닌 경로          → 404
+- accept_header 가 없는 요청        → 401
+- accept_mode 가 아닌 바디(json/form/multipart, 콤마로 여러 개) → 400
+- hair_style 이 fail_style 이면   → 500 (배치의 부분 실패 확인용)
+- 모두 맞으면 {"image_url": ...} (respond="url") 또는 PNG 바이너리 (respond="image")
+fetch_input=True 이면 실제 AILab 처럼 입력 얼굴 이미지를 image_url 에서 내려받거나 첨부 파일을 읽음
+(stats["input_bytes"] 에 누적 → URL 경로와 직접 업로드 경로의 전송량 비교용)
+"""
+import asyncio
+import io
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from PIL import Image
+
+
+def _png(size: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (size, size), (120, 80, 40)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def create_app(
+    accept_path: str = "/api/hairstyle",
+    accept_header: str = "ailabapi-api-key",
+    accept_mode: str = "form",
+    respond: str = "url",
+    image_size: int = 512,
+    latency: float = 0.0,
+    fail_style: str | None = None,
+    fetch_input: bool = False,
+) -> FastAPI:
+    app = FastAPI(title="fake-ailab")
+    png = _png(image_size)
+    accept_modes = set(accept_mode.split(","))
+    stats = {"calls": 0, "ok": 0, "404": 0, "401": 0, "400": 0, "500": 0, "images": 0, "input_bytes": 0}
+    app.state.stats = stats
+
+    @app.get("/images/{name}")
+    async def image(name: str):
+        stats["images"] += 1
+        return Response(png, media_type="image/png")
+
+    @app.post("/{path:path}")
+    async def edit(path: str, request: Request):
+        await asyncio.sleep(latency)
+        stats["calls"] += 1
+        if "/" + path.rstrip("/") != accept_path:
+            stats["404"] += 1
+            return JSONResponse({"error": "not found"}, status_code=404)
+        if accept_header.lower() not in request.headers:
+            stats["401"] += 1
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        ctype = request.headers.get("content-type", "")
+        mode = "json" if "json" in ctype else ("multipart" if "multipart" in ctype else "form")
+        if mode not in accept_modes:
+            stats["400"] += 1
+            return JSONResponse({"error": f"expected {accept_mode}"}, status_code=400)
+        body = await request.json() if mode == "json" else await request.form()
+        if fetch_input:
+            if mode == "multipart":
+                files = [v for v in body.values() if not isinstance(v, str)]
+                if not files:
+                    stats["400"] += 1
+                    return JSONResponse({"error": "image file required"}, status_code=400)
+                stats["input_bytes"] += len(await files[0].read())
+            else:
+                async with httpx.AsyncClient() as c:
+                    r = await c.get(body.get("image_url", ""))
+                if r.status_code != 200:
+                    stats["400"] += 1
+                    return JSONResponse({"error": "image_url not reachable"}, status_code=400)
+                stats["input_bytes"] += len(r.content)
+        if fail_style is not None:
+            if body.get("hair_style") == fail_style:
+                stats["500"] += 1
+                return JSONResponse({"error": "style failed"}, status_code=500)
+        stats["ok"] += 1
+        if respond == "image":
+            return Response(png, media_type="image/png")
+        return {"image_url": str(request.base_url).rstrip("/") + "/images/result.png"}
+
+    return app
@@ -0,0 +1,136 @@
+# hairfusion-service/bench/fake_meshy.py
+"""
+로컬 Meshy 대역 서버.
+- POST /openapi/v1/image-to-3d      → {"result": <task_id>}
+- GET  /openapi/v1/tasks/{task_id}  → 경과 시간에 따라 PENDING → IN_PROGRESS → SUCCEEDED
+- GET  /files/{task_id}.glb         → glb_size 바이트짜리 더미 GLB
+- formats / textures / thumbnail 을 주면 model_urls 에 다른 포맷, texture_urls, thumbnail_url 도 채움
+  (GLB 외 파일은 asset_size 바이트, 모든 파일은 내려받을 때 asset_latency 만큼 추가 지연)
+- url_ttl 을 주면 결과물 URL 에 만료 시각(?exp=)을 붙이고 지나면 403 (서명 URL 만료 흉내)
+- webhook_url 을 주면(또는 생성 요청에 callback_url 이 있으면) 작업이 끝나는 순간
+  서명된 완료 알림을 POST (웹훅 모드 확인용)
+- 작업 id 는 실제 Meshy 처럼 UUIDv7 (앞 48비트가 ms 타임스탬프 → 비슷한 시각의 id 는 앞부분이 같음)
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import os
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+def uuid7() -> str:
+    ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (ms << 80) | (0x7 << 76) | ((rand >> 64) & 0xFFF) << 64 | (0b10 << 62) | (rand & ((1 << 62) - 1))
+    return str(uuid.UUID(int=value))
+
+
+def create_app(
+    task_seconds: float = 2.0,
+    glb_size: int = 256 * 1024,
+    latency: float = 0.0,
+    webhook_url: str | None = None,
+    webhook_secret: str = "",
+    formats: tuple = ("glb",),
+    textures: int = 0,
+    thumbnail: bool = False,
+    asset_size: int = 256 * 1024,
+    asset_latency: float = 0.0,
+    url_ttl: float | None = None,
+) -> FastAPI:
+    app = FastAPI(title="fake-meshy")
+    tasks: Dict[str, float] = {}
+    stats = {"create": 0, "poll": 0, "download": 0, "webhook": 0, "webhook_failed": 0, "expired": 0}
+    app.state.stats = stats
+    notifying: set = set()   # 알림 태스크가 GC 되지 않도록 참조 유지
+
+    def _status(task_id: str) -> Dict[str, Any]:
+        elapsed = time.monotonic() - tasks[task_id]
+        if elapsed < task_seconds * 0.25:
+            return {"status": "PENDING", "progress": 0}
+        if elapsed < task_seconds:
+            return {"status": "IN_PROGRESS", "progress": int(elapsed / task_seconds * 100)}
+        return {"status": "SUCCEEDED", "progress": 100}
+
+    def _task_json(task_id: str, base_url: str) -> Dict[str, Any]:
+        data = {"id": task_id, **_status(task_id)}
+        if data["status"] == "SUCCEEDED":
+            base = base_url.rstrip("/") + "/files/"
+            sig = f"?exp={time.time() + url_ttl:.3f}" if url_ttl is not None else ""
+            glb = base + f"{task_id}.glb" + sig
+            data["model_url"] = glb
+            data["model_urls"] = {f: base + f"{task_id}.{f}" + sig for f in formats}
+            data["model_urls"]["glb"] = glb
+            if textures:
+                data["texture_urls"] = [
+                    {k: base + f"{task_id}_{i}_{k}.png" + sig for k in ("base_color", "metallic", "normal", "roughness")}
+                    for i in range(textures)
+                ]
+            if thumbnail:
+                data["thumbnail_url"] = base + f"{task_id}_preview.png" + sig
+        return data
+
+    async def _notify(url: str, task_id: str, base_url: str) -> None:
+        import httpx
+
+        await asyncio.sleep(task_seconds)
+        body = json.dumps(_task_json(task_id, base_url)).encode()
+        ts = str(int(time.time()))
+        # 서비스 쪽 검증과 같은 방식: HMAC-SHA256("<ts>.<body>")
+        sig = hmac.new(webhook_secret.encode(), f"{ts}.".encode() + body, hashlib.sha256).hexdigest()
+        headers = {
+            "Content-Type": "application/json",
+            "X-Meshy-Signature": "sha256=" + sig,
+            "X-Meshy-Timestamp": ts,
+        }
+        try:
+            async with httpx.AsyncClient() as client:
+                r = await client.post(url, content=body, headers=headers)
+            stats["webhook" if r.status_code < 400 else "webhook_failed"] += 1
+        except Exception:
+            stats["webhook_failed"] += 1
+
+    @app.post("/openapi/v1/image-to-3d")
+    async def create(request: Request):
+        await asyncio.sleep(latency)
+        stats["create"] += 1
+        task_id = uuid7()
+        tasks[task_id] = time.monotonic()
+        body = await request.json()
+        url = body.get("callback_url") or webhook_url
+        if url:
+            t = asyncio.create_task(_notify(url, task_id, str(request.base_url)))
+            notifying.add(t)
+            t.add_done_callback(notifying.discard)
+        return {"result": task_id}
+
+    @app.get("/openapi/v1/tasks/{task_id}")
+    async def task(task_id: str, request: Request):
+        await asyncio.sleep(latency)
+        stats["poll"] += 1
+        if task_id not in tasks:
+            return JSONResponse({"message": "not found"}, status_code=404)
+        return _task_json(task_id, str(request.base_url))
+
+    @app.get("/files/{name}")
+    async def download(name: str, exp: float | None = None):
+        await asyncio.sleep(latency)
+        if exp is not None and time.time() > exp:
+            stats["expired"] += 1
+            return JSONResponse({"message": "signature expired"}, status_code=403)
+        stats["download"] += 1
+        await asyncio.sleep(asset_latency)
+        if name.endswith(".glb"):
+            body = b"glTF" + b"\0" * max(glb_size - 4, 0)
+            return Response(body, media_type="model/gltf-binary")
+        ext = name.rsplit(".", 1)[-1]
+        stats[f"download_{ext}"] = stats.get(f"download_{ext}", 0) + 1
+        return Response(b"\x01" * asset_size, media_type="application/octet-stream")
+
+    return app
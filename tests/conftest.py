@@ -0,0 +1,27 @@
+# hairfusion-service/tests/conftest.py
+"""
+공통 설정: app.settings 가 요구하는 최소 환경변수를 채우고, outputs/ · data/ 가
+저장소를 더럽히지 않도록 임시 작업 디렉터리에서 실행.
+(app 모듈은 설정을 import 시점에 읽으므로 환경변수는 여기서 먼저 채움)
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("AWS_REGION", "ap-northeast-2")
+os.environ.setdefault("AWS_S3_BUCKET", "test-bucket")
+os.environ.setdefault("JOB_STORE", "memory")
+os.environ.setdefault("MESHY_DEDUP_ENABLED", "false")
+
+
+@pytest.fixture(autouse=True, scope="session")
+def workdir(tmp_path_factory):
+    cwd = os.getcwd()
+    work = tmp_path_factory.mktemp("hairfusion")
+    os.chdir(work)
+    yield work
+    os.chdir(cwd)
@@ -0,0 +1,69 @@
+# hairfusion-service/tests/test_download.py
+"""
+클라이언트가 준 URL 을 서버가 직접 받을 때의 제한 (app/services/download.py):
+내부 주소 거부, 크기 한도(Content-Length 가 없어도), 원본은 httpx.MockTransport 로 흉내.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.download import BlockedURL, DownloadTooLarge, check_public_url, fetch_bytes, sha256_of
+from app.settings import settings
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1/face.png",
+        "http://localhost:8000/face.png",
+        "http://10.0.0.5/face.png",
+        "http://192.168.1.10/face.png",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://[::1]/face.png",
+        "http://[::ffff:127.0.0.1]/face.png",
+        "file:///etc/passwd",
+    ],
+)
+def test_internal_urls_blocked(url):
+    with pytest.raises(BlockedURL):
+        asyncio.run(check_public_url(url))
+
+
+def _origin(body: bytes, content_length: bool) -> httpx.AsyncClient:
+    async def stream():
+        for i in range(0, len(body), 1024):
+            yield body[i:i + 1024]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        headers = {"Content-Length": str(len(body))} if content_length else {}
+        return httpx.Response(200, headers=headers, content=stream())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_fetch_bytes_size_cap(monkeypatch, content_length):
+    monkeypatch.setattr(settings, "download_allow_private", True)
+    body = b"x" * 10_000
+
+    async def run(limit):
+        async with _origin(body, content_length) as client:
+            return await fetch_bytes("http://origin/face.png", limit, client=client)
+
+    assert asyncio.run(run(10_000)) == body
+    with pytest.raises(DownloadTooLarge):
+        asyncio.run(run(9_999))
+
+
+def test_sha256_of(monkeypatch):
+    import hashlib
+
+    monkeypatch.setattr(settings, "download_allow_private", True)
+    body = b"y" * 5000
+
+    async def run():
+        async with _origin(body, False) as client:
+            return await sha256_of("http://origin/in.png", 5000, client=client)
+
+    assert asyncio.run(run()) == hashlib.sha256(body).hexdigest()
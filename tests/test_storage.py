@@ -0,0 +1,119 @@
+# hairfusion-service/tests/test_storage.py
+"""
+S3 업로드 (app/services/storage.py) — moto 로 띄운 가짜 S3 에 대해
+upload_file(단일 / 멀티파트), stream_url_to_s3(본문 · Content-Type, 실패 시 멀티파트 abort) 확인.
+원본 URL 은 httpx.MockTransport 로 흉내.
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+from moto import mock_aws
+
+from app.services import storage
+from app.settings import settings
+
+MB = 1024 * 1024
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setattr(settings, "aws_s3_bucket", BUCKET)
+    monkeypatch.setattr(settings, "aws_access_key_id", "testing")
+    monkeypatch.setattr(settings, "aws_secret_access_key", "testing")
+    monkeypatch.setattr(settings, "s3_endpoint_url", None)
+    # 멀티파트가 작은 파일에서도 일어나도록 (S3 최소 파트 크기 5MB)
+    monkeypatch.setattr(settings, "s3_multipart_threshold", 5 * MB)
+    monkeypatch.setattr(settings, "s3_multipart_chunksize", 5 * MB)
+    storage.s3_client.cache_clear()
+    storage._transfer_config.cache_clear()
+    with mock_aws():
+        client = storage.s3_client()
+        client.create_bucket(
+            Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": settings.aws_region}
+        )
+        yield client
+    storage.s3_client.cache_clear()
+    storage._transfer_config.cache_clear()
+
+
+def _parts(etag: str) -> int:
+    # 멀티파트 객체의 ETag 는 "<md5>-<파트 수>"
+    etag = etag.strip('"')
+    return int(etag.rsplit("-", 1)[1]) if "-" in etag else 1
+
+
+@pytest.mark.parametrize("size,parts", [(64 * 1024, 1), (12 * MB, 3)])
+def test_upload_file(s3, tmp_path, size, parts):
+    body = os.urandom(size)
+    path = tmp_path / "model.glb"
+    path.write_bytes(body)
+
+    key, url = storage.upload_file(str(path), key_prefix="results/")
+
+    assert key.startswith("results/") and key.endswith(".glb")
+    assert url == f"https://{BUCKET}.s3.amazonaws.com/{key}"
+    obj = s3.get_object(Bucket=BUCKET, Key=key)
+    assert obj["Body"].read() == body
+    assert obj["ContentType"] == "model/gltf-binary"
+    assert _parts(obj["ETag"]) == parts
+
+
+def test_upload_file_missing(s3, tmp_path):
+    with pytest.raises(storage.StorageError):
+        storage.upload_file(str(tmp_path / "nope.png"))
+
+
+def _source(body: bytes, fail_after: int | None = None) -> httpx.AsyncClient:
+    """body 를 1MB 씩 내려주는 원본 서버. fail_after 바이트 이후엔 연결이 끊김"""
+
+    class Stream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(0, len(body), MB):
+                if fail_after is not None and i >= fail_after:
+                    raise httpx.ReadError("connection reset")
+                yield body[i:i + MB]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Length": str(len(body))}, stream=Stream())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.parametrize("size,parts", [(256 * 1024, 1), (12 * MB, 3)])
+def test_stream_url_to_s3(s3, size, parts):
+    body = os.urandom(size)
+
+    async def run():
+        async with _source(body) as client:
+            return await storage.stream_url_to_s3(
+                "http://origin/model.glb", "meshy/model.glb", content_type="model/gltf-binary", client=client
+            )
+
+    key, url, received = asyncio.run(run())
+
+    assert (key, received) == ("meshy/model.glb", size)
+    assert url == f"https://{BUCKET}.s3.amazonaws.com/meshy/model.glb"
+    obj = s3.get_object(Bucket=BUCKET, Key=key)
+    assert obj["Body"].read() == body
+    assert obj["ContentType"] == "model/gltf-binary"
+    assert _parts(obj["ETag"]) == parts
+
+
+def test_stream_url_to_s3_aborts_failed_multipart(s3):
+    body = os.urandom(12 * MB)
+
+    async def run():
+        async with _source(body, fail_after=7 * MB) as client:
+            await storage.stream_url_to_s3("http://origin/model.glb", "meshy/broken.glb", client=client, max_resumes=0)
+
+    with pytest.raises(storage.StorageError):
+        asyncio.run(run())
+
+    # 첫 파트는 올라갔지만 업로드는 abort → 조각도, 객체도 남지 않음
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert s3.list_objects_v2(Bucket=BUCKET).get("KeyCount", 0) == 0
@@ -0,0 +1,101 @@
+# hairfusion-service/tests/test_webhook.py
+"""
+Meshy 완료 통지: 폴링 / 웹훅으로 /meshify 가 끝나는지, 그리고 POST /webhooks/meshy 서명 검증.
+가짜 Meshy(bench/fake_meshy.py)와 서비스를 각각 uvicorn 으로 띄워 실제 HTTP 로 확인.
+"""
+import json
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from bench import fake_meshy
+from bench._servers import serve
+from app.services import meshy
+from app.services.meshy_webhook import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign
+from app.settings import settings
+
+SECRET = "test-secret"
+TASK_SECONDS = 0.3
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = fake_meshy.create_app(task_seconds=TASK_SECONDS, glb_size=1024, webhook_secret=SECRET)
+    with serve(fake) as url:
+        monkeypatch.setattr(settings, "meshy_base_url", url)
+        monkeypatch.setattr(settings, "meshy_api_key", "test")
+        monkeypatch.setattr(settings, "meshy_webhook_secret", SECRET)
+        monkeypatch.setattr(settings, "meshy_poll_min_interval", 0.05)
+        monkeypatch.setattr(settings, "meshy_poll_max_interval", 0.2)
+        monkeypatch.setattr(settings, "meshy_webhook_fallback_interval", 60.0)
+        monkeypatch.setattr(meshy, "_poller", None)   # 모드마다 폴러를 새로 만들도록
+        yield fake.state.stats
+
+
+@pytest.fixture
+def service(upstream):
+    import app.main as main_mod
+
+    with serve(main_mod.app) as base:
+        yield base
+
+
+def _meshify(base: str) -> dict:
+    r = httpx.post(f"{base}/meshify", json={"image_url": "http://example/face.png"}, timeout=30)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["result"]["status"] == "SUCCEEDED"
+    assert Path(body["saved_path"]).read_bytes()[:4] == b"glTF"
+    return body
+
+
+def test_poll_completion(monkeypatch, upstream, service):
+    monkeypatch.setattr(settings, "meshy_completion", "poll")
+    _meshify(service)
+    assert upstream["webhook"] == 0
+    assert upstream["poll"] >= 2
+
+
+def test_webhook_completion(monkeypatch, upstream, service):
+    monkeypatch.setattr(settings, "meshy_completion", "webhook")
+    monkeypatch.setattr(settings, "meshy_webhook_url", f"{service}/webhooks/meshy")
+    t0 = time.perf_counter()
+    _meshify(service)
+    # 보정 폴링(60초)이 아니라 알림으로 깨어났어야 함
+    assert time.perf_counter() - t0 < 10
+    assert upstream["webhook"] == 1
+    assert upstream["webhook_failed"] == 0
+
+
+def _post(base: str, body: bytes, headers: dict) -> httpx.Response:
+    return httpx.post(f"{base}/webhooks/meshy", content=body, headers={"Content-Type": "application/json", **headers})
+
+
+BODY = json.dumps({"id": "task-unknown", "status": "SUCCEEDED", "model_url": "http://example/m.glb"}).encode()
+
+
+def test_webhook_valid_signature(service):
+    ts = str(int(time.time()))
+    r = _post(service, BODY, {SIGNATURE_HEADER: sign(BODY, ts), TIMESTAMP_HEADER: ts})
+    assert r.status_code == 200
+    assert r.json()["matched"] is False
+
+
+@pytest.mark.parametrize(
+    "case",
+    ["bad_signature", "missing_signature", "missing_timestamp", "stale_timestamp", "signed_without_timestamp"],
+)
+def test_webhook_rejects(service, case):
+    now = str(int(time.time()))
+    stale = str(int(time.time()) - 3600)
+    headers = {
+        "bad_signature": {SIGNATURE_HEADER: sign(BODY, now, secret="wrong"), TIMESTAMP_HEADER: now},
+        "missing_signature": {TIMESTAMP_HEADER: now},
+        "missing_timestamp": {SIGNATURE_HEADER: sign(BODY, now)},
+        "stale_timestamp": {SIGNATURE_HEADER: sign(BODY, stale), TIMESTAMP_HEADER: stale},
+        "signed_without_timestamp": {SIGNATURE_HEADER: sign(BODY)},
+    }[case]
+    r = _post(service, BODY, headers)
+    assert r.status_code == 401